@@ -4,19 +4,656 @@ A modern web application for scheduling doctor appointments with review system,
 favorites, availability calendar, and premium UI features.
 """
 
-from flask import Flask, render_template, request, jsonify
+from flask import (Flask, render_template, request, jsonify, make_response, stream_with_context, g,
+                   has_request_context)
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from werkzeug.middleware.proxy_fix import ProxyFix
+from collections import OrderedDict, deque
 from datetime import datetime, timedelta
+import base64
+import bisect
+import click
+import cProfile
+import csv
+import functools
+import hashlib
+import heapq
+import io
+import itertools
+import json
+import marshal
+import math
 import os
+import queue
 import random
+import re
+import secrets
+import sqlite3
+import sys
+import threading
+import time
+
+# ============ DATABASE CONFIGURATION ============
+# The database URI and engine/pool options come from the environment. SQLite
+# connections get their pragmas on connect, so every pooled connection in every
+# worker process runs with WAL journaling and a busy timeout.
+
+DATABASE_URL = os.environ.get('DATABASE_URL', 'sqlite:///appointments.db')
+
+SQLITE_JOURNAL_MODES = {'DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL', 'OFF'}
+SQLITE_SYNCHRONOUS_MODES = {'OFF', 'NORMAL', 'FULL', 'EXTRA'}
+
+def _env_choice(name, default, choices):
+    value = os.environ.get(name, default).upper()
+    if value not in choices:
+        raise ValueError(f'{name} must be one of {", ".join(sorted(choices))}, got {value!r}')
+    return value
+
+SQLITE_PRAGMAS = {
+    'journal_mode': _env_choice('SQLITE_JOURNAL_MODE', 'WAL', SQLITE_JOURNAL_MODES),
+    'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000)),
+    'synchronous': _env_choice('SQLITE_SYNCHRONOUS', 'NORMAL', SQLITE_SYNCHRONOUS_MODES),
+    'cache_size': int(os.environ.get('SQLITE_CACHE_SIZE', -64000)),  # negative means KiB
+    'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', 268435456)),
+}
+
+def build_engine_options():
+    """Collect SQLAlchemy engine/pool options that are set in the environment."""
+    options = {}
+    for env_name, option, cast in (
+        ('DB_POOL_SIZE', 'pool_size', int),
+        ('DB_MAX_OVERFLOW', 'max_overflow', int),
+        ('DB_POOL_TIMEOUT', 'pool_timeout', float),
+        ('DB_POOL_RECYCLE', 'pool_recycle', int),
+    ):
+        if os.environ.get(env_name):
+            options[option] = cast(os.environ[env_name])
+    if os.environ.get('DB_POOL_PRE_PING', '').lower() in ('1', 'true', 'yes'):
+        options['pool_pre_ping'] = True
+    return options
+
+@event.listens_for(Engine, 'connect')
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f'PRAGMA {name}={value}')
+    cursor.close()
 
 app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///appointments.db'
+app.config['SQLALCHEMY_DATABASE_URI'] = DATABASE_URL
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = build_engine_options()
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
+# Reverse proxies in front of the app; their X-Forwarded-For entries are trusted for the client address
+TRUSTED_PROXY_COUNT = int(os.environ.get('TRUSTED_PROXY_COUNT', 0))
+if TRUSTED_PROXY_COUNT:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXY_COUNT, x_proto=TRUSTED_PROXY_COUNT)
+# Flask's logger inherits the root logger's WARNING level unless told otherwise
+app.logger.setLevel(os.environ.get('LOG_LEVEL', 'INFO').upper())
 
 db = SQLAlchemy(app)
 
+def describe_database_settings():
+    """Report the effective database settings, reading pragmas back from a live connection."""
+    engine = db.engine
+    settings = {
+        'url': engine.url.render_as_string(hide_password=True),
+        'pool': f'{type(engine.pool).__name__}: {engine.pool.status()}',
+        'engine_options': app.config['SQLALCHEMY_ENGINE_OPTIONS'],
+    }
+    if engine.dialect.name == 'sqlite':
+        with engine.connect() as connection:
+            settings['pragmas'] = {
+                name: connection.exec_driver_sql(f'PRAGMA {name}').scalar() for name in SQLITE_PRAGMAS
+            }
+    return settings
+
+_database_settings_reported = False
+
+def _report_database_settings():
+    # Once per process before its first request, so every worker logs what it actually runs with
+    global _database_settings_reported
+    if not _database_settings_reported:
+        _database_settings_reported = True
+        app.logger.info('Database settings: %s', describe_database_settings())
+
+app.before_request(_report_database_settings)
+
+# ============ METRICS ============
+# Request hooks time every request and engine events time every SQL statement.
+# While a request runs, its statement count and SQL time only go into a
+# thread-local tally; when it finishes, the tally is folded into per-route
+# histograms under one short lock. Caches count their own hits and misses.
+# GET /metrics renders everything in the Prometheus text exposition format.
+
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1').lower() in ('1', 'true', 'yes')
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+REQUEST_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+REQUEST_SQL_STATEMENT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250)
+REQUEST_SQL_SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+def _metric_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+class Histogram:
+    """Prometheus-style histogram; callers serialize access."""
+    
+    __slots__ = ('bounds', 'counts', 'sum', 'count')
+    
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+    
+    def observe(self, value):
+        # Buckets hold values <= their bound, as Prometheus' `le` label says
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+    
+    def copy(self):
+        histogram = Histogram(self.bounds)
+        histogram.counts = list(self.counts)
+        histogram.sum = self.sum
+        histogram.count = self.count
+        return histogram
+    
+    def render(self, name, labels):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.bounds, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {self.count}')
+        lines.append(f'{name}_sum{{{labels}}} {self.sum:.6f}')
+        lines.append(f'{name}_count{{{labels}}} {self.count}')
+        return lines
+
+class CacheStats:
+    """Hit and miss counters of one named cache."""
+    
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def record(self, hits=0, misses=0):
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+
+class MetricsRegistry:
+    """Process-wide request, SQL, booking conflict and cache counters."""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = {}      # (method, route) -> (latency, statements, sql seconds) histograms
+        self._responses = {}   # (method, route, status) -> count
+        self._conflicts = {}   # reason -> count
+        self._background_sql = [0, 0.0]   # statements and seconds outside any request
+        self._caches = {}      # name -> CacheStats
+        self.started_at = time.time()
+    
+    def cache(self, name):
+        """The CacheStats registered under `name`, created on first use."""
+        with self._lock:
+            stats = self._caches.get(name)
+            if stats is None:
+                stats = self._caches[name] = CacheStats(name)
+            return stats
+    
+    def observe_request(self, method, route, status, seconds, statements, sql_seconds):
+        with self._lock:
+            histograms = self._routes.get((method, route))
+            if histograms is None:
+                histograms = self._routes[(method, route)] = (
+                    Histogram(REQUEST_LATENCY_BUCKETS),
+                    Histogram(REQUEST_SQL_STATEMENT_BUCKETS),
+                    Histogram(REQUEST_SQL_SECONDS_BUCKETS),
+                )
+            histograms[0].observe(seconds)
+            histograms[1].observe(statements)
+            histograms[2].observe(sql_seconds)
+            key = (method, route, status)
+            self._responses[key] = self._responses.get(key, 0) + 1
+    
+    def observe_background_sql(self, seconds):
+        with self._lock:
+            self._background_sql[0] += 1
+            self._background_sql[1] += seconds
+    
+    def count_conflict(self, reason):
+        with self._lock:
+            self._conflicts[reason] = self._conflicts.get(reason, 0) + 1
+    
+    def render(self):
+        """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            routes = {key: [histogram.copy() for histogram in histograms]
+                      for key, histograms in self._routes.items()}
+            responses = dict(self._responses)
+            conflicts = dict(self._conflicts)
+            background_statements, background_seconds = self._background_sql
+            caches = list(self._caches.values())
+        
+        lines = [
+            '# HELP medschedule_start_time_seconds Unix time the process started.',
+            '# TYPE medschedule_start_time_seconds gauge',
+            f'medschedule_start_time_seconds {self.started_at:.3f}',
+        ]
+        
+        histogram_metrics = (
+            ('medschedule_http_request_duration_seconds', 'Request latency by route.'),
+            ('medschedule_http_request_sql_statements', 'SQL statements executed per request by route.'),
+            ('medschedule_http_request_sql_seconds', 'Time spent in SQL per request by route.'),
+        )
+        for index, (name, help_text) in enumerate(histogram_metrics):
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+            for (method, route), histograms in sorted(routes.items()):
+                lines += histograms[index].render(name, f'method="{method}",route="{_metric_label(route)}"')
+        
+        lines += ['# HELP medschedule_http_responses_total Responses by route and status code.',
+                  '# TYPE medschedule_http_responses_total counter']
+        for (method, route, status), count in sorted(responses.items()):
+            lines.append(f'medschedule_http_responses_total'
+                         f'{{method="{method}",route="{_metric_label(route)}",status="{status}"}} {count}')
+        
+        lines += [
+            '# HELP medschedule_background_sql_statements_total SQL statements run outside a request.',
+            '# TYPE medschedule_background_sql_statements_total counter',
+            f'medschedule_background_sql_statements_total {background_statements}',
+            '# HELP medschedule_background_sql_seconds_total Time spent in SQL outside a request.',
+            '# TYPE medschedule_background_sql_seconds_total counter',
+            f'medschedule_background_sql_seconds_total {background_seconds:.6f}',
+        ]
+        
+        lines += ['# HELP medschedule_booking_conflicts_total Bookings and holds refused with 409 by cause.',
+                  '# TYPE medschedule_booking_conflicts_total counter']
+        for reason, count in sorted(conflicts.items()):
+            lines.append(f'medschedule_booking_conflicts_total{{reason="{reason}"}} {count}')
+        
+        lines += ['# HELP medschedule_cache_requests_total Cache lookups by cache and result.',
+                  '# TYPE medschedule_cache_requests_total counter']
+        ratios = []
+        for stats in sorted(caches, key=lambda stats: stats.name):
+            hits, misses = stats.hits, stats.misses
+            lines.append(f'medschedule_cache_requests_total{{cache="{stats.name}",result="hit"}} {hits}')
+            lines.append(f'medschedule_cache_requests_total{{cache="{stats.name}",result="miss"}} {misses}')
+            if hits + misses:
+                ratios.append(f'medschedule_cache_hit_ratio{{cache="{stats.name}"}} {hits / (hits + misses):.6f}')
+        lines += ['# HELP medschedule_cache_hit_ratio Share of cache lookups served from the cache.',
+                  '# TYPE medschedule_cache_hit_ratio gauge'] + ratios
+        return '\n'.join(lines) + '\n'
+
+metrics = MetricsRegistry()
+
+_request_tally = threading.local()
+
+def _start_statement_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info['metrics_statement_started'] = time.perf_counter()
+
+def _record_statement(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info.pop('metrics_statement_started', time.perf_counter())
+    tally = getattr(_request_tally, 'current', None)
+    if tally is None:
+        metrics.observe_background_sql(elapsed)
+    else:
+        tally[0] += 1
+        tally[1] += elapsed
+
+def _start_request_metrics():
+    _request_tally.current = [0, 0.0, time.perf_counter()]
+
+def _record_request_metrics(status):
+    tally = getattr(_request_tally, 'current', None)
+    if tally is None:
+        return
+    # Statements a streamed response runs after this point count as background SQL
+    _request_tally.current = None
+    route = request.url_rule.rule if request.url_rule else '(unmatched)'
+    metrics.observe_request(request.method, route, status, time.perf_counter() - tally[2], tally[0], tally[1])
+
+def _finish_request_metrics(response):
+    _record_request_metrics(response.status_code)
+    return response
+
+def _abort_request_metrics(exc):
+    _record_request_metrics(500)
+
+if METRICS_ENABLED:
+    event.listen(Engine, 'before_cursor_execute', _start_statement_timer)
+    event.listen(Engine, 'after_cursor_execute', _record_statement)
+    app.before_request(_start_request_metrics)
+    app.after_request(_finish_request_metrics)
+    app.teardown_request(_abort_request_metrics)
+
+@app.route('/metrics')
+def get_metrics():
+    """Prometheus scrape endpoint; requires `Authorization: Bearer <METRICS_TOKEN>` when that is set."""
+    if METRICS_TOKEN and request.headers.get('Authorization') != f'Bearer {METRICS_TOKEN}':
+        return jsonify({'error': 'Unauthorized'}), 401
+    return app.response_class(metrics.render() + reminder_outbox_metrics(), mimetype='text/plain; version=0.0.4')
+
+# ============ SLOW QUERY LOG ============
+# Opt-in: with SLOW_QUERY_MS set, every statement whose execution (on SQLite,
+# up to the first result row) takes at least that long is recorded with the
+# route that ran it, the shape (not the values) of its parameters and, on
+# SQLite, its EXPLAIN QUERY PLAN. Plans are cached per statement text, so a
+# repeatedly slow query is only explained once. The newest SLOW_QUERY_LOG_SIZE
+# entries are kept in memory for /api/admin/slow-queries.
+
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', 0))
+SLOW_QUERY_LOG_SIZE = int(os.environ.get('SLOW_QUERY_LOG_SIZE', 200))
+SLOW_QUERY_PLAN_CACHE_SIZE = 256
+SLOW_QUERY_SQL_MAX_CHARS = 4000
+
+EXPLAINABLE_STATEMENTS = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH', 'REPLACE')
+
+def parameter_shape(parameters):
+    """Describe bound parameters by type only, collapsing runs: '(int * 250, str)'."""
+    if isinstance(parameters, dict):
+        return '{' + ', '.join(f'{name}: {type(value).__name__}' for name, value in parameters.items()) + '}'
+    runs = []
+    for value in parameters or ():
+        type_name = type(value).__name__
+        if runs and runs[-1][0] == type_name:
+            runs[-1][1] += 1
+        else:
+            runs.append([type_name, 1])
+    return '(' + ', '.join(name if count == 1 else f'{name} * {count}' for name, count in runs) + ')'
+
+def explain_query_plan(dbapi_connection, statement, parameters):
+    """
+    Run EXPLAIN QUERY PLAN on the raw connection (bypassing engine events) and
+    return the plan as indented detail lines.
+    """
+    cursor = dbapi_connection.cursor()
+    try:
+        rows = cursor.execute(f'EXPLAIN QUERY PLAN {statement}', parameters).fetchall()
+    finally:
+        cursor.close()
+    depths = {0: -1}
+    lines = []
+    for node_id, parent_id, _, detail in rows:
+        depths[node_id] = depths.get(parent_id, -1) + 1
+        lines.append('  ' * depths[node_id] + detail)
+    return lines
+
+def plan_warnings(plan):
+    """Plan steps that usually mean a missing index: table scans and temporary sort trees."""
+    return [line.strip() for line in plan
+            if (line.strip().startswith('SCAN ') and 'CONSTANT ROW' not in line) or 'TEMP B-TREE' in line]
+
+class SlowQueryLog:
+    """Bounded ring buffer of slow statements, newest last."""
+    
+    def __init__(self, threshold_ms, capacity):
+        self.threshold_seconds = threshold_ms / 1000
+        self._lock = threading.Lock()
+        self._entries = deque(maxlen=capacity)
+        self._plans = OrderedDict()   # statement -> (plan lines, error)
+    
+    def _plan_for(self, dbapi_connection, statement, parameters):
+        with self._lock:
+            if statement in self._plans:
+                self._plans.move_to_end(statement)
+                return self._plans[statement]
+        try:
+            found = (explain_query_plan(dbapi_connection, statement, parameters), None)
+        except sqlite3.Error as e:
+            found = (None, str(e))
+        with self._lock:
+            self._plans[statement] = found
+            while len(self._plans) > SLOW_QUERY_PLAN_CACHE_SIZE:
+                self._plans.popitem(last=False)
+        return found
+    
+    def record(self, cursor, statement, parameters, executemany, seconds):
+        rows = len(parameters) if executemany else None
+        if executemany:
+            parameters = parameters[0] if parameters else ()
+        
+        plan, plan_error = None, None
+        dbapi_connection = getattr(cursor, 'connection', None)
+        if (isinstance(dbapi_connection, sqlite3.Connection)
+                and statement.lstrip().upper().startswith(EXPLAINABLE_STATEMENTS)):
+            plan, plan_error = self._plan_for(dbapi_connection, statement, parameters)
+        
+        if has_request_context():
+            caller = f"{request.method} {request.url_rule.rule if request.url_rule else request.path}"
+        else:
+            caller = f'thread {threading.current_thread().name}'
+        entry = {
+            'recorded_at': datetime.now().isoformat(timespec='milliseconds'),
+            'duration_ms': round(seconds * 1000, 3),
+            'caller': caller,
+            'sql': statement[:SLOW_QUERY_SQL_MAX_CHARS],
+            'parameters': parameter_shape(parameters),
+            'executemany_rows': rows,
+            'plan': plan,
+            'plan_warnings': plan_warnings(plan) if plan else [],
+            'plan_error': plan_error
+        }
+        with self._lock:
+            self._entries.append(entry)
+    
+    def entries(self):
+        with self._lock:
+            return list(self._entries)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._plans.clear()
+
+slow_query_log = SlowQueryLog(SLOW_QUERY_MS, SLOW_QUERY_LOG_SIZE)
+
+def _start_slow_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info['slow_query_started'] = time.perf_counter()
+
+def _check_slow_query(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info.pop('slow_query_started', time.perf_counter())
+    if elapsed >= slow_query_log.threshold_seconds:
+        slow_query_log.record(cursor, statement, parameters, executemany, elapsed)
+
+if SLOW_QUERY_MS > 0:
+    event.listen(Engine, 'before_cursor_execute', _start_slow_query_timer)
+    event.listen(Engine, 'after_cursor_execute', _check_slow_query)
+
+@app.route('/api/admin/slow-queries')
+def admin_get_slow_queries():
+    """Recorded slow statements, newest first (`?limit=`, `?caller=` substring filter)."""
+    if not check_admin_auth():
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    limit = request.args.get('limit', SLOW_QUERY_LOG_SIZE, type=int)
+    caller = request.args.get('caller')
+    entries = [entry for entry in reversed(slow_query_log.entries())
+               if not caller or caller in entry['caller']]
+    return jsonify({
+        'enabled': SLOW_QUERY_MS > 0,
+        'threshold_ms': SLOW_QUERY_MS,
+        'capacity': SLOW_QUERY_LOG_SIZE,
+        'queries': entries[:max(limit, 0)]
+    })
+
+@app.route('/api/admin/slow-queries', methods=['DELETE'])
+def admin_clear_slow_queries():
+    """Empty the slow query log and its cached plans."""
+    if not check_admin_auth():
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    slow_query_log.clear()
+    return jsonify({'message': 'Slow query log cleared'})
+
+# ============ REQUEST PROFILING ============
+# An admin-authenticated request that sends `X-Profile: 1` (or `?_profile=1`)
+# runs under cProfile. The profile is stored and its id returned in the
+# X-Profile-Id header; `X-Profile: inline` also embeds the top functions in a
+# JSON object response. With PROFILE_SAMPLE_RATE set, that fraction of all
+# requests is profiled and stored as well. Only one request is profiled at a
+# time per process, because newer Pythons allow a single active profiler.
+
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+PROFILE_STORE_SIZE = int(os.environ.get('PROFILE_STORE_SIZE', 20))
+PROFILE_TOP_FUNCTIONS = 30
+PROFILE_SORT_KEYS = {'cumulative': 3, 'tottime': 2, 'calls': 1}   # index into a pstats entry
+
+def top_functions(stats, sort='cumulative', limit=PROFILE_TOP_FUNCTIONS):
+    """The `limit` heaviest entries of a cProfile stats dict, heaviest first."""
+    index = PROFILE_SORT_KEYS[sort]
+    ranked = sorted(stats.items(), key=lambda item: item[1][index], reverse=True)[:limit]
+    return [{
+        'function': function,
+        'file': filename,
+        'line': line,
+        'calls': calls,
+        'primitive_calls': primitive_calls,
+        'total_ms': round(total_time * 1000, 3),
+        'cumulative_ms': round(cumulative_time * 1000, 3)
+    } for (filename, line, function), (primitive_calls, calls, total_time, cumulative_time, _) in ranked]
+
+class ProfileStore:
+    """The newest PROFILE_STORE_SIZE request profiles, with their raw cProfile stats."""
+    
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self._profiles = OrderedDict()   # profile id -> (summary, stats)
+        self._ids = itertools.count(1)
+    
+    def add(self, summary, stats):
+        with self._lock:
+            summary['id'] = next(self._ids)
+            self._profiles[summary['id']] = (summary, stats)
+            while len(self._profiles) > self.capacity:
+                self._profiles.popitem(last=False)
+        return summary['id']
+    
+    def get(self, profile_id):
+        with self._lock:
+            return self._profiles.get(profile_id)
+    
+    def summaries(self):
+        with self._lock:
+            return [summary for summary, _ in reversed(self._profiles.values())]
+
+profile_store = ProfileStore(PROFILE_STORE_SIZE)
+_profiler_lock = threading.Lock()
+
+def _start_request_profile():
+    mode = request.headers.get('X-Profile') or request.args.get('_profile')
+    if mode and mode != '0' and check_admin_auth():
+        sampled = False
+    elif PROFILE_SAMPLE_RATE > 0 and request.endpoint != 'static' and random.random() < PROFILE_SAMPLE_RATE:
+        mode, sampled = None, True
+    else:
+        return
+    if not _profiler_lock.acquire(blocking=False):
+        g.profile = {'busy': True, 'mode': mode}
+        return
+    profiler = cProfile.Profile()
+    g.profile = {'profiler': profiler, 'mode': mode, 'sampled': sampled, 'started': time.perf_counter()}
+    profiler.enable()
+
+def _stop_request_profile():
+    """Stop this request's profiler, if it has one; returns its state once."""
+    profile = g.pop('profile', None)
+    if profile and 'profiler' in profile:
+        profile['profiler'].disable()
+        profile['duration'] = time.perf_counter() - profile['started']
+        _profiler_lock.release()
+    return profile
+
+def _finish_request_profile(response):
+    profile = _stop_request_profile()
+    if not profile:
+        return response
+    if profile.get('busy'):
+        if profile['mode']:
+            response.headers['X-Profile-Status'] = 'busy'
+        return response
+    
+    profiler = profile['profiler']
+    profiler.create_stats()
+    summary = {
+        'method': request.method,
+        'path': request.path,
+        'route': request.url_rule.rule if request.url_rule else None,
+        'status': response.status_code,
+        'duration_ms': round(profile['duration'] * 1000, 3),
+        'recorded_at': datetime.now().isoformat(timespec='seconds'),
+        'sampled': profile['sampled'],
+        'function_count': len(profiler.stats)
+    }
+    profile_id = profile_store.add(summary, profiler.stats)
+    if profile['mode']:
+        response.headers['X-Profile-Id'] = str(profile_id)
+        if profile['mode'] == 'inline' and response.is_json and not response.is_streamed:
+            payload = response.get_json(silent=True)
+            if isinstance(payload, dict):
+                payload['_profile'] = {**summary, 'functions': top_functions(profiler.stats)}
+                response.set_data(app.json.dumps(payload))
+    return response
+
+def _abort_request_profile(exc):
+    _stop_request_profile()
+
+app.before_request(_start_request_profile)
+app.after_request(_finish_request_profile)
+app.teardown_request(_abort_request_profile)
+
+@app.route('/api/admin/profiles')
+def admin_get_profiles():
+    """Stored request profiles, newest first."""
+    if not check_admin_auth():
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    return jsonify({
+        'sample_rate': PROFILE_SAMPLE_RATE,
+        'capacity': PROFILE_STORE_SIZE,
+        'profiles': profile_store.summaries()
+    })
+
+@app.route('/api/admin/profiles/<int:profile_id>')
+def admin_get_profile(profile_id):
+    """Top functions of one stored profile (`?sort=cumulative|tottime|calls&limit=`)."""
+    if not check_admin_auth():
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    stored = profile_store.get(profile_id)
+    if stored is None:
+        return jsonify({'error': 'Profile not found'}), 404
+    sort = request.args.get('sort', 'cumulative')
+    if sort not in PROFILE_SORT_KEYS:
+        return jsonify({'error': f'sort must be one of {", ".join(PROFILE_SORT_KEYS)}'}), 400
+    limit = max(request.args.get('limit', PROFILE_TOP_FUNCTIONS, type=int), 1)
+    
+    summary, stats = stored
+    return jsonify({**summary, 'sort': sort, 'functions': top_functions(stats, sort, limit)})
+
+@app.route('/api/admin/profiles/<int:profile_id>/download')
+def admin_download_profile(profile_id):
+    """The raw profile in pstats format, e.g. for `python -m pstats` or snakeviz."""
+    if not check_admin_auth():
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    stored = profile_store.get(profile_id)
+    if stored is None:
+        return jsonify({'error': 'Profile not found'}), 404
+    response = app.response_class(marshal.dumps(stored[1]), mimetype='application/octet-stream')
+    response.headers['Content-Disposition'] = f'attachment; filename=profile-{profile_id}.prof'
+    return response
+
 # Database Models
 class Specialty(db.Model):
     __tablename__ = 'specialties'
@@ -37,6 +674,13 @@ class Doctor(db.Model):
     image_url = db.Column(db.String(200))
     rating = db.Column(db.Float, default=0.0)
     review_count = db.Column(db.Integer, default=0)
+    # Running review totals, kept current by apply_review_to_doctor
+    rating_sum = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_count_1 = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_count_2 = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_count_3 = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_count_4 = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_count_5 = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     # Premium features
     estimated_wait_time = db.Column(db.Integer, default=15)  # minutes
     consultation_types = db.Column(db.String(200), default='in-person,video,phone')  # comma-separated
@@ -49,15 +693,8 @@ class Doctor(db.Model):
     def full_name(self):
         return f"Dr. {self.first_name} {self.last_name}"
     
-    def update_rating(self):
-        reviews = Review.query.filter_by(doctor_id=self.id).all()
-        if reviews:
-            self.rating = round(sum(r.rating for r in reviews) / len(reviews), 1)
-            self.review_count = len(reviews)
-        else:
-            self.rating = 0.0
-            self.review_count = 0
-        db.session.commit()
+    def get_rating_histogram(self):
+        return {stars: getattr(self, f'rating_count_{stars}') or 0 for stars in REVIEW_RATINGS}
     
     def get_consultation_types_list(self):
         return self.consultation_types.split(',') if self.consultation_types else ['in-person']
@@ -69,8 +706,22 @@ class Patient(db.Model):
     last_name = db.Column(db.String(50), nullable=False)
     email = db.Column(db.String(100), nullable=False)
     phone = db.Column(db.String(20))
+    # Visit statistics kept by refresh_patient_visit_stats() for the admin patient sorts
+    appointment_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    last_visit = db.Column(db.DateTime)
     appointments = db.relationship('Appointment', backref='patient', lazy=True)
     favorites = db.relationship('FavoriteDoctor', backref='patient', lazy=True, cascade='all, delete-orphan')
+    
+    # Access paths: lookup by email, name and statistics sorts, case-insensitive prefix search
+    __table_args__ = (
+        db.Index('ix_patients_email', 'email'),
+        db.Index('ix_patients_name', 'last_name', 'first_name'),
+        db.Index('ix_patients_appointment_count', 'appointment_count', 'id'),
+        db.Index('ix_patients_last_visit', 'last_visit', 'id'),
+        db.Index('ix_patients_email_nocase', db.text('email COLLATE NOCASE')),
+        db.Index('ix_patients_first_name_nocase', db.text('first_name COLLATE NOCASE')),
+        db.Index('ix_patients_last_name_nocase', db.text('last_name COLLATE NOCASE')),
+    )
 
 class Appointment(db.Model):
     __tablename__ = 'appointments'
@@ -86,6 +737,18 @@ class Appointment(db.Model):
     original_appointment_id = db.Column(db.Integer, db.ForeignKey('appointments.id'), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     review = db.relationship('Review', backref='appointment', uselist=False, lazy=True)
+    
+    # Access paths: doctor calendars, patient histories, admin status filters and date paging, recent activity
+    __table_args__ = (
+        db.Index('ix_appointments_doctor_date_status', 'doctor_id', 'appointment_date', 'status'),
+        db.Index('ix_appointments_patient_date', 'patient_id', 'appointment_date'),
+        db.Index('ix_appointments_status_date', 'status', 'appointment_date'),
+        db.Index('ix_appointments_created_at', 'created_at'),
+        db.Index('ix_appointments_date', 'appointment_date'),
+        # Backstop against double-booking: one active appointment per doctor and start time
+        db.Index('uq_appointments_active_slot', 'doctor_id', 'appointment_date', unique=True,
+                 sqlite_where=db.text("status != 'cancelled'")),
+    )
 
 class Review(db.Model):
     __tablename__ = 'reviews'
@@ -96,6 +759,9 @@ class Review(db.Model):
     rating = db.Column(db.Integer, nullable=False)  # 1-5 stars
     comment = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    patient = db.relationship('Patient', lazy=True)
+    
+    __table_args__ = (db.Index('ix_reviews_doctor_created', 'doctor_id', 'created_at'),)
 
 class FavoriteDoctor(db.Model):
     __tablename__ = 'favorite_doctors'
@@ -115,25 +781,317 @@ class DoctorAvailability(db.Model):
     start_time = db.Column(db.Time, nullable=False)
     end_time = db.Column(db.Time, nullable=False)
     is_available = db.Column(db.Boolean, default=True)
+    
+    __table_args__ = (db.Index('ix_doctor_availability_doctor_day', 'doctor_id', 'day_of_week'),)
+
+class Reminder(db.Model):
+    """Outbox of appointment reminders: one row per appointment start time."""
+    __tablename__ = 'reminders'
+    id = db.Column(db.Integer, primary_key=True)
+    appointment_id = db.Column(db.Integer, db.ForeignKey('appointments.id'), nullable=False)
+    patient_id = db.Column(db.Integer, db.ForeignKey('patients.id'), nullable=False)
+    appointment_date = db.Column(db.DateTime, nullable=False)  # start time the reminder was issued for
+    due_at = db.Column(db.DateTime, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, delivered, skipped, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    last_error = db.Column(db.Text)
+    claimed_at = db.Column(db.DateTime)
+    delivered_at = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    appointment = db.relationship('Appointment', lazy=True)
+    
+    # Access paths: dispatch in due order, a patient's reminders; rescheduling issues a new row,
+    # moving back to an earlier start time reissues that time's skipped row
+    __table_args__ = (
+        db.Index('uq_reminders_appointment_date', 'appointment_id', 'appointment_date', unique=True),
+        db.Index('ix_reminders_status_due', 'status', 'due_at'),
+        db.Index('ix_reminders_patient_date', 'patient_id', 'appointment_date'),
+    )
+
+class SlotHold(db.Model):
+    """Short-lived reservation of a slot while a booking form is filled in (database hold mode)."""
+    __tablename__ = 'slot_holds'
+    id = db.Column(db.Integer, primary_key=True)
+    token = db.Column(db.String(64), nullable=False)
+    doctor_id = db.Column(db.Integer, db.ForeignKey('doctors.id'), nullable=False)
+    slot_time = db.Column(db.DateTime, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+    session_id = db.Column(db.String(64))  # browser session that placed the hold; a session keeps at most one
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # Access paths: lookup by token, overlap checks per doctor, expiry sweeps, a session's hold
+    __table_args__ = (
+        db.Index('uq_slot_holds_token', 'token', unique=True),
+        db.Index('ix_slot_holds_doctor_slot', 'doctor_id', 'slot_time'),
+        db.Index('ix_slot_holds_expires', 'expires_at'),
+        db.Index('ix_slot_holds_session', 'session_id'),
+    )
+
+class CacheVersion(db.Model):
+    """Version counter per cached entity; bumping one invalidates its HTTP caches."""
+    __tablename__ = 'cache_versions'
+    key = db.Column(db.String(150), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+class SchedulerLease(db.Model):
+    """Which process runs a background job, until when, and when any process last finished a pass of it."""
+    __tablename__ = 'scheduler_leases'
+    name = db.Column(db.String(50), primary_key=True)
+    holder = db.Column(db.String(100))
+    expires_at = db.Column(db.DateTime)
+    last_pass_at = db.Column(db.DateTime)
+
+# Star ratings a review can carry; anything else is kept out of the rating totals
+REVIEW_RATINGS = range(1, 6)
+
+def apply_review_to_doctor(doctor_id, rating, delta=1):
+    """
+    Fold one review into a doctor's running rating totals with a single UPDATE
+    in the current transaction, so it commits together with the review write.
+    Pass delta=-1 to take a deleted review back out. Legacy ratings outside
+    1-5 are left out of the totals, as in recompute_doctor_ratings().
+    """
+    if rating not in REVIEW_RATINGS:
+        return
+    new_count = db.func.coalesce(Doctor.review_count, 0) + delta
+    new_sum = Doctor.rating_sum + delta * rating
+    histogram_column = getattr(Doctor, f'rating_count_{rating}')
+    Doctor.query.filter_by(id=doctor_id).update({
+        Doctor.rating_sum: new_sum,
+        Doctor.review_count: new_count,
+        histogram_column: histogram_column + delta,
+        Doctor.rating: db.case(
+            (new_count > 0, db.func.round(new_sum * 1.0 / new_count, 1)),
+            else_=0.0
+        )
+    }, synchronize_session=False)
+
+def recompute_doctor_ratings():
+    """
+    Rebuild every doctor's rating totals and histogram from the reviews table,
+    skipping ratings outside 1-5. Used to repair drift; returns the number of
+    doctors whose totals changed.
+    """
+    totals = {row.doctor_id: row for row in db.session.query(
+        Review.doctor_id,
+        db.func.count(Review.id).label('review_count'),
+        db.func.sum(Review.rating).label('rating_sum'),
+        *[db.func.sum(db.case((Review.rating == stars, 1), else_=0)).label(f'rating_count_{stars}')
+          for stars in REVIEW_RATINGS]
+    ).filter(Review.rating.between(REVIEW_RATINGS[0], REVIEW_RATINGS[-1])).group_by(Review.doctor_id)}
+    
+    changed = []
+    for doctor in Doctor.query.all():
+        row = totals.get(doctor.id)
+        values = {
+            'review_count': row.review_count if row else 0,
+            'rating_sum': row.rating_sum if row else 0,
+            'rating': round(row.rating_sum / row.review_count, 1) if row else 0.0,
+        }
+        for stars in REVIEW_RATINGS:
+            values[f'rating_count_{stars}'] = getattr(row, f'rating_count_{stars}') if row else 0
+        
+        if any(getattr(doctor, field) != value for field, value in values.items()):
+            for field, value in values.items():
+                setattr(doctor, field, value)
+            changed.append(doctor.id)
+    
+    if changed:
+        bump_cache_versions('doctors', *[f'doctor:{doctor_id}' for doctor_id in changed])
+    db.session.commit()
+    return len(changed)
+
+def refresh_patient_visit_stats(patient_ids=None):
+    """
+    Recompute the appointment_count and last_visit of the given patients (every
+    patient when None) from the appointments table with a single UPDATE in the
+    current transaction, so they commit together with the appointment write.
+    """
+    query = Patient.query
+    if patient_ids is not None:
+        patient_ids = set(patient_ids)
+        if not patient_ids:
+            return 0
+        query = query.filter(Patient.id.in_(patient_ids))
+    return query.update({
+        Patient.appointment_count: db.select(db.func.count(Appointment.id)).where(
+            Appointment.patient_id == Patient.id
+        ).scalar_subquery(),
+        Patient.last_visit: db.select(db.func.max(Appointment.appointment_date)).where(
+            Appointment.patient_id == Patient.id
+        ).scalar_subquery()
+    }, synchronize_session=False)
+
+def ensure_columns():
+    """
+    Add model-declared columns missing from existing tables.
+    create_all() never alters a table, so columns added to a model after a
+    database was created need this check on startup. Only nullable columns
+    or columns with a server default can be added this way.
+    Returns the added columns as 'table.column' names.
+    """
+    inspector = db.inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+    added = []
+    
+    with db.engine.begin() as connection:
+        for table in db.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns:
+                    continue
+                ddl = f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(db.engine.dialect)}'
+                if column.server_default is not None:
+                    if not column.nullable:
+                        ddl += ' NOT NULL'
+                    ddl += f' DEFAULT {column.server_default.arg}'
+                connection.execute(db.text(ddl))
+                added.append(f'{table.name}.{column.name}')
+    
+    return added
+
+def ensure_indexes():
+    """
+    Create any model-declared index that is missing from the database.
+    create_all() only adds indexes when it creates a table, so databases
+    created before an index was declared need this check on startup.
+    Returns the names of the indexes that were created.
+    """
+    inspector = db.inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+    created = []
+    
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing_indexes = {ix['name'] for ix in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing_indexes:
+                try:
+                    index.create(bind=db.engine)
+                except db.exc.IntegrityError:
+                    # Existing rows violate a unique index; leave it for an operator to resolve
+                    app.logger.error('Could not create unique index %s: duplicate rows exist', index.name)
+                    continue
+                created.append(index.name)
+    
+    return created
+
+# ============ CHANGE TRACKING ============
+# Sessions record which tables each transaction wrote to; after a successful
+# commit the registered listeners are told, so caches can invalidate themselves
+# without every write endpoint having to know about every cache.
+
+_committed_tables_listeners = []
+
+def on_tables_committed(listener):
+    """Register a callback that receives the set of table names written by each commit."""
+    _committed_tables_listeners.append(listener)
+    return listener
+
+def _touched_tables(session):
+    return session.info.setdefault('touched_tables', set())
+
+@event.listens_for(Session, 'before_flush')
+def _record_flushed_tables(session, flush_context, instances):
+    touched = _touched_tables(session)
+    for obj in itertools.chain(session.new, session.dirty, session.deleted):
+        touched.add(obj.__table__.name)
+
+@event.listens_for(Session, 'do_orm_execute')
+def _record_bulk_write_tables(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        mapper = orm_execute_state.bind_mapper
+        if mapper is not None:
+            _touched_tables(orm_execute_state.session).add(mapper.local_table.name)
+
+@event.listens_for(Session, 'after_commit')
+def _notify_committed_tables(session):
+    touched = session.info.pop('touched_tables', None)
+    if touched:
+        for listener in _committed_tables_listeners:
+            listener(touched)
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_touched_tables(session):
+    session.info.pop('touched_tables', None)
+
+class SnapshotCache:
+    """
+    Holds one computed payload for at most `ttl_seconds`. Concurrent readers of
+    an expired snapshot wait for a single rebuild instead of each running it.
+    """
+    
+    def __init__(self, ttl_seconds, name=None):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._value = None
+        self._built_at = None
+        self._stats = metrics.cache(name) if name else None
+    
+    def get(self, build):
+        """Return (value, age_in_seconds), rebuilding the value if it expired."""
+        with self._lock:
+            now = time.monotonic()
+            expired = self._value is None or now - self._built_at >= self.ttl_seconds
+            if expired:
+                self._value = build()
+                self._built_at = time.monotonic()
+                now = self._built_at
+            if self._stats:
+                self._stats.record(hits=int(not expired), misses=int(expired))
+            return self._value, now - self._built_at
+    
+    def invalidate(self):
+        with self._lock:
+            self._value = None
+
+SAMPLE_SPECIALTIES = [
+    ('Cardiology', 'Heart and cardiovascular system'),
+    ('Dermatology', 'Skin, hair, and nail conditions'),
+    ('Pediatrics', 'Medical care for infants, children, and adolescents'),
+    ('Orthopedics', 'Musculoskeletal system and injuries'),
+    ('Neurology', 'Brain, spine, and nervous system disorders'),
+    ('General Medicine', 'Primary healthcare and general checkups'),
+    ('Ophthalmology', 'Eye care and vision health'),
+    ('Dentistry', 'Oral health and dental care'),
+]
+
+def bootstrap_schema():
+    """
+    Bring an existing or new database up to the current schema: tables,
+    columns (backfilling the derived ones), indexes and the doctor search
+    index. Needs an app context; init_db and the data commands run it first.
+    """
+    db.create_all()
+    added_columns = ensure_columns()
+    if added_columns:
+        app.logger.warning('Added missing columns: %s', ', '.join(added_columns))
+    if any(column.startswith('doctors.rating_') for column in added_columns):
+        recompute_doctor_ratings()
+    if any(column.startswith('patients.') for column in added_columns):
+        refresh_patient_visit_stats()
+        db.session.commit()
+    created_indexes = ensure_indexes()
+    if created_indexes:
+        app.logger.warning('Created missing indexes: %s', ', '.join(created_indexes))
+    # Favorites were once versioned per patient email; drop those unused counters
+    CacheVersion.query.filter(CacheVersion.key.like('favorites:%')).delete(synchronize_session=False)
+    db.session.commit()
+    ensure_doctor_search_index()
 
 # Initialize database with sample data
 def init_db():
     with app.app_context():
-        db.create_all()
+        bootstrap_schema()
         
         # Add sample specialties if none exist
         if not Specialty.query.first():
-            specialties = [
-                Specialty(name='Cardiology', description='Heart and cardiovascular system'),
-                Specialty(name='Dermatology', description='Skin, hair, and nail conditions'),
-                Specialty(name='Pediatrics', description='Medical care for infants, children, and adolescents'),
-                Specialty(name='Orthopedics', description='Musculoskeletal system and injuries'),
-                Specialty(name='Neurology', description='Brain, spine, and nervous system disorders'),
-                Specialty(name='General Medicine', description='Primary healthcare and general checkups'),
-                Specialty(name='Ophthalmology', description='Eye care and vision health'),
-                Specialty(name='Dentistry', description='Oral health and dental care')
-            ]
-            db.session.add_all(specialties)
+            db.session.execute(db.insert(Specialty), [
+                {'name': name, 'description': description} for name, description in SAMPLE_SPECIALTIES
+            ])
             db.session.commit()
         
         # Add sample doctors if none exist
@@ -208,18 +1166,240 @@ def init_db():
             
             db.session.commit()
             
-            # Add default availability for each doctor
-            for doctor in doctors:
-                for day in range(5):  # Monday to Friday
-                    availability = DoctorAvailability(
-                        doctor_id=doctor.id,
-                        day_of_week=day,
-                        start_time=datetime.strptime('09:00', '%H:%M').time(),
-                        end_time=datetime.strptime('17:00', '%H:%M').time(),
-                        is_available=True
-                    )
-                    db.session.add(availability)
+            # Add default availability for each doctor (Monday to Friday) in one executemany
+            start_time = datetime.strptime('09:00', '%H:%M').time()
+            end_time = datetime.strptime('17:00', '%H:%M').time()
+            db.session.execute(db.insert(DoctorAvailability), [
+                {'doctor_id': doctor.id, 'day_of_week': day, 'start_time': start_time,
+                 'end_time': end_time, 'is_available': True}
+                for doctor in doctors for day in range(5)
+            ])
             db.session.commit()
+            rebuild_doctor_search_index()
+
+# ============ CATALOG HTTP CACHING ============
+# Catalog responses are cached per URL and tagged with a strong ETag derived
+# from the version counters of the entities they show. Writes bump those
+# counters in the same transaction, so every worker sees the change on its
+# next request and revalidating clients get 304 Not Modified otherwise.
+
+CATALOG_CACHE_MAX_AGE = int(os.environ.get('CATALOG_CACHE_MAX_AGE', 0))
+CATALOG_CACHE_MAX_ENTRIES = int(os.environ.get('CATALOG_CACHE_MAX_ENTRIES', 1024))
+
+def bump_cache_versions(*keys):
+    """
+    Increment version counters in the caller's transaction with one upsert, so
+    concurrent first bumps of a key cannot both try to insert it. Returns the
+    new version of each key.
+    """
+    keys = list(dict.fromkeys(keys))
+    if not keys:
+        return {}
+    upsert = sqlite_insert(CacheVersion).values([{'key': key, 'version': 1} for key in keys])
+    return dict(db.session.execute(upsert.on_conflict_do_update(
+        index_elements=[CacheVersion.key],
+        set_={'version': CacheVersion.version + 1}
+    ).returning(CacheVersion.key, CacheVersion.version)).all())
+
+def bump_appointments_version(doctor_id):
+    """Bump the counter of a doctor's booked appointments; returns its new version for the index."""
+    key = f'appointments:{doctor_id}'
+    return bump_cache_versions(key)[key]
+
+def get_cache_versions(keys):
+    """Read the current version of each key with one query; unknown keys are 0."""
+    versions = dict(db.session.query(CacheVersion.key, CacheVersion.version).filter(
+        CacheVersion.key.in_(keys)
+    ).all())
+    return tuple(versions.get(key, 0) for key in keys)
+
+class ResponseCache:
+    """Bounded LRU map of URL -> (etag, body, mimetype)."""
+    
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+    
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+    
+    def set(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+catalog_response_cache = ResponseCache(CATALOG_CACHE_MAX_ENTRIES)
+catalog_cache_stats = metrics.cache('catalog_responses')
+
+def versioned_cache(version_keys, private=False):
+    """
+    Cache a GET endpoint's successful responses and support conditional requests.
+    `version_keys` receives the view arguments and returns the counter keys the
+    response depends on. Private responses (per-patient data) are only cached
+    by the browser, never by shared proxies; `private` may be a callable that
+    decides per request.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(**kwargs):
+            keys = version_keys(**kwargs)
+            versions = get_cache_versions(keys)
+            cache_key = request.full_path
+            etag = hashlib.blake2b(repr((cache_key, keys, versions)).encode(), digest_size=16).hexdigest()
+            
+            cached = catalog_response_cache.get(cache_key)
+            if cached is not None and cached[0] == etag:
+                catalog_cache_stats.record(hits=1)
+                response = app.response_class(cached[1], mimetype=cached[2])
+            else:
+                catalog_cache_stats.record(misses=1)
+                response = make_response(view(**kwargs))
+                if response.status_code != 200:
+                    return response
+                catalog_response_cache.set(cache_key, (etag, response.get_data(), response.mimetype))
+            
+            is_private = private() if callable(private) else private
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = (
+                f"{'private' if is_private else 'public'}, max-age={CATALOG_CACHE_MAX_AGE}, must-revalidate"
+            )
+            return response.make_conditional(request)
+        return wrapper
+    return decorator
+
+def doctors_version_keys():
+    # One counter covers every patient's favorites, so the table stays a fixed size
+    return ['doctors', 'favorites'] if request.args.get('patient_email') else ['doctors']
+
+def has_patient_email():
+    return bool(request.args.get('patient_email'))
+
+# ============ DOCTOR SEARCH ============
+# Full-text index over doctor name, specialty and bio in an SQLite FTS5 table
+# whose rowid is the doctor id. Admin doctor writes keep it in sync; when the
+# SQLite build lacks FTS5, search falls back to substring matching on names.
+# Each process sets the index up before its first request (or on first use
+# outside a request), creating the table and rebuilding any stale entries.
+
+SEARCH_DEFAULT_PER_PAGE = 10
+SEARCH_MAX_PER_PAGE = 50
+# How much each rating star moves a doctor up the results, relative to bm25
+SEARCH_RATING_WEIGHT = 0.3
+
+# None until this process has checked for FTS5; see doctor_search_available()
+doctor_search_enabled = None
+_doctor_search_setup_lock = threading.Lock()
+
+# What the index should hold: (rowid, name, specialty, bio) per doctor
+DOCTOR_SEARCH_ROWS = (
+    "SELECT d.id, d.first_name || ' ' || d.last_name, s.name, coalesce(d.bio, '') "
+    "FROM doctors d JOIN specialties s ON s.id = d.specialty_id"
+)
+
+def _fill_doctor_search(connection):
+    connection.execute(db.text('DELETE FROM doctor_search'))
+    connection.execute(db.text(f'INSERT INTO doctor_search (rowid, name, specialty, bio) {DOCTOR_SEARCH_ROWS}'))
+
+def ensure_doctor_search_index():
+    """
+    Create the FTS5 table if needed and rebuild it when any entry differs from
+    the doctor it indexes (added, removed, renamed or edited doctors). Runs on
+    its own connection, so a caller's open transaction is left alone.
+    Returns whether FTS5 search is available.
+    """
+    global doctor_search_enabled
+    try:
+        with db.engine.begin() as connection:
+            connection.execute(db.text(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS doctor_search USING fts5("
+                "name, specialty, bio, tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+            ))
+            stale = connection.execute(db.text(
+                f'SELECT EXISTS ({DOCTOR_SEARCH_ROWS} EXCEPT SELECT rowid, name, specialty, bio FROM doctor_search) '
+                f'OR EXISTS (SELECT rowid, name, specialty, bio FROM doctor_search EXCEPT {DOCTOR_SEARCH_ROWS})'
+            )).scalar()
+            if stale:
+                _fill_doctor_search(connection)
+    except db.exc.OperationalError as e:
+        if 'fts5' not in str(e).lower():
+            raise
+        app.logger.warning('SQLite FTS5 is unavailable; doctor search uses substring matching')
+        doctor_search_enabled = False
+        return False
+    doctor_search_enabled = True
+    return True
+
+def doctor_search_available():
+    """Whether the FTS5 index is in use, setting it up on this process's first call."""
+    if doctor_search_enabled is None:
+        with _doctor_search_setup_lock:
+            if doctor_search_enabled is None:
+                ensure_doctor_search_index()
+    return doctor_search_enabled
+
+def _setup_doctor_search():
+    # Before the request opens a transaction, so setup never waits on the request's own write lock
+    if doctor_search_enabled is None and request.endpoint != 'static':
+        doctor_search_available()
+
+app.before_request(_setup_doctor_search)
+
+def rebuild_doctor_search_index():
+    """Repopulate the search index from the doctors table in one statement."""
+    if not doctor_search_available():
+        return
+    _fill_doctor_search(db.session.connection())
+    db.session.commit()
+
+def index_doctor_for_search(doctor):
+    """Add or refresh one doctor's search entry in the current transaction."""
+    if not doctor_search_available():
+        return
+    specialty = db.session.get(Specialty, doctor.specialty_id)
+    remove_doctor_from_search(doctor.id)
+    db.session.execute(db.text(
+        'INSERT INTO doctor_search (rowid, name, specialty, bio) VALUES (:id, :name, :specialty, :bio)'
+    ), {
+        'id': doctor.id,
+        'name': f'{doctor.first_name} {doctor.last_name}',
+        'specialty': specialty.name if specialty else '',
+        'bio': doctor.bio or ''
+    })
+
+def remove_doctor_from_search(doctor_id):
+    if not doctor_search_available():
+        return
+    db.session.execute(db.text('DELETE FROM doctor_search WHERE rowid = :id'), {'id': doctor_id})
+
+def build_search_match(query):
+    """Turn free text into an FTS5 query where every word is a quoted prefix term."""
+    terms = re.findall(r'\w+', query.lower())
+    return ' '.join(f'"{term}"*' for term in terms)
+
+def search_doctor_ids(query, limit, offset):
+    """Return ranked doctor ids: bm25 relevance (name > specialty > bio) blended with rating."""
+    match = build_search_match(query)
+    if not match:
+        return []
+    rows = db.session.execute(db.text(
+        'SELECT d.id FROM doctor_search '
+        'JOIN doctors d ON d.id = doctor_search.rowid '
+        'WHERE doctor_search MATCH :match '
+        'ORDER BY bm25(doctor_search, 10.0, 4.0, 1.0) - :rating_weight * coalesce(d.rating, 0), d.id '
+        'LIMIT :limit OFFSET :offset'
+    ), {'match': match, 'rating_weight': SEARCH_RATING_WEIGHT, 'limit': limit, 'offset': offset})
+    return [row[0] for row in rows]
 
 # Routes
 @app.route('/')
@@ -234,6 +1414,7 @@ def favicon():
     return Response(transparent_pixel, mimetype='image/png')
 
 @app.route('/api/specialties')
+@versioned_cache(lambda: ['specialties'])
 def get_specialties():
     specialties = Specialty.query.all()
     return jsonify([{
@@ -243,11 +1424,12 @@ def get_specialties():
     } for s in specialties])
 
 @app.route('/api/doctors')
+@versioned_cache(doctors_version_keys, private=has_patient_email)
 def get_doctors():
     specialty_id = request.args.get('specialty_id', type=int)
     patient_email = request.args.get('patient_email')
     
-    query = Doctor.query
+    query = Doctor.query.options(db.joinedload(Doctor.specialty))
     if specialty_id:
         query = query.filter_by(specialty_id=specialty_id)
     
@@ -256,10 +1438,11 @@ def get_doctors():
     # Get patient's favorites if email provided
     favorite_doctor_ids = set()
     if patient_email:
-        patient = Patient.query.filter_by(email=patient_email).first()
-        if patient:
-            favorites = FavoriteDoctor.query.filter_by(patient_id=patient.id).all()
-            favorite_doctor_ids = {f.doctor_id for f in favorites}
+        favorite_doctor_ids = {
+            row.doctor_id for row in db.session.query(FavoriteDoctor.doctor_id)
+            .join(Patient, Patient.id == FavoriteDoctor.patient_id)
+            .filter(Patient.email == patient_email)
+        }
     
     return jsonify([{
         'id': d.id,
@@ -279,8 +1462,9 @@ def get_doctors():
     } for d in doctors])
 
 @app.route('/api/doctors/<int:doctor_id>')
+@versioned_cache(lambda doctor_id: [f'doctor:{doctor_id}'])
 def get_doctor(doctor_id):
-    doctor = Doctor.query.get_or_404(doctor_id)
+    doctor = Doctor.query.options(db.joinedload(Doctor.specialty)).filter_by(id=doctor_id).first_or_404()
     return jsonify({
         'id': doctor.id,
         'full_name': doctor.full_name,
@@ -290,6 +1474,7 @@ def get_doctor(doctor_id):
         'bio': doctor.bio,
         'rating': doctor.rating,
         'review_count': doctor.review_count,
+        'rating_histogram': doctor.get_rating_histogram(),
         'estimated_wait_time': doctor.estimated_wait_time,
         'consultation_types': doctor.get_consultation_types_list(),
         'is_verified': doctor.is_verified,
@@ -298,17 +1483,28 @@ def get_doctor(doctor_id):
 
 @app.route('/api/doctors/search')
 def search_doctors():
+    """Type-ahead doctor search by name, specialty or bio, ranked by relevance and rating."""
     query = request.args.get('q', '').lower()
     if not query or len(query) < 2:
         return jsonify([])
     
-    doctors = Doctor.query.filter(
-        db.or_(
-            db.func.lower(Doctor.first_name).contains(query),
-            db.func.lower(Doctor.last_name).contains(query),
-            db.func.lower(Doctor.first_name + ' ' + Doctor.last_name).contains(query)
-        )
-    ).limit(10).all()
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', SEARCH_DEFAULT_PER_PAGE, type=int), 1), SEARCH_MAX_PER_PAGE)
+    
+    if doctor_search_available():
+        doctor_ids = search_doctor_ids(query, per_page, (page - 1) * per_page)
+        doctors_by_id = {d.id: d for d in Doctor.query.options(
+            db.joinedload(Doctor.specialty)
+        ).filter(Doctor.id.in_(doctor_ids)).all()} if doctor_ids else {}
+        doctors = [doctors_by_id[doctor_id] for doctor_id in doctor_ids if doctor_id in doctors_by_id]
+    else:
+        doctors = Doctor.query.options(db.joinedload(Doctor.specialty)).filter(
+            db.or_(
+                db.func.lower(Doctor.first_name).contains(query),
+                db.func.lower(Doctor.last_name).contains(query),
+                db.func.lower(Doctor.first_name + ' ' + Doctor.last_name).contains(query)
+            )
+        ).order_by(Doctor.rating.desc(), Doctor.id).limit(per_page).offset((page - 1) * per_page).all()
     
     return jsonify([{
         'id': d.id,
@@ -318,9 +1514,10 @@ def search_doctors():
     } for d in doctors])
 
 @app.route('/api/doctors/<int:doctor_id>/availability')
+@versioned_cache(lambda doctor_id: [f'doctor:{doctor_id}'])
 def get_doctor_availability(doctor_id):
     """Get doctor's weekly availability schedule."""
-    doctor = Doctor.query.get_or_404(doctor_id)
+    doctor = db.get_or_404(Doctor, doctor_id)
     availability = DoctorAvailability.query.filter_by(doctor_id=doctor_id).all()
     
     days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
@@ -343,8 +1540,11 @@ def get_doctor_availability(doctor_id):
     })
 
 @app.route('/api/doctors/<int:doctor_id>/reviews')
+@versioned_cache(lambda doctor_id: [f'doctor:{doctor_id}'])
 def get_doctor_reviews(doctor_id):
-    reviews = Review.query.filter_by(doctor_id=doctor_id).order_by(Review.created_at.desc()).all()
+    reviews = Review.query.options(db.joinedload(Review.patient)).filter_by(
+        doctor_id=doctor_id
+    ).order_by(Review.created_at.desc()).all()
     return jsonify([{
         'id': r.id,
         'rating': r.rating,
@@ -360,13 +1560,11 @@ def get_favorites():
     if not email:
         return jsonify({'error': 'Email required'}), 400
     
-    patient = Patient.query.filter_by(email=email).first()
-    if not patient:
-        return jsonify([])
-    
-    favorites = FavoriteDoctor.query.filter_by(patient_id=patient.id).all()
-    doctor_ids = [f.doctor_id for f in favorites]
-    doctors = Doctor.query.filter(Doctor.id.in_(doctor_ids)).all() if doctor_ids else []
+    doctors = Doctor.query.options(db.joinedload(Doctor.specialty)).join(
+        FavoriteDoctor, FavoriteDoctor.doctor_id == Doctor.id
+    ).join(
+        Patient, Patient.id == FavoriteDoctor.patient_id
+    ).filter(Patient.email == email).all()
     
     return jsonify([{
         'id': d.id,
@@ -394,6 +1592,7 @@ def toggle_favorite():
         doctor_id=doctor_id
     ).first()
     
+    bump_cache_versions('favorites')
     if existing:
         db.session.delete(existing)
         db.session.commit()
@@ -405,6 +1604,22 @@ def toggle_favorite():
         return jsonify({'favorited': True, 'message': 'Added to favorites'})
 
 # Appointments API
+def conflict_response(doctor_id, requested_date, conflicting, exclude_appointment_id=None):
+    """Build the 409 response for a booking that overlaps an appointment or another patient's hold."""
+    metrics.count_conflict('hold' if isinstance(conflicting, HeldSlot) else 'appointment')
+    next_slot = find_next_free_slot(doctor_id, requested_date, exclude_appointment_id)
+    if isinstance(conflicting, HeldSlot):
+        error = ('This time slot is on hold for another patient who is completing a booking. '
+                 'Please choose another time.')
+    else:
+        conflict_time = conflicting.appointment_date.strftime('%I:%M %p')
+        error = (f'This time slot overlaps with an existing appointment. '
+                 f'The doctor already has an appointment at {conflict_time}.')
+    return jsonify({
+        'error': error,
+        'next_available': next_slot.isoformat() if next_slot else None
+    }), 409
+
 @app.route('/api/appointments')
 def get_appointments():
     email = request.args.get('email')
@@ -415,10 +1630,14 @@ def get_appointments():
     if not patient:
         return jsonify([])
     
-    appointments = Appointment.query.filter_by(patient_id=patient.id).order_by(Appointment.appointment_date.desc()).all()
+    appointments = Appointment.query.options(
+        db.joinedload(Appointment.doctor).joinedload(Doctor.specialty),
+        db.joinedload(Appointment.review)
+    ).filter_by(patient_id=patient.id).order_by(Appointment.appointment_date.desc()).all()
     return jsonify([{
         'id': a.id,
         'doctor_id': a.doctor_id,
+        'patient_id': a.patient_id,
         'doctor_name': a.doctor.full_name,
         'specialty': a.doctor.specialty.name,
         'date': a.appointment_date.isoformat(),
@@ -434,7 +1653,10 @@ def get_appointments():
 
 @app.route('/api/appointments/<int:appointment_id>')
 def get_appointment(appointment_id):
-    appointment = Appointment.query.get_or_404(appointment_id)
+    appointment = Appointment.query.options(
+        db.joinedload(Appointment.doctor).joinedload(Doctor.specialty),
+        db.joinedload(Appointment.patient)
+    ).filter_by(id=appointment_id).first_or_404()
     return jsonify({
         'id': appointment.id,
         'doctor_id': appointment.doctor_id,
@@ -464,26 +1686,40 @@ def create_appointment():
             if not data.get(field):
                 return jsonify({'error': f'{field} is required'}), 400
         
+        try:
+            doctor_id = int(data['doctorId'])
+        except (ValueError, TypeError):
+            return jsonify({'error': 'Invalid doctor ID'}), 400
+        
         # Validate and parse dateTime
         try:
             appointment_date = datetime.fromisoformat(data['dateTime'])
         except (ValueError, TypeError):
             return jsonify({'error': 'Invalid date format'}), 400
         
-        # Check for appointment overlap
+        if db.session.get(Doctor, doctor_id) is None:
+            return jsonify({'error': 'Doctor not found'}), 404
+        
+        # A hold placed by this patient while filling in the form lets the booking through
+        hold_token = data.get('holdToken')
+        
+        # Check for appointment overlap (fast path, no lock taken)
         overlap_exists, conflicting = check_appointment_overlap(
-            data['doctorId'], 
-            appointment_date
+            doctor_id, 
+            appointment_date,
+            hold_token=hold_token
         )
         
         if overlap_exists:
-            conflict_time = conflicting.appointment_date.strftime('%I:%M %p')
-            return jsonify({
-                'error': f'This time slot overlaps with an existing appointment. '
-                         f'The doctor already has an appointment at {conflict_time}.'
-            }), 409
+            return conflict_response(doctor_id, appointment_date, conflicting)
+        
+        # Take the write lock and re-check against the database
+        conflicting = reserve_slot(doctor_id, appointment_date, hold_token=hold_token)
+        if conflicting:
+            db.session.rollback()
+            return conflict_response(doctor_id, appointment_date, conflicting)
         
-        # Create or get patient
+        # Create or get patient; committed together with the appointment
         patient = Patient.query.filter_by(email=data['email']).first()
         if not patient:
             patient = Patient(
@@ -493,10 +1729,10 @@ def create_appointment():
                 phone=data.get('phone', '') or ''
             )
             db.session.add(patient)
-            db.session.commit()
+            db.session.flush()
         
         appointment = Appointment(
-            doctor_id=data['doctorId'],
+            doctor_id=doctor_id,
             patient_id=patient.id,
             appointment_date=appointment_date,
             reason=data.get('reason', '') or '',
@@ -504,7 +1740,13 @@ def create_appointment():
             status='scheduled'
         )
         db.session.add(appointment)
+        db.session.flush()
+        refresh_patient_visit_stats([patient.id])
+        version = bump_appointments_version(doctor_id)
         db.session.commit()
+        appointment_index.sync(appointment, version)
+        if hold_token:
+            slot_holds.release(hold_token, notify=False)
         
         return jsonify({
             'id': appointment.id,
@@ -512,16 +1754,22 @@ def create_appointment():
             'doctor_name': appointment.doctor.full_name,
             'date': appointment.appointment_date.isoformat()
         }), 201
-    except Exception as e:
-        import traceback
-        print(f"Error in create_appointment: {str(e)}")
-        print(traceback.format_exc())
+    except (db.exc.OperationalError, db.exc.TimeoutError):
+        db.session.rollback()
+        return jsonify({'error': 'The booking service is busy, please try again'}), 503
+    except db.exc.IntegrityError:
+        db.session.rollback()
+        metrics.count_conflict('race')
+        return jsonify({'error': 'This time slot was just booked by someone else.'}), 409
+    except Exception:
+        db.session.rollback()
+        app.logger.exception('Error in create_appointment')
         return jsonify({'error': 'Internal server error'}), 500
 
 @app.route('/api/appointments/<int:appointment_id>/reschedule', methods=['POST'])
 def reschedule_appointment(appointment_id):
     """Reschedule an existing appointment to a new time slot."""
-    appointment = Appointment.query.get_or_404(appointment_id)
+    appointment = db.get_or_404(Appointment, appointment_id)
     data = request.json
     
     new_date_time = data.get('newDateTime')
@@ -534,24 +1782,44 @@ def reschedule_appointment(appointment_id):
         return jsonify({'error': 'Invalid date format'}), 400
     
     # Check for overlap (excluding this appointment)
+    hold_token = data.get('holdToken')
     overlap_exists, conflicting = check_appointment_overlap(
         appointment.doctor_id,
         new_date,
-        exclude_appointment_id=appointment_id
+        exclude_appointment_id=appointment_id,
+        hold_token=hold_token
     )
     
     if overlap_exists:
-        conflict_time = conflicting.appointment_date.strftime('%I:%M %p')
-        return jsonify({
-            'error': f'This time slot overlaps with an existing appointment. '
-                     f'The doctor already has an appointment at {conflict_time}.'
-        }), 409
-    
-    # Update appointment
-    appointment.appointment_date = new_date
-    appointment.reschedule_count += 1
-    appointment.status = 'rescheduled' if appointment.reschedule_count > 0 else 'scheduled'
-    db.session.commit()
+        return conflict_response(appointment.doctor_id, new_date, conflicting, appointment_id)
+    
+    try:
+        # Take the write lock and re-check against the database
+        conflicting = reserve_slot(appointment.doctor_id, new_date, exclude_appointment_id=appointment_id,
+                                   hold_token=hold_token)
+        if conflicting:
+            db.session.rollback()
+            return conflict_response(appointment.doctor_id, new_date, conflicting, appointment_id)
+        
+        # Update appointment
+        db.session.refresh(appointment)
+        appointment.appointment_date = new_date
+        appointment.reschedule_count += 1
+        appointment.status = 'rescheduled' if appointment.reschedule_count > 0 else 'scheduled'
+        db.session.flush()
+        refresh_patient_visit_stats([appointment.patient_id])
+        version = bump_appointments_version(appointment.doctor_id)
+        db.session.commit()
+    except (db.exc.OperationalError, db.exc.TimeoutError):
+        db.session.rollback()
+        return jsonify({'error': 'The booking service is busy, please try again'}), 503
+    except db.exc.IntegrityError:
+        db.session.rollback()
+        metrics.count_conflict('race')
+        return jsonify({'error': 'This time slot was just booked by someone else.'}), 409
+    appointment_index.sync(appointment, version)
+    if hold_token:
+        slot_holds.release(hold_token, notify=False)
     
     return jsonify({
         'message': 'Appointment rescheduled successfully',
@@ -561,16 +1829,20 @@ def reschedule_appointment(appointment_id):
 
 @app.route('/api/appointments/<int:appointment_id>/cancel', methods=['POST'])
 def cancel_appointment(appointment_id):
-    appointment = Appointment.query.get_or_404(appointment_id)
+    appointment = db.get_or_404(Appointment, appointment_id)
     appointment.status = 'cancelled'
+    version = bump_appointments_version(appointment.doctor_id)
     db.session.commit()
+    appointment_index.sync(appointment, version)
     return jsonify({'message': 'Appointment cancelled'})
 
 @app.route('/api/appointments/<int:appointment_id>/complete', methods=['POST'])
 def complete_appointment(appointment_id):
-    appointment = Appointment.query.get_or_404(appointment_id)
+    appointment = db.get_or_404(Appointment, appointment_id)
     appointment.status = 'completed'
+    version = bump_appointments_version(appointment.doctor_id)
     db.session.commit()
+    appointment_index.sync(appointment, version)
     return jsonify({'message': 'Appointment marked as completed'})
 
 @app.route('/api/appointments/upcoming')
@@ -587,7 +1859,7 @@ def get_upcoming_appointments():
     now = datetime.now()
     tomorrow = now + timedelta(hours=24)
     
-    upcoming = Appointment.query.filter(
+    upcoming = Appointment.query.options(db.joinedload(Appointment.doctor)).filter(
         Appointment.patient_id == patient.id,
         Appointment.status == 'scheduled',
         Appointment.appointment_date >= now,
@@ -605,19 +1877,23 @@ def get_upcoming_appointments():
 def create_review():
     data = request.json
     
+    rating = data.get('rating')
+    if not isinstance(rating, int) or isinstance(rating, bool) or rating not in REVIEW_RATINGS:
+        return jsonify({'error': 'Rating must be a whole number from 1 to 5'}), 400
+    
     review = Review(
         appointment_id=data['appointmentId'],
         doctor_id=data['doctorId'],
         patient_id=data['patientId'],
-        rating=data['rating'],
+        rating=rating,
         comment=data.get('comment', '')
     )
     db.session.add(review)
-    db.session.commit()
     
-    # Update doctor rating
-    doctor = Doctor.query.get(data['doctorId'])
-    doctor.update_rating()
+    # Update doctor rating in the same transaction as the review
+    apply_review_to_doctor(data['doctorId'], rating)
+    bump_cache_versions('doctors', f"doctor:{data['doctorId']}")
+    db.session.commit()
     
     return jsonify({'message': 'Review submitted successfully'}), 201
 
@@ -626,48 +1902,137 @@ def get_available_slots():
     doctor_id = request.args.get('doctor_id', type=int)
     date_str = request.args.get('date')
     appointment_type = request.args.get('appointment_type', 'in-person')
+    hold_token = request.args.get('hold_token')  # the caller's own hold stays listed
     
     if not doctor_id or not date_str:
         return jsonify({'error': 'Doctor ID and date required'}), 400
     
-    date = datetime.strptime(date_str, '%Y-%m-%d').date()
+    try:
+        date = datetime.strptime(date_str, '%Y-%m-%d').date()
+    except ValueError:
+        return jsonify({'error': 'Invalid date format'}), 400
     
-    # Get doctor's availability for this day
-    day_of_week = date.weekday()
-    availability = DoctorAvailability.query.filter_by(
-        doctor_id=doctor_id,
-        day_of_week=day_of_week,
-        is_available=True
-    ).first()
+    if db.session.get(Doctor, doctor_id) is None:
+        return jsonify({'error': 'Doctor not found'}), 404
     
-    if not availability:
+    # Cached slot offsets for the weekday, checked against the day's occupancy bitmap
+    slot_offsets = load_schedules([doctor_id])[doctor_id]
+    if not slot_offsets.get(date.weekday()):
         return jsonify([])  # Doctor not available on this day
     
-    # Generate time slots based on availability
-    slots = []
-    start_hour = availability.start_time.hour
-    end_hour = availability.end_time.hour
-    
-    for hour in range(start_hour, end_hour):
-        for minute in [0, 30]:
-            slot_time = datetime.combine(date, datetime.min.time().replace(hour=hour, minute=minute))
-            
-            # Check if slot is already booked
-            existing = Appointment.query.filter(
-                Appointment.doctor_id == doctor_id,
-                Appointment.appointment_date == slot_time,
-                Appointment.status != 'cancelled'
-            ).first()
-            
-            if not existing and slot_time > datetime.now():
-                slots.append({
-                    'datetime': slot_time.isoformat(),
-                    'time': slot_time.strftime('%I:%M %p'),
-                    'available': True
-                })
+    slots = [serialize_slot(slot_time)
+             for slot_time in find_free_slots(doctor_id, date, slot_offsets, hold_token=hold_token)]
     
     return jsonify(slots)
 
+@app.route('/api/available-slots/range')
+def get_available_slots_range():
+    """Get free slots for every day in a date range (for calendar views)."""
+    doctor_id = request.args.get('doctor_id', type=int)
+    from_str = request.args.get('from')
+    to_str = request.args.get('to')
+    hold_token = request.args.get('hold_token')
+    
+    if not doctor_id or not from_str or not to_str:
+        return jsonify({'error': 'Doctor ID, from and to dates required'}), 400
+    
+    try:
+        start_date = datetime.strptime(from_str, '%Y-%m-%d').date()
+        end_date = datetime.strptime(to_str, '%Y-%m-%d').date()
+    except ValueError:
+        return jsonify({'error': 'Invalid date format'}), 400
+    
+    if end_date < start_date:
+        return jsonify({'error': 'The to date must not be before the from date'}), 400
+    
+    day_count = (end_date - start_date).days + 1
+    if day_count > MAX_SLOT_RANGE_DAYS:
+        return jsonify({'error': f'Date range cannot exceed {MAX_SLOT_RANGE_DAYS} days'}), 400
+    
+    if db.session.get(Doctor, doctor_id) is None:
+        return jsonify({'error': 'Doctor not found'}), 404
+    
+    slot_offsets = load_schedules([doctor_id])[doctor_id]
+    
+    now = datetime.now()
+    days = []
+    for offset in range(day_count):
+        day = start_date + timedelta(days=offset)
+        free = find_free_slots(doctor_id, day, slot_offsets, now=now, hold_token=hold_token)
+        days.append({
+            'date': day.isoformat(),
+            'has_availability': bool(free),
+            'slots': [serialize_slot(slot_time) for slot_time in free]
+        })
+    
+    return jsonify({
+        'doctor_id': doctor_id,
+        'from': start_date.isoformat(),
+        'to': end_date.isoformat(),
+        'days': days
+    })
+
+@app.route('/api/available-slots/first')
+def get_first_available_slots():
+    """
+    Get the earliest open slots across every doctor of a specialty, optionally
+    limited to doctors offering a consultation type. Each doctor's free slots
+    are generated lazily in time order and merged, so the search stops as soon
+    as `limit` slots are found or the horizon of `days` days is exhausted.
+    """
+    specialty_id = request.args.get('specialty_id', type=int)
+    appointment_type = request.args.get('appointment_type')
+    limit = min(max(request.args.get('limit', 5, type=int), 1), FIRST_AVAILABLE_MAX_LIMIT)
+    days = min(max(request.args.get('days', FIRST_AVAILABLE_DEFAULT_DAYS, type=int), 1),
+               FIRST_AVAILABLE_MAX_DAYS)
+    
+    if not specialty_id:
+        return jsonify({'error': 'Specialty ID required'}), 400
+    
+    now = datetime.now()
+    try:
+        start_date = datetime.strptime(request.args['from'], '%Y-%m-%d').date() \
+            if request.args.get('from') else now.date()
+    except ValueError:
+        return jsonify({'error': 'Invalid date format'}), 400
+    
+    if db.session.get(Specialty, specialty_id) is None:
+        return jsonify({'error': 'Specialty not found'}), 404
+    
+    doctors = {
+        d.id: d for d in Doctor.query.filter_by(specialty_id=specialty_id).all()
+        if not appointment_type or appointment_type in d.get_consultation_types_list()
+    }
+    
+    slots = []
+    if doctors:
+        slot_offsets = load_schedules(doctors)
+        
+        def doctor_slots(doctor):
+            # Ties at the same time go to the better-rated doctor
+            for slot_time in iter_free_slots(doctor.id, slot_offsets[doctor.id], start_date, days, now=now):
+                yield slot_time, -(doctor.rating or 0), doctor.id
+        
+        merged = heapq.merge(*(doctor_slots(d) for d in doctors.values() if slot_offsets[d.id]))
+        for slot_time, _, doctor_id in itertools.islice(merged, limit):
+            doctor = doctors[doctor_id]
+            slots.append({
+                **serialize_slot(slot_time),
+                'date': slot_time.date().isoformat(),
+                'doctor_id': doctor.id,
+                'doctor_name': doctor.full_name,
+                'rating': doctor.rating,
+                'estimated_wait_time': doctor.estimated_wait_time
+            })
+    
+    return jsonify({
+        'specialty_id': specialty_id,
+        'appointment_type': appointment_type,
+        'from': start_date.isoformat(),
+        'to': (start_date + timedelta(days=days - 1)).isoformat(),
+        'slots': slots
+    })
+
 @app.route('/api/email-preview', methods=['POST'])
 def generate_email_preview():
     """Generate a mock email preview for booking confirmation."""
@@ -770,7 +2135,18 @@ def admin_get_doctors():
     if not check_admin_auth():
         return jsonify({'error': 'Unauthorized'}), 401
     
-    doctors = Doctor.query.all()
+    appointment_counts = db.session.query(
+        Appointment.doctor_id,
+        db.func.count(Appointment.id).label('appointment_count')
+    ).group_by(Appointment.doctor_id).subquery()
+    
+    rows = db.session.query(
+        Doctor,
+        db.func.coalesce(appointment_counts.c.appointment_count, 0)
+    ).outerjoin(
+        appointment_counts, appointment_counts.c.doctor_id == Doctor.id
+    ).options(db.joinedload(Doctor.specialty)).all()
+    
     return jsonify([{
         'id': d.id,
         'first_name': d.first_name,
@@ -783,12 +2159,12 @@ def admin_get_doctors():
         'bio': d.bio,
         'rating': d.rating,
         'review_count': d.review_count,
-        'appointment_count': len(d.appointments),
+        'appointment_count': appointment_count,
         'estimated_wait_time': d.estimated_wait_time,
         'consultation_types': d.get_consultation_types_list(),
         'is_verified': d.is_verified,
         'years_experience': d.years_experience
-    } for d in doctors])
+    } for d, appointment_count in rows])
 
 @app.route('/api/admin/doctors', methods=['POST'])
 def admin_add_doctor():
@@ -807,7 +2183,7 @@ def admin_add_doctor():
     if existing:
         return jsonify({'error': 'A doctor with this email already exists'}), 409
     
-    specialty = Specialty.query.get(data['specialtyId'])
+    specialty = db.session.get(Specialty, data['specialtyId'])
     if not specialty:
         return jsonify({'error': 'Invalid specialty'}), 400
     
@@ -836,6 +2212,8 @@ def admin_add_doctor():
             is_available=True
         )
         db.session.add(availability)
+    index_doctor_for_search(doctor)
+    bump_cache_versions('doctors', f'doctor:{doctor.id}', f'availability:{doctor.id}')
     db.session.commit()
     
     return jsonify({
@@ -850,7 +2228,7 @@ def admin_update_doctor(doctor_id):
     if not check_admin_auth():
         return jsonify({'error': 'Unauthorized'}), 401
     
-    doctor = Doctor.query.get_or_404(doctor_id)
+    doctor = db.get_or_404(Doctor, doctor_id)
     data = request.get_json()
     
     if data.get('email') and data['email'] != doctor.email:
@@ -864,7 +2242,7 @@ def admin_update_doctor(doctor_id):
     if data.get('lastName'):
         doctor.last_name = data['lastName']
     if data.get('specialtyId'):
-        specialty = Specialty.query.get(data['specialtyId'])
+        specialty = db.session.get(Specialty, data['specialtyId'])
         if not specialty:
             return jsonify({'error': 'Invalid specialty'}), 400
         doctor.specialty_id = data['specialtyId']
@@ -881,6 +2259,8 @@ def admin_update_doctor(doctor_id):
     if 'yearsExperience' in data:
         doctor.years_experience = data['yearsExperience']
     
+    index_doctor_for_search(doctor)
+    bump_cache_versions('doctors', f'doctor:{doctor_id}')
     db.session.commit()
     
     return jsonify({
@@ -899,7 +2279,7 @@ def admin_delete_doctor(doctor_id):
     if not check_admin_auth():
         return jsonify({'error': 'Unauthorized'}), 401
     
-    doctor = Doctor.query.get_or_404(doctor_id)
+    doctor = db.get_or_404(Doctor, doctor_id)
     
     scheduled_appointments = Appointment.query.filter(
         Appointment.doctor_id == doctor_id,
@@ -911,31 +2291,52 @@ def admin_delete_doctor(doctor_id):
             'error': f'Cannot delete doctor with {scheduled_appointments} scheduled appointments. Cancel them first.'
         }), 409
     
+    Reminder.query.filter(Reminder.appointment_id.in_(
+        db.select(Appointment.id).where(Appointment.doctor_id == doctor_id)
+    )).delete(synchronize_session=False)
+    patient_ids = db.session.execute(
+        db.select(Appointment.patient_id).where(Appointment.doctor_id == doctor_id).distinct()
+    ).scalars().all()
     Appointment.query.filter_by(doctor_id=doctor_id).delete()
+    refresh_patient_visit_stats(patient_ids)
     Review.query.filter_by(doctor_id=doctor_id).delete()
     DoctorAvailability.query.filter_by(doctor_id=doctor_id).delete()
     FavoriteDoctor.query.filter_by(doctor_id=doctor_id).delete()
     
     db.session.delete(doctor)
+    remove_doctor_from_search(doctor_id)
+    bump_cache_versions('doctors', f'doctor:{doctor_id}', f'availability:{doctor_id}', f'appointments:{doctor_id}')
     db.session.commit()
+    appointment_index.drop_doctor(doctor_id)
     
     return jsonify({'message': f'Doctor {doctor.full_name} deleted successfully'})
 
-@app.route('/api/admin/stats')
-def admin_get_stats():
-    """Get dashboard statistics."""
-    if not check_admin_auth():
-        return jsonify({'error': 'Unauthorized'}), 401
+ADMIN_STATS_TTL_SECONDS = int(os.environ.get('ADMIN_STATS_TTL_SECONDS', 30))
+
+admin_stats_snapshot = SnapshotCache(ADMIN_STATS_TTL_SECONDS, name='admin_stats')
+
+@on_tables_committed
+def _invalidate_admin_stats(tables):
+    if tables & {'doctors', 'patients', 'appointments', 'reviews'}:
+        admin_stats_snapshot.invalidate()
+
+def build_admin_stats():
+    """Compute the dashboard statistics payload with a fixed number of queries."""
+    totals = db.session.query(
+        db.select(db.func.count(Doctor.id)).scalar_subquery(),
+        db.select(db.func.count(Patient.id)).scalar_subquery(),
+        db.select(db.func.count(Review.id)).scalar_subquery()
+    ).one()
+    total_doctors, total_patients, total_reviews = totals
     
-    total_doctors = Doctor.query.count()
-    total_patients = Patient.query.count()
-    total_appointments = Appointment.query.count()
-    scheduled_appointments = Appointment.query.filter_by(status='scheduled').count()
-    completed_appointments = Appointment.query.filter_by(status='completed').count()
-    cancelled_appointments = Appointment.query.filter_by(status='cancelled').count()
-    total_reviews = Review.query.count()
+    status_counts = dict(db.session.query(
+        Appointment.status, db.func.count(Appointment.id)
+    ).group_by(Appointment.status).all())
     
-    recent_appointments = Appointment.query.order_by(Appointment.created_at.desc()).limit(10).all()
+    recent_appointments = Appointment.query.options(
+        db.joinedload(Appointment.patient),
+        db.joinedload(Appointment.doctor)
+    ).order_by(Appointment.created_at.desc()).limit(10).all()
     
     def get_patient_name(apt):
         if apt.patient:
@@ -947,14 +2348,14 @@ def admin_get_stats():
             return apt.doctor.full_name
         return "Unknown Doctor"
     
-    return jsonify({
+    return {
         'stats': {
             'total_doctors': total_doctors,
             'total_patients': total_patients,
-            'total_appointments': total_appointments,
-            'scheduled_appointments': scheduled_appointments,
-            'completed_appointments': completed_appointments,
-            'cancelled_appointments': cancelled_appointments,
+            'total_appointments': sum(status_counts.values()),
+            'scheduled_appointments': status_counts.get('scheduled', 0),
+            'completed_appointments': status_counts.get('completed', 0),
+            'cancelled_appointments': status_counts.get('cancelled', 0),
             'total_reviews': total_reviews
         },
         'recent_appointments': [{
@@ -964,26 +2365,151 @@ def admin_get_stats():
             'date': a.appointment_date.isoformat(),
             'status': a.status,
             'created_at': a.created_at.isoformat() if a.created_at else None
-        } for a in recent_appointments]
-    })
+        } for a in recent_appointments],
+        'generated_at': datetime.utcnow().isoformat()
+    }
+
+@app.route('/api/admin/stats')
+def admin_get_stats():
+    """Get dashboard statistics from a short-lived snapshot."""
+    if not check_admin_auth():
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    payload, age = admin_stats_snapshot.get(build_admin_stats)
+    return jsonify({**payload, 'snapshot_age_seconds': round(age, 1)})
+
+def admin_appointment_filters(args):
+    """
+    Build the WHERE criteria shared by the admin appointment list and export:
+    `status`, `doctor_id`, and an inclusive `date_from`/`date_to` day range.
+    Raises ValueError for a malformed date.
+    """
+    criteria = []
+    status = args.get('status')
+    if status and status != 'all':
+        criteria.append(Appointment.status == status)
+    
+    doctor_id = args.get('doctor_id', type=int)
+    if doctor_id:
+        criteria.append(Appointment.doctor_id == doctor_id)
+    
+    try:
+        if args.get('date_from'):
+            date_from = datetime.strptime(args['date_from'], '%Y-%m-%d')
+            criteria.append(Appointment.appointment_date >= date_from)
+        if args.get('date_to'):
+            date_to = datetime.strptime(args['date_to'], '%Y-%m-%d') + timedelta(days=1)
+            criteria.append(Appointment.appointment_date < date_to)
+    except ValueError:
+        raise ValueError('Invalid date format. Use YYYY-MM-DD')
+    return criteria
+
+# Largest page served by /api/admin/appointments
+APPOINTMENTS_MAX_PER_PAGE = 100
+
+# How long an estimated appointment total may be reused before it is recounted
+ADMIN_APPOINTMENT_TOTAL_TTL_SECONDS = int(os.environ.get('ADMIN_APPOINTMENT_TOTAL_TTL_SECONDS', 60))
+ADMIN_APPOINTMENT_TOTAL_MAX_ENTRIES = 256
+
+_admin_appointment_totals = OrderedDict()   # filter key -> SnapshotCache
+_admin_appointment_totals_lock = threading.Lock()
+
+def count_admin_appointments(criteria, filter_key, mode):
+    """
+    Count appointments matching the admin filters. 'exact' always runs the
+    COUNT; 'estimate' reuses a count for the same filters that is at most
+    ADMIN_APPOINTMENT_TOTAL_TTL_SECONDS old. Returns (total, age_in_seconds).
+    """
+    def build():
+        return db.session.query(db.func.count(Appointment.id)).filter(*criteria).scalar()
+    
+    if mode == 'exact':
+        return build(), 0.0
+    
+    with _admin_appointment_totals_lock:
+        snapshot = _admin_appointment_totals.get(filter_key)
+        if snapshot is None:
+            snapshot = SnapshotCache(ADMIN_APPOINTMENT_TOTAL_TTL_SECONDS, name='admin_appointment_totals')
+            _admin_appointment_totals[filter_key] = snapshot
+            while len(_admin_appointment_totals) > ADMIN_APPOINTMENT_TOTAL_MAX_ENTRIES:
+                _admin_appointment_totals.popitem(last=False)
+        else:
+            _admin_appointment_totals.move_to_end(filter_key)
+    return snapshot.get(build)
+
+def encode_appointment_cursor(appointment, direction):
+    """Opaque cursor naming a position in the (appointment_date, id) ordering."""
+    payload = json.dumps([appointment.appointment_date.isoformat(), appointment.id, direction])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+def decode_appointment_cursor(cursor):
+    """Return ((appointment_date, id), direction); raises ValueError for a bad cursor."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        date_text, appointment_id, direction = json.loads(base64.urlsafe_b64decode(padded))
+        key = (datetime.fromisoformat(date_text), int(appointment_id))
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+    if direction not in ('next', 'prev'):
+        raise ValueError('Invalid cursor')
+    return key, direction
 
 @app.route('/api/admin/appointments')
 def admin_get_appointments():
-    """Get all appointments with optional filtering."""
+    """
+    Get appointments with optional filtering, newest first.
+    Pages are addressed by `page` (offset) or by the opaque `cursor` returned
+    as next_cursor/prev_cursor, which seeks on (appointment_date, id) and costs
+    the same on every page. `total` is exact, estimate or none; page mode
+    defaults to exact and cursor mode to estimate.
+    """
     if not check_admin_auth():
         return jsonify({'error': 'Unauthorized'}), 401
     
-    status = request.args.get('status')
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 20, type=int)
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', 20, type=int), 1), APPOINTMENTS_MAX_PER_PAGE)
+    cursor = request.args.get('cursor')
+    total_mode = request.args.get('total', 'exact' if cursor is None else 'estimate')
+    if total_mode not in ('exact', 'estimate', 'none'):
+        return jsonify({'error': 'total must be exact, estimate or none'}), 400
     
-    query = Appointment.query
+    try:
+        criteria = admin_appointment_filters(request.args)
+        key, direction = decode_appointment_cursor(cursor) if cursor else (None, 'next')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    if status and status != 'all':
-        query = query.filter_by(status=status)
+    query = Appointment.query.options(
+        db.joinedload(Appointment.patient),
+        db.joinedload(Appointment.doctor)
+    ).filter(*criteria)
+    position = db.tuple_(Appointment.appointment_date, Appointment.id)
+    
+    # One extra row tells whether another page follows
+    if direction == 'prev':
+        rows = query.filter(position > key).order_by(
+            Appointment.appointment_date.asc(), Appointment.id.asc()
+        ).limit(per_page + 1).all()
+        has_prev = len(rows) > per_page
+        has_next = True
+        items = rows[:per_page][::-1]
+    else:
+        query = query.order_by(Appointment.appointment_date.desc(), Appointment.id.desc())
+        if cursor is None:
+            query = query.offset((page - 1) * per_page)
+            has_prev = page > 1
+        else:
+            if key:
+                query = query.filter(position < key)
+            has_prev = key is not None
+        rows = query.limit(per_page + 1).all()
+        has_next = len(rows) > per_page
+        items = rows[:per_page]
     
-    query = query.order_by(Appointment.appointment_date.desc())
-    pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+    total = total_age = None
+    if total_mode != 'none':
+        filter_key = tuple(request.args.get(name) for name in ('status', 'doctor_id', 'date_from', 'date_to'))
+        total, total_age = count_admin_appointments(criteria, filter_key, total_mode)
     
     def get_patient_name(apt):
         if apt.patient:
@@ -1005,7 +2531,7 @@ def admin_get_appointments():
             return apt.patient.phone or ""
         return ""
     
-    return jsonify({
+    result = {
         'appointments': [{
             'id': a.id,
             'patient_name': get_patient_name(a),
@@ -1018,13 +2544,112 @@ def admin_get_appointments():
             'reason': a.reason or '',
             'appointment_type': a.appointment_type,
             'created_at': a.created_at.isoformat() if a.created_at else None
-        } for a in pagination.items],
-        'total': pagination.total,
-        'pages': pagination.pages,
-        'current_page': page,
-        'has_prev': pagination.has_prev,
-        'has_next': pagination.has_next
-    })
+        } for a in items],
+        'total': total,
+        'total_is_estimate': total_mode == 'estimate',
+        'total_age_seconds': round(total_age, 1) if total_age is not None else None,
+        'pages': math.ceil(total / per_page) if total is not None else None,
+        'has_prev': has_prev,
+        'has_next': has_next,
+        'prev_cursor': encode_appointment_cursor(items[0], 'prev') if has_prev and items else None,
+        'next_cursor': encode_appointment_cursor(items[-1], 'next') if has_next and items else None
+    }
+    if cursor is None:
+        result['current_page'] = page
+    return jsonify(result)
+
+# Rows fetched per round trip while streaming an export
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_COLUMNS = [
+    'id', 'date', 'status', 'appointment_type', 'doctor_id', 'doctor_name',
+    'patient_id', 'patient_name', 'patient_email', 'patient_phone',
+    'reason', 'notes', 'created_at'
+]
+
+def iter_export_records(criteria):
+    """
+    Yield appointments as plain dicts, newest first. Rows are read as bare
+    columns in `yield_per` batches, so no ORM objects pile up in the session
+    and memory stays flat regardless of the export size.
+    """
+    query = db.select(
+        Appointment.id, Appointment.appointment_date, Appointment.status,
+        Appointment.appointment_type, Appointment.doctor_id,
+        Doctor.first_name.label('doctor_first_name'), Doctor.last_name.label('doctor_last_name'),
+        Appointment.patient_id, Patient.first_name, Patient.last_name, Patient.email, Patient.phone,
+        Appointment.reason, Appointment.notes, Appointment.created_at
+    ).outerjoin(Doctor, Doctor.id == Appointment.doctor_id).outerjoin(
+        Patient, Patient.id == Appointment.patient_id
+    ).where(*criteria).order_by(
+        Appointment.appointment_date.desc(), Appointment.id.desc()
+    ).execution_options(yield_per=EXPORT_BATCH_SIZE)
+    
+    for row in db.session.execute(query):
+        yield {
+            'id': row.id,
+            'date': row.appointment_date.isoformat(),
+            'status': row.status,
+            'appointment_type': row.appointment_type,
+            'doctor_id': row.doctor_id,
+            'doctor_name': (f"Dr. {row.doctor_first_name} {row.doctor_last_name}"
+                            if row.doctor_first_name is not None else "Unknown Doctor"),
+            'patient_id': row.patient_id,
+            'patient_name': (f"{row.first_name} {row.last_name}"
+                             if row.first_name is not None else "Unknown Patient"),
+            'patient_email': row.email or '',
+            'patient_phone': row.phone or '',
+            'reason': row.reason or '',
+            'notes': row.notes or '',
+            'created_at': row.created_at.isoformat() if row.created_at else None
+        }
+
+def iter_export_chunks(records, fmt):
+    """Serialize export records to CSV or NDJSON, one text chunk per batch."""
+    buffer = io.StringIO()
+    writer = None
+    if fmt == 'csv':
+        writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+        writer.writeheader()
+    
+    for count, record in enumerate(records, start=1):
+        if writer:
+            writer.writerow(record)
+        else:
+            buffer.write(json.dumps(record) + '\n')
+        if count % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    
+    if buffer.tell():
+        yield buffer.getvalue()
+
+@app.route('/api/admin/appointments/export', methods=['GET'])
+def admin_export_appointments():
+    """
+    Stream every appointment matching the admin list filters as CSV or NDJSON.
+    """
+    if not check_admin_auth():
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    fmt = request.args.get('format', 'csv')
+    if fmt not in ('csv', 'ndjson'):
+        return jsonify({'error': 'format must be csv or ndjson'}), 400
+    
+    try:
+        criteria = admin_appointment_filters(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    filename = f"appointments-{datetime.now().strftime('%Y%m%d-%H%M%S')}.{fmt}"
+    response = app.response_class(
+        stream_with_context(iter_export_chunks(iter_export_records(criteria), fmt)),
+        mimetype=mimetype
+    )
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
 
 @app.route('/api/admin/appointments/<int:appointment_id>', methods=['DELETE'])
 def admin_delete_appointment(appointment_id):
@@ -1032,50 +2657,111 @@ def admin_delete_appointment(appointment_id):
     if not check_admin_auth():
         return jsonify({'error': 'Unauthorized'}), 401
     
-    appointment = Appointment.query.get_or_404(appointment_id)
+    appointment = db.get_or_404(Appointment, appointment_id)
     
     if appointment.review:
+        apply_review_to_doctor(appointment.review.doctor_id, appointment.review.rating, delta=-1)
+        bump_cache_versions('doctors', f'doctor:{appointment.review.doctor_id}')
         db.session.delete(appointment.review)
     
+    Reminder.query.filter_by(appointment_id=appointment_id).delete()
     db.session.delete(appointment)
+    db.session.flush()
+    refresh_patient_visit_stats([appointment.patient_id])
+    bump_appointments_version(appointment.doctor_id)
     db.session.commit()
+    appointment_index.discard(appointment_id)
     
     return jsonify({'message': 'Appointment deleted successfully'})
 
 
+# Largest page served by /api/admin/patients
+PATIENTS_MAX_PER_PAGE = 100
+
+def prefix_range(prefix):
+    """
+    Bounds (low, high) of the strings starting with `prefix` under SQLite's
+    NOCASE collation, for range predicates an index can serve; high is None
+    when no upper bound exists.
+    """
+    low = ''.join(char.lower() if char.isascii() else char for char in prefix)
+    high = low.rstrip(chr(sys.maxunicode))
+    if high:
+        high = high[:-1] + chr(ord(high[-1]) + 1)
+    return low, high or None
+
+def prefix_match(column, prefix):
+    """Case-insensitive prefix predicate on `column`, as a range over its NOCASE index."""
+    low, high = prefix_range(prefix)
+    column = column.collate('NOCASE')
+    return db.and_(column >= low, column < high) if high else column >= low
+
+def patient_search_filter(search):
+    """
+    Match a patient search: one term is a prefix of the email, first or last
+    name; several terms are a first name and last name prefix, in either
+    order, split at any of the spaces ("Sarah Johnson", "Johnson Sarah").
+    """
+    terms = search.split()
+    if len(terms) == 1:
+        return db.or_(*[prefix_match(column, terms[0])
+                        for column in (Patient.email, Patient.first_name, Patient.last_name)])
+    name_matches = []
+    for split in range(1, len(terms)):
+        head, tail = ' '.join(terms[:split]), ' '.join(terms[split:])
+        name_matches.append(db.and_(prefix_match(Patient.first_name, head), prefix_match(Patient.last_name, tail)))
+        name_matches.append(db.and_(prefix_match(Patient.first_name, tail), prefix_match(Patient.last_name, head)))
+    return db.or_(*name_matches)
+
 @app.route('/api/admin/patients', methods=['GET'])
 def admin_get_patients():
-    """Get all patients with their appointment statistics."""
+    """Get a page of patients with their appointment statistics."""
     if not check_admin_auth():
         return jsonify({'error': 'Unauthorized'}), 401
     
-    patients = Patient.query.all()
-    result = []
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', 20, type=int), 1), PATIENTS_MAX_PER_PAGE)
+    search = (request.args.get('q') or '').strip()
+    sort = request.args.get('sort', 'name')
+    descending = request.args.get('order', 'asc') == 'desc'
     
-    for patient in patients:
-        # Get appointment count
-        appointment_count = Appointment.query.filter_by(patient_id=patient.id).count()
-        
-        # Get last visit (most recent appointment)
-        last_appointment = Appointment.query.filter_by(
-            patient_id=patient.id
-        ).order_by(Appointment.appointment_date.desc()).first()
-        
-        last_visit = None
-        if last_appointment:
-            last_visit = last_appointment.appointment_date.strftime('%Y-%m-%d')
-        
-        result.append({
+    # Every sort is served by an index ending in id; the visit statistics are
+    # stored on the patient row rather than aggregated per request.
+    sort_columns = {
+        'name': [Patient.last_name, Patient.first_name],
+        'email': [Patient.email],
+        'appointment_count': [Patient.appointment_count],
+        'last_visit': [Patient.last_visit],
+    }.get(sort)
+    if sort_columns is None:
+        return jsonify({'error': f'Invalid sort field: {sort}'}), 400
+    sort_columns = sort_columns + [Patient.id]
+    
+    filters = [patient_search_filter(search)] if search else []
+    
+    total = Patient.query.filter(*filters).count()
+    patients = Patient.query.filter(*filters).order_by(
+        *[column.desc() if descending else column.asc() for column in sort_columns]
+    ).limit(per_page).offset((page - 1) * per_page).all()
+    
+    pages = (total + per_page - 1) // per_page
+    
+    return jsonify({
+        'patients': [{
             'id': patient.id,
             'first_name': patient.first_name,
             'last_name': patient.last_name,
             'email': patient.email,
             'phone': patient.phone or 'N/A',
-            'appointment_count': appointment_count,
-            'last_visit': last_visit or 'Never'
-        })
-    
-    return jsonify(result)
+            'appointment_count': patient.appointment_count,
+            'last_visit': patient.last_visit.strftime('%Y-%m-%d') if patient.last_visit else 'Never'
+        } for patient in patients],
+        'total': total,
+        'pages': pages,
+        'current_page': page,
+        'has_prev': page > 1,
+        'has_next': page < pages
+    })
 
 
 @app.route('/api/admin/patients/<int:patient_id>/appointments', methods=['GET'])
@@ -1084,17 +2770,17 @@ def admin_get_patient_appointments(patient_id):
     if not check_admin_auth():
         return jsonify({'error': 'Unauthorized'}), 401
     
-    patient = Patient.query.get(patient_id)
+    patient = db.session.get(Patient, patient_id)
     if not patient:
         return jsonify({'error': 'Patient not found'}), 404
     
-    appointments = Appointment.query.filter_by(
+    appointments = Appointment.query.options(db.joinedload(Appointment.doctor)).filter_by(
         patient_id=patient_id
     ).order_by(Appointment.appointment_date.desc()).all()
     
     result = []
     for apt in appointments:
-        doctor = Doctor.query.get(apt.doctor_id)
+        doctor = apt.doctor
         result.append({
             'id': apt.id,
             'date': apt.appointment_date.strftime('%Y-%m-%d'),
@@ -1112,37 +2798,2107 @@ def admin_get_patient_appointments(patient_id):
 
 APPOINTMENT_DURATION_MINUTES = 30
 
-def check_appointment_overlap(doctor_id, appointment_date, exclude_appointment_id=None):
+# How many days ahead to look when suggesting the next free slot
+NEXT_FREE_SLOT_HORIZON_DAYS = 60
+
+def appointments_overlap(first_start, second_start):
+    """Check whether two fixed-length appointments starting at these times overlap."""
+    duration = timedelta(minutes=APPOINTMENT_DURATION_MINUTES)
+    return first_start < second_start + duration and second_start < first_start + duration
+
+# Day bitmaps kept by the appointment index across all doctors (least recently used dropped)
+SLOT_BITMAP_MAX_DAYS = int(os.environ.get('SLOT_BITMAP_MAX_DAYS', 20000))
+
+def minute_mask(first_minute, end_minute):
+    """Bitmap with bits [first_minute, end_minute) set."""
+    if end_minute <= first_minute:
+        return 0
+    return ((1 << (end_minute - first_minute)) - 1) << first_minute
+
+def span_mask(day_start, start, end):
+    """
+    Bitmap of the minutes of the day beginning at `day_start` that the
+    interval [start, end) touches. Partial minutes count as occupied.
+    """
+    start = max(start, day_start)
+    end = min(end, day_start + timedelta(days=1))
+    if end <= start:
+        return 0
+    first_minute = int((start - day_start).total_seconds()) // 60
+    end_minute = -(-int((end - day_start).total_seconds()) // 60)
+    return minute_mask(first_minute, end_minute)
+
+class AppointmentIntervalIndex:
+    """
+    Per-doctor sorted index of booked (non-cancelled) appointment start times.
+    A doctor's entries are loaded lazily from the database on first use and then
+    kept current by the appointment write endpoints, so conflict lookups are a
+    bisection instead of a query plus a linear scan.
+    
+    Each doctor's entries remember the shared `appointments:{doctor_id}`
+    version counter they reflect; refresh() reloads a doctor whose counter has
+    moved because another worker or a CLI command wrote appointments. Rows
+    are read with the lock released, so loading one doctor never blocks
+    lookups for the others.
+    
+    Calendar reads use per-day occupancy bitmaps derived from the entries: a
+    1440-bit integer per doctor and day with one bit per booked minute. They
+    are built on first read, rebuilt for the touched days whenever an entry
+    changes, and make "is this slot free" a single AND.
+    """
+    
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._entries = {}   # doctor_id -> sorted list of (start, appointment_id)
+        self._located = {}   # appointment_id -> (doctor_id, start)
+        self._bitmaps = OrderedDict()   # (doctor_id, date) -> occupancy bitmap
+        self._versions = {}  # doctor_id -> shared appointments version the entries reflect
+        self._changes = {}   # doctor_id -> count of local changes, to detect them during a load
+        self._bitmap_stats = metrics.cache('occupancy_bitmaps')
+    
+    @staticmethod
+    def _query(doctor_ids):
+        entries = {doctor_id: [] for doctor_id in doctor_ids}
+        rows = db.session.query(Appointment.doctor_id, Appointment.appointment_date, Appointment.id).filter(
+            Appointment.doctor_id.in_(doctor_ids),
+            Appointment.status != 'cancelled'
+        ).order_by(Appointment.doctor_id, Appointment.appointment_date, Appointment.id)
+        for doctor_id, start, appointment_id in rows:
+            entries[doctor_id].append((start, appointment_id))
+        return entries
+    
+    def _install(self, doctor_id, entries, version):
+        self._forget(doctor_id)
+        self._entries[doctor_id] = entries
+        self._versions[doctor_id] = version
+        for start, appointment_id in entries:
+            self._located[appointment_id] = (doctor_id, start)
+    
+    def _forget(self, doctor_id):
+        for _, appointment_id in self._entries.pop(doctor_id, []):
+            self._located.pop(appointment_id, None)
+        self._versions.pop(doctor_id, None)
+        for key in [key for key in self._bitmaps if key[0] == doctor_id]:
+            del self._bitmaps[key]
+    
+    def _changed(self, doctor_id):
+        self._changes[doctor_id] = self._changes.get(doctor_id, 0) + 1
+    
+    def _load(self, doctor_id):
+        # Fallback for a doctor dropped between refresh() and a lookup; reads under the lock
+        entries = self._entries.get(doctor_id)
+        if entries is None:
+            entries = self._query([doctor_id])[doctor_id]
+            self._install(doctor_id, entries, None)
+        return entries
+    
+    def refresh(self, doctor_ids, versions=None):
+        """
+        Load the listed doctors that are not indexed yet, and reload those whose
+        shared appointments version differs from the one their entries reflect.
+        `versions` maps doctor id to that counter; it is read (one query) when
+        not given. A doctor changed locally while its rows were being read is
+        left for the next refresh.
+        """
+        doctor_ids = list(dict.fromkeys(int(doctor_id) for doctor_id in doctor_ids))
+        if versions is None:
+            versions = dict(zip(doctor_ids, get_cache_versions([f'appointments:{doctor_id}'
+                                                                for doctor_id in doctor_ids])))
+        with self._lock:
+            stale = {doctor_id: self._changes.get(doctor_id, 0) for doctor_id in doctor_ids
+                     if doctor_id not in self._entries or self._versions.get(doctor_id) != versions[doctor_id]}
+        if not stale:
+            return
+        loaded = self._query(list(stale))
+        with self._lock:
+            for doctor_id, changes in stale.items():
+                if self._changes.get(doctor_id, 0) == changes:
+                    self._install(doctor_id, loaded[doctor_id], versions[doctor_id])
+    
+    def _build_day_bitmap(self, entries, day):
+        duration = timedelta(minutes=APPOINTMENT_DURATION_MINUTES)
+        day_start = datetime.combine(day, datetime.min.time())
+        day_end = day_start + timedelta(days=1)
+        bitmap = 0
+        index = bisect.bisect_right(entries, (day_start - duration, math.inf))
+        while index < len(entries) and entries[index][0] < day_end:
+            start = entries[index][0]
+            bitmap |= span_mask(day_start, start, start + duration)
+            index += 1
+        return bitmap
+    
+    def _refresh_days(self, doctor_id, start):
+        # A booking can run past midnight into the next day's bitmap
+        duration = timedelta(minutes=APPOINTMENT_DURATION_MINUTES)
+        for day in {start.date(), (start + duration - timedelta(microseconds=1)).date()}:
+            if (doctor_id, day) in self._bitmaps:
+                self._bitmaps[(doctor_id, day)] = self._build_day_bitmap(self._entries[doctor_id], day)
+    
+    def _discard(self, appointment_id):
+        located = self._located.pop(appointment_id, None)
+        if not located:
+            return
+        doctor_id, start = located
+        self._changed(doctor_id)
+        entries = self._entries.get(doctor_id)
+        if entries is None:
+            return
+        index = bisect.bisect_left(entries, (start, appointment_id))
+        if index < len(entries) and entries[index] == (start, appointment_id):
+            del entries[index]
+            self._refresh_days(doctor_id, start)
+    
+    def sync(self, appointment, version=None):
+        """
+        Reflect an appointment's committed date and status in the index.
+        `version` is the appointments counter the write committed; when it
+        directly follows the one the doctor's entries reflect, they stay
+        current without a reload.
+        """
+        doctor_id = int(appointment.doctor_id)
+        with self._lock:
+            self._discard(appointment.id)
+            self._changed(doctor_id)
+            # Doctors that were never loaded pick the change up on their first lookup
+            if appointment.status != 'cancelled' and doctor_id in self._entries:
+                bisect.insort(self._entries[doctor_id], (appointment.appointment_date, appointment.id))
+                self._located[appointment.id] = (doctor_id, appointment.appointment_date)
+                self._refresh_days(doctor_id, appointment.appointment_date)
+            if version is not None and self._versions.get(doctor_id) == version - 1:
+                self._versions[doctor_id] = version
+    
+    def discard(self, appointment_id):
+        """Remove a deleted appointment from the index."""
+        with self._lock:
+            self._discard(appointment_id)
+    
+    def drop_doctor(self, doctor_id):
+        """Forget a doctor's entries; they are rebuilt from the database on next use."""
+        doctor_id = int(doctor_id)
+        with self._lock:
+            self._forget(doctor_id)
+            self._changed(doctor_id)
+    
+    def clear(self):
+        with self._lock:
+            for doctor_id in self._entries:
+                self._changed(doctor_id)
+            self._entries.clear()
+            self._located.clear()
+            self._bitmaps.clear()
+            self._versions.clear()
+    
+    def occupancy(self, doctor_id, day):
+        """Return the doctor's occupancy bitmap for `day`; bit m is minute m after midnight."""
+        doctor_id = int(doctor_id)
+        key = (doctor_id, day)
+        if doctor_id not in self._entries:
+            self.refresh([doctor_id])
+        with self._lock:
+            bitmap = self._bitmaps.get(key)
+            if bitmap is None:
+                self._bitmap_stats.record(misses=1)
+                bitmap = self._build_day_bitmap(self._load(doctor_id), day)
+                self._bitmaps[key] = bitmap
+                while len(self._bitmaps) > SLOT_BITMAP_MAX_DAYS:
+                    self._bitmaps.popitem(last=False)
+            else:
+                self._bitmap_stats.record(hits=1)
+                self._bitmaps.move_to_end(key)
+            return bitmap
+    
+    def is_free(self, doctor_id, start):
+        """Check from the bitmaps whether a slot starting at `start` touches any booking."""
+        duration = timedelta(minutes=APPOINTMENT_DURATION_MINUTES)
+        end = start + duration
+        day = start.date()
+        while datetime.combine(day, datetime.min.time()) < end:
+            day_start = datetime.combine(day, datetime.min.time())
+            if self.occupancy(doctor_id, day) & span_mask(day_start, start, end):
+                return False
+            day += timedelta(days=1)
+        return True
+    
+    def find_conflict(self, doctor_id, start, exclude_appointment_id=None):
+        """Return the id of an appointment overlapping a slot starting at `start`, or None."""
+        duration = timedelta(minutes=APPOINTMENT_DURATION_MINUTES)
+        if int(doctor_id) not in self._entries:
+            self.refresh([doctor_id])
+        with self._lock:
+            if self.is_free(doctor_id, start):
+                return None
+            entries = self._load(int(doctor_id))
+            index = bisect.bisect_right(entries, (start - duration, math.inf))
+            while index < len(entries) and entries[index][0] < start + duration:
+                if entries[index][1] != exclude_appointment_id:
+                    return entries[index][1]
+                index += 1
+        return None
+
+appointment_index = AppointmentIntervalIndex()
+
+def check_appointment_overlap(doctor_id, appointment_date, exclude_appointment_id=None, hold_token=None):
     """
-    Check if a new appointment would overlap with existing appointments.
-    Returns (overlap_exists, conflicting_appointment) tuple.
+    Check if a new appointment would overlap with existing appointments or
+    with a slot another patient holds (any hold except `hold_token`).
+    Returns (overlap_exists, conflicting) tuple, where conflicting is an
+    Appointment or a HeldSlot.
+    Conflicts come from the interval index; a hit that no longer matches the
+    database means the index is stale, so it is rebuilt and checked again.
     """
-    new_start = appointment_date
-    new_end = appointment_date + timedelta(minutes=APPOINTMENT_DURATION_MINUTES)
+    for _ in range(2):
+        conflict_id = appointment_index.find_conflict(doctor_id, appointment_date, exclude_appointment_id)
+        if conflict_id is None:
+            break
+        
+        existing = db.session.get(Appointment, conflict_id)
+        if (existing and existing.status != 'cancelled'
+                and appointments_overlap(existing.appointment_date, appointment_date)):
+            return True, existing
+        appointment_index.drop_doctor(doctor_id)
     
-    same_day_start = new_start.replace(hour=0, minute=0, second=0, microsecond=0)
-    same_day_end = same_day_start + timedelta(days=1)
+    held = slot_holds.find_conflict(doctor_id, appointment_date, hold_token)
+    if held:
+        return True, held
+    return False, None
+
+def begin_write_transaction():
+    """
+    Start the session's transaction with SQLite's write lock held (BEGIN
+    IMMEDIATE), so a read-check-write sequence cannot interleave with another
+    writer. Other databases rely on the unique slot index instead.
+    """
+    if db.engine.dialect.name != 'sqlite':
+        return
+    connection = db.session.connection()
+    if not connection.connection.dbapi_connection.in_transaction:
+        connection.exec_driver_sql('BEGIN IMMEDIATE')
+
+def reserve_slot(doctor_id, start, exclude_appointment_id=None, hold_token=None):
+    """
+    Take the write lock and confirm against the database that a slot is free.
+    Returns the conflicting Appointment or HeldSlot, or None once the caller
+    may write the booking; either way the caller must finish with a commit or
+    rollback.
+    """
+    begin_write_transaction()
     
+    duration = timedelta(minutes=APPOINTMENT_DURATION_MINUTES)
     query = Appointment.query.filter(
         Appointment.doctor_id == doctor_id,
-        Appointment.appointment_date >= same_day_start,
-        Appointment.appointment_date < same_day_end,
+        Appointment.appointment_date > start - duration,
+        Appointment.appointment_date < start + duration,
         Appointment.status != 'cancelled'
     )
-    
     if exclude_appointment_id:
         query = query.filter(Appointment.id != exclude_appointment_id)
     
-    existing_appointments = query.all()
+    conflicting = query.first()
+    if conflicting:
+        # The interval index missed a booking made elsewhere; rebuild it
+        appointment_index.drop_doctor(doctor_id)
+        return conflicting
+    # Database holds are re-read under the write lock, so two workers cannot both pass
+    return slot_holds.find_conflict(doctor_id, start, hold_token)
+
+def find_next_free_slot(doctor_id, after, exclude_appointment_id=None):
+    """
+    Find the first slot after `after` that fits the doctor's availability and
+    does not conflict with a booked appointment or a hold. Holds are read
+    once per day as an occupancy bitmap (a shared snapshot in the database
+    store) rather than queried per candidate slot.
+    """
+    slot_offsets = load_schedules([doctor_id])[doctor_id]
+    if not slot_offsets:
+        return None
     
-    for existing in existing_appointments:
-        existing_start = existing.appointment_date
-        existing_end = existing_start + timedelta(minutes=APPOINTMENT_DURATION_MINUTES)
+    now = datetime.now()
+    slot_mask = minute_mask(0, APPOINTMENT_DURATION_MINUTES)
+    for offset in range(NEXT_FREE_SLOT_HORIZON_DAYS):
+        day = after.date() + timedelta(days=offset)
+        offsets = slot_offsets.get(day.weekday())
+        if not offsets:
+            continue
+        day_start = datetime.combine(day, datetime.min.time())
+        held = slot_holds.occupancy(doctor_id, day, now=now)
+        for minute in offsets:
+            slot_time = day_start + timedelta(minutes=minute)
+            if slot_time <= after or (held >> minute) & slot_mask:
+                continue
+            if appointment_index.find_conflict(doctor_id, slot_time, exclude_appointment_id) is None:
+                return slot_time
+    return None
+
+# ============ SLOT ENGINE ============
+
+# Longest date range served by /api/available-slots/range
+MAX_SLOT_RANGE_DAYS = 31
+
+# Search horizon and result cap for /api/available-slots/first
+FIRST_AVAILABLE_DEFAULT_DAYS = 14
+FIRST_AVAILABLE_MAX_DAYS = 60
+FIRST_AVAILABLE_MAX_LIMIT = 50
+
+def get_availability_windows_for_doctors(doctor_ids):
+    """
+    Load the active availability windows of several doctors in one query.
+    Returns {doctor_id: {day_of_week: sorted [(start_time, end_time)]}}.
+    """
+    windows = {}
+    rows = db.session.query(
+        DoctorAvailability.doctor_id, DoctorAvailability.day_of_week,
+        DoctorAvailability.start_time, DoctorAvailability.end_time
+    ).filter(
+        DoctorAvailability.doctor_id.in_(doctor_ids),
+        DoctorAvailability.is_available == True
+    ).order_by(DoctorAvailability.doctor_id, DoctorAvailability.day_of_week, DoctorAvailability.start_time)
+    for doctor_id, day_of_week, start_time, end_time in rows:
+        windows.setdefault(doctor_id, {}).setdefault(day_of_week, []).append((start_time, end_time))
+    return windows
+
+def window_slot_offsets(windows):
+    """
+    Turn {day_of_week: [(start_time, end_time)]} into {day_of_week: sorted
+    tuple of slot start offsets in minutes after midnight}, honoring minutes.
+    """
+    offsets = {}
+    for day_of_week, day_windows in windows.items():
+        minutes = set()
+        for start_time, end_time in day_windows:
+            minute = start_time.hour * 60 + start_time.minute
+            window_end = end_time.hour * 60 + end_time.minute
+            while minute + APPOINTMENT_DURATION_MINUTES <= window_end:
+                minutes.add(minute)
+                minute += APPOINTMENT_DURATION_MINUTES
+        if minutes:
+            offsets[day_of_week] = tuple(sorted(minutes))
+    return offsets
+
+class AvailabilityCache:
+    """
+    Slot start offsets per doctor and weekday, derived once from the
+    DoctorAvailability rows instead of on every calendar read. Cleared by any
+    commit in this process that writes the doctor_availability table; entries
+    also remember the shared `availability:{doctor_id}` version they were read
+    at, so writes by other workers or CLI commands are noticed.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._offsets = {}      # doctor_id -> ({day_of_week: slot offsets}, availability version)
+        self._generation = 0
+        self._stats = metrics.cache('availability')
+    
+    def get_many(self, doctor_ids, versions):
+        """Slot offsets per doctor; `versions` maps each doctor to its current availability version."""
+        doctor_ids = [int(doctor_id) for doctor_id in doctor_ids]
+        with self._lock:
+            found = {doctor_id: self._offsets[doctor_id][0] for doctor_id in doctor_ids
+                     if self._offsets.get(doctor_id, (None, None))[1] == versions[doctor_id]}
+            generation = self._generation
         
-        if new_start < existing_end and new_end > existing_start:
-            return True, existing
+        missing = [doctor_id for doctor_id in doctor_ids if doctor_id not in found]
+        self._stats.record(hits=len(doctor_ids) - len(missing), misses=len(missing))
+        if missing:
+            windows = get_availability_windows_for_doctors(missing)
+            loaded = {doctor_id: window_slot_offsets(windows.get(doctor_id, {})) for doctor_id in missing}
+            with self._lock:
+                # Results read before a concurrent clear() must not be cached
+                if generation == self._generation:
+                    self._offsets.update((doctor_id, (offsets, versions[doctor_id]))
+                                         for doctor_id, offsets in loaded.items())
+            found.update(loaded)
+        return found
     
-    return False, None
+    def clear(self):
+        with self._lock:
+            self._offsets.clear()
+            self._generation += 1
+
+availability_cache = AvailabilityCache()
+
+@on_tables_committed
+def _invalidate_availability_cache(tables):
+    if 'doctor_availability' in tables:
+        availability_cache.clear()
+
+def load_schedules(doctor_ids):
+    """
+    Slot offsets of the listed doctors for a calendar read. Their cached
+    availability and booked appointments are first checked against the shared
+    version counters with one query, so changes committed by other workers,
+    import-data or seed-data are picked up. Returns {doctor_id: slot offsets}.
+    """
+    doctor_ids = list(dict.fromkeys(int(doctor_id) for doctor_id in doctor_ids))
+    keys = [key for doctor_id in doctor_ids
+            for key in (f'availability:{doctor_id}', f'appointments:{doctor_id}')]
+    versions = dict(zip(keys, get_cache_versions(keys)))
+    appointment_index.refresh(doctor_ids, {doctor_id: versions[f'appointments:{doctor_id}']
+                                           for doctor_id in doctor_ids})
+    return availability_cache.get_many(doctor_ids, {doctor_id: versions[f'availability:{doctor_id}']
+                                                    for doctor_id in doctor_ids})
+
+def find_free_slots(doctor_id, date, slot_offsets, now=None, hold_token=None):
+    """
+    Free slots of one day: the day's slot offsets from `slot_offsets` (one
+    doctor's AvailabilityCache entry) tested against its occupancy bitmap and
+    the slots other patients hold. Returns sorted slot datetimes later than `now`.
+    """
+    offsets = slot_offsets.get(date.weekday())
+    if not offsets:
+        return []
+    now = now or datetime.now()
+    day_start = datetime.combine(date, datetime.min.time())
+    if day_start + timedelta(minutes=offsets[-1]) <= now:
+        return []
+    
+    occupied = appointment_index.occupancy(doctor_id, date) | slot_holds.occupancy(doctor_id, date, hold_token, now)
+    slot_mask = minute_mask(0, APPOINTMENT_DURATION_MINUTES)
+    free = []
+    for minute in offsets:
+        if not (occupied >> minute) & slot_mask:
+            slot_time = day_start + timedelta(minutes=minute)
+            if slot_time > now:
+                free.append(slot_time)
+    return free
+
+def iter_free_slots(doctor_id, slot_offsets, start_date, day_count, now=None):
+    """Lazily yield a doctor's free slots in time order, day by day."""
+    now = now or datetime.now()
+    for offset in range(day_count):
+        yield from find_free_slots(doctor_id, start_date + timedelta(days=offset), slot_offsets, now=now)
+
+def is_slot_free(slot_time, booked_starts):
+    """Check a slot against a sorted list of booked start times using bisection."""
+    duration = timedelta(minutes=APPOINTMENT_DURATION_MINUTES)
+    index = bisect.bisect_right(booked_starts, slot_time - duration)
+    return index == len(booked_starts) or booked_starts[index] >= slot_time + duration
+
+def serialize_slot(slot_time):
+    return {
+        'datetime': slot_time.isoformat(),
+        'time': slot_time.strftime('%I:%M %p'),
+        'available': True
+    }
+
+# ============ LIVE SLOT EVENTS ============
+# Appointment writes are turned into slot-taken / slot-freed events when the
+# session flushes, and published to Server-Sent Events subscribers once the
+# transaction commits. Changes made by other worker processes are picked up by
+# one poller thread per process: it watches the shared version counters of
+# the doctors someone is subscribed to, and diffs the booked (and, with
+# database holds, held) slots of a doctor whose counter moved. Subscribers
+# only wait on an in-memory queue, so an open stream holds no database
+# connection, but it does keep a worker thread busy; SLOT_EVENTS_MAX_STREAMS
+# caps how many streams a process serves at once.
+
+SLOT_EVENTS_HEARTBEAT_SECONDS = 15
+SLOT_EVENTS_QUEUE_SIZE = 100
+SLOT_EVENTS_POLL_SECONDS = float(os.environ.get('SLOT_EVENTS_POLL_SECONDS', 1))
+SLOT_EVENTS_MAX_STREAMS = int(os.environ.get('SLOT_EVENTS_MAX_STREAMS', 32))
+
+class SlotSubscription:
+    """One SSE client watching a doctor's slots, optionally for a single date."""
+    
+    def __init__(self, doctor_id, date=None):
+        self.doctor_id = doctor_id
+        self.date = date
+        self.queue = queue.Queue(maxsize=SLOT_EVENTS_QUEUE_SIZE)
+        self.overflowed = False
+
+class SlotEventBroker:
+    """
+    In-process fan-out of slot changes. Publishing never blocks: a subscriber
+    whose queue is full is flagged instead, and its stream tells the client to
+    reload the slots rather than replaying every missed event.
+    """
+    
+    def __init__(self, max_subscriptions):
+        self.max_subscriptions = max_subscriptions
+        self._lock = threading.Lock()
+        self._subscriptions = {}   # doctor_id -> set of SlotSubscription
+        self._count = 0
+        self._listeners = []
+    
+    def add_listener(self, listener):
+        """Call `listener(event_type, doctor_id, slot_time)` for every published event."""
+        self._listeners.append(listener)
+    
+    def subscribe(self, doctor_id, date=None):
+        """Register a subscriber; returns None when the process already serves max_subscriptions."""
+        subscription = SlotSubscription(doctor_id, date)
+        with self._lock:
+            if self._count >= self.max_subscriptions:
+                return None
+            self._subscriptions.setdefault(doctor_id, set()).add(subscription)
+            self._count += 1
+        return subscription
+    
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.doctor_id)
+            if subscriptions is not None and subscription in subscriptions:
+                subscriptions.discard(subscription)
+                self._count -= 1
+                if not subscriptions:
+                    del self._subscriptions[subscription.doctor_id]
+    
+    def doctor_ids(self):
+        with self._lock:
+            return list(self._subscriptions)
+    
+    def publish(self, event_type, doctor_id, slot_time):
+        for listener in self._listeners:
+            listener(event_type, doctor_id, slot_time)
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(doctor_id, ()))
+        payload = {
+            'doctor_id': doctor_id,
+            'datetime': slot_time.isoformat(),
+            'date': slot_time.date().isoformat(),
+            'time': slot_time.strftime('%I:%M %p')
+        }
+        for subscription in subscriptions:
+            if subscription.date is not None and subscription.date != slot_time.date():
+                continue
+            try:
+                subscription.queue.put_nowait((event_type, payload))
+            except queue.Full:
+                subscription.overflowed = True
+
+slot_events = SlotEventBroker(SLOT_EVENTS_MAX_STREAMS)
+
+class SlotChangePoller:
+    """
+    Per-process thread that publishes slot changes made by other workers. It
+    remembers the booked and held slot starts of every subscribed doctor with
+    the version counters they were read at; events published in this process
+    update that state as well, so only changes made elsewhere show up in the
+    diff. The thread starts with the first subscription.
+    """
+    
+    def __init__(self, broker, interval):
+        self.broker = broker
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._thread = None
+        self._seen = {}   # doctor_id -> (versions, booked starts, held starts)
+        broker.add_listener(self._note)
+    
+    @staticmethod
+    def _version_keys(doctor_id):
+        keys = [f'appointments:{doctor_id}']
+        if SLOT_HOLD_BACKEND == 'DATABASE':
+            keys.append(f'holds:{doctor_id}')
+        return keys
+    
+    def _note(self, event_type, doctor_id, slot_time):
+        with self._lock:
+            state = self._seen.get(doctor_id)
+            if state is None:
+                return
+            _, booked, held = state
+            starts = booked if event_type in ('slot-taken', 'slot-freed') else held
+            if event_type in ('slot-taken', 'slot-held'):
+                starts.add(slot_time)
+            else:
+                starts.discard(slot_time)
+    
+    def ensure_running(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='slot-change-poller', daemon=True)
+                self._thread.start()
+    
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                with app.app_context():
+                    self.poll()
+            except Exception:
+                app.logger.exception('Slot change poll failed')
+    
+    def poll(self):
+        """Publish the slot changes of subscribed doctors whose version counters moved."""
+        doctor_ids = self.broker.doctor_ids()
+        with self._lock:
+            for doctor_id in set(self._seen) - set(doctor_ids):
+                del self._seen[doctor_id]
+        if not doctor_ids:
+            return
+        
+        keys = [key for doctor_id in doctor_ids for key in self._version_keys(doctor_id)]
+        versions = dict(zip(keys, get_cache_versions(keys)))
+        today = datetime.combine(datetime.now().date(), datetime.min.time())
+        for doctor_id in doctor_ids:
+            current = tuple(versions[key] for key in self._version_keys(doctor_id))
+            previous = self._seen.get(doctor_id)
+            if previous and previous[0] == current:
+                continue
+            booked = {start for (start,) in db.session.query(Appointment.appointment_date).filter(
+                Appointment.doctor_id == doctor_id,
+                Appointment.appointment_date >= today,
+                Appointment.status != 'cancelled'
+            )}
+            held = set()
+            if SLOT_HOLD_BACKEND == 'DATABASE':
+                held = {start for (start,) in db.session.query(SlotHold.slot_time).filter(
+                    SlotHold.doctor_id == doctor_id, SlotHold.expires_at > datetime.now())}
+            with self._lock:
+                previous = self._seen.get(doctor_id)
+                self._seen[doctor_id] = (current, booked, held)
+            if previous is None:
+                continue   # first look at this doctor: nothing to compare with
+            for event_type, starts in (('slot-freed', previous[1] - booked), ('slot-taken', booked - previous[1]),
+                                       ('slot-released', previous[2] - held), ('slot-held', held - previous[2])):
+                for slot_time in sorted(starts):
+                    self.broker.publish(event_type, doctor_id, slot_time)
+    
+    def clear(self):
+        with self._lock:
+            self._seen.clear()
+
+slot_change_poller = SlotChangePoller(slot_events, SLOT_EVENTS_POLL_SECONDS)
+
+def _appointment_slot_state(appointment, committed):
+    """(doctor_id, start) the appointment occupies before or after the flush, or None."""
+    if committed:
+        state = db.inspect(appointment)
+        values = {}
+        for name in ('doctor_id', 'appointment_date', 'status'):
+            history = state.attrs[name].history
+            values[name] = history.deleted[0] if history.deleted else getattr(appointment, name)
+    else:
+        values = {'doctor_id': appointment.doctor_id, 'appointment_date': appointment.appointment_date,
+                  'status': appointment.status}
+    if values['status'] == 'cancelled' or values['doctor_id'] is None or values['appointment_date'] is None:
+        return None
+    return int(values['doctor_id']), values['appointment_date']
+
+@event.listens_for(Session, 'before_flush')
+def _record_slot_changes(session, flush_context, instances):
+    changes = session.info.setdefault('slot_changes', [])
+    for appointment in session.new:
+        if isinstance(appointment, Appointment):
+            after = _appointment_slot_state(appointment, committed=False)
+            if after:
+                changes.append(('slot-taken', *after))
+    for appointment in itertools.chain(session.dirty, session.deleted):
+        if not isinstance(appointment, Appointment):
+            continue
+        before = _appointment_slot_state(appointment, committed=True)
+        after = None if appointment in session.deleted else _appointment_slot_state(appointment, committed=False)
+        if before != after:
+            if before:
+                changes.append(('slot-freed', *before))
+            if after:
+                changes.append(('slot-taken', *after))
+
+@event.listens_for(Session, 'after_commit')
+def _publish_slot_changes(session):
+    for event_type, doctor_id, slot_time in session.info.pop('slot_changes', ()):
+        slot_events.publish(event_type, doctor_id, slot_time)
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_slot_changes(session):
+    session.info.pop('slot_changes', None)
+
+def format_sse(event_type, data):
+    return f'event: {event_type}\ndata: {json.dumps(data)}\n\n'
+
+@app.route('/api/doctors/<int:doctor_id>/slot-events')
+def doctor_slot_events(doctor_id):
+    """
+    Server-Sent Events stream of slot-taken and slot-freed events for a doctor
+    (slot-held and slot-released for holds), limited to one day when `date`
+    is given. A `resync` event means events were dropped and the client should
+    reload the slots.
+    """
+    date = None
+    if request.args.get('date'):
+        try:
+            date = datetime.strptime(request.args['date'], '%Y-%m-%d').date()
+        except ValueError:
+            return jsonify({'error': 'Invalid date format'}), 400
+    
+    if db.session.get(Doctor, doctor_id) is None:
+        return jsonify({'error': 'Doctor not found'}), 404
+    
+    subscription = slot_events.subscribe(doctor_id, date)
+    if subscription is None:
+        return jsonify({'error': 'Too many live slot streams, please try again shortly'}), 503, {
+            'Retry-After': str(SLOT_EVENTS_HEARTBEAT_SECONDS)}
+    slot_change_poller.ensure_running()
+    
+    def stream():
+        try:
+            yield 'retry: 3000\n' + format_sse('ready', {'doctor_id': doctor_id})
+            while True:
+                try:
+                    event_type, payload = subscription.queue.get(timeout=SLOT_EVENTS_HEARTBEAT_SECONDS)
+                except queue.Empty:
+                    yield ': keepalive\n\n'
+                    continue
+                if subscription.overflowed:
+                    while not subscription.queue.empty():
+                        subscription.queue.get_nowait()
+                    subscription.overflowed = False
+                    yield format_sse('resync', {'doctor_id': doctor_id})
+                    continue
+                yield format_sse(event_type, payload)
+        finally:
+            slot_events.unsubscribe(subscription)
+    
+    # The stream runs after the request context is gone; it must not touch the database
+    response = app.response_class(stream(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+# ============ SLOT HOLDS ============
+# A patient who picks a slot gets a short-lived hold token for it, so the slot
+# is not offered to anyone else while the booking form is filled in. Held
+# slots are left out of the slot listings and refused by the overlap checks
+# for every caller except the one presenting the token.
+# The default store keeps holds in this process; SLOT_HOLD_BACKEND=database
+# keeps them in the slot_holds table so every worker sees the same holds.
+# Holds are anonymous: a hold belongs to whoever presents its token. The
+# browser also sends a random session id, and a session keeps at most one
+# hold, so a new hold replaces the session's previous one. Hold requests are
+# rate limited per client address (see TRUSTED_PROXY_COUNT behind a proxy).
+
+SLOT_HOLD_TTL_SECONDS = int(os.environ.get('SLOT_HOLD_TTL_SECONDS', 300))
+SLOT_HOLD_BACKEND = _env_choice('SLOT_HOLD_BACKEND', 'memory', {'MEMORY', 'DATABASE'})
+# Hold requests each client address may make per minute in one process; 0 disables the limit
+SLOT_HOLD_RATE_LIMIT = int(os.environ.get('SLOT_HOLD_RATE_LIMIT', 20))
+# Clients tracked by the rate limiter before idle ones are swept
+RATE_LIMIT_MAX_CLIENTS = 10000
+
+# How stale the database store's view of other workers' holds may be on slot listings
+SLOT_HOLD_SNAPSHOT_SECONDS = 1
+
+class HeldSlot:
+    """A slot held by one patient until `expires_at`."""
+    __slots__ = ('token', 'doctor_id', 'slot_time', 'expires_at', 'session_id')
+    
+    def __init__(self, token, doctor_id, slot_time, expires_at, session_id=None):
+        self.token = token
+        self.doctor_id = doctor_id
+        self.slot_time = slot_time
+        self.expires_at = expires_at
+        self.session_id = session_id
+    
+    def to_dict(self):
+        return {
+            'token': self.token,
+            'doctor_id': self.doctor_id,
+            'datetime': self.slot_time.isoformat(),
+            'expires_at': self.expires_at.isoformat()
+        }
+
+def find_overlapping_hold(holds, slot_time, hold_token=None, now=None):
+    """First live hold in `holds` other than `hold_token` that overlaps a slot starting at `slot_time`."""
+    now = now or datetime.now()
+    for hold in holds:
+        if hold.token != hold_token and hold.expires_at > now and appointments_overlap(hold.slot_time, slot_time):
+            return hold
+    return None
+
+class RateLimiter:
+    """Sliding-window count of requests per client address, kept in this process."""
+    
+    def __init__(self, limit, window_seconds):
+        self.limit = limit
+        self.window_seconds = window_seconds
+        self._lock = threading.Lock()
+        self._hits = {}   # client key -> deque of request times
+    
+    def hit(self, key, now=None):
+        """Count one request; returns 0 if it is allowed, else the seconds until one would be."""
+        if self.limit <= 0:
+            return 0
+        now = time.monotonic() if now is None else now
+        window_start = now - self.window_seconds
+        with self._lock:
+            if len(self._hits) >= RATE_LIMIT_MAX_CLIENTS:
+                self._hits = {client: hits for client, hits in self._hits.items() if hits[-1] > window_start}
+            hits = self._hits.setdefault(key, deque())
+            while hits and hits[0] <= window_start:
+                hits.popleft()
+            if len(hits) >= self.limit:
+                return hits[0] - window_start
+            hits.append(now)
+        return 0
+    
+    def clear(self):
+        with self._lock:
+            self._hits.clear()
+
+slot_hold_rate_limiter = RateLimiter(SLOT_HOLD_RATE_LIMIT, 60)
+
+def held_minutes_mask(holds, day, hold_token=None, now=None):
+    """Occupancy bitmap of the minutes of `day` covered by live holds other than `hold_token`."""
+    now = now or datetime.now()
+    duration = timedelta(minutes=APPOINTMENT_DURATION_MINUTES)
+    day_start = datetime.combine(day, datetime.min.time())
+    bitmap = 0
+    for hold in holds:
+        if hold.token != hold_token and hold.expires_at > now:
+            bitmap |= span_mask(day_start, hold.slot_time, hold.slot_time + duration)
+    return bitmap
+
+class MemorySlotHoldStore:
+    """
+    Holds kept in this process: a dict of holds per doctor for overlap checks
+    plus a min-heap of (expires_at, token), so expired holds are dropped by
+    popping the heap head instead of scanning every hold.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._holds = {}       # token -> HeldSlot
+        self._by_doctor = {}   # doctor_id -> {token: HeldSlot}
+        self._by_session = {}  # session id -> token of its hold
+        self._expiry = []      # heap of (expires_at, token)
+    
+    def _remove(self, hold):
+        del self._holds[hold.token]
+        doctor_holds = self._by_doctor[hold.doctor_id]
+        del doctor_holds[hold.token]
+        if not doctor_holds:
+            del self._by_doctor[hold.doctor_id]
+        if hold.session_id is not None and self._by_session.get(hold.session_id) == hold.token:
+            del self._by_session[hold.session_id]
+    
+    def _purge(self, now):
+        expired = []
+        while self._expiry and self._expiry[0][0] <= now:
+            _, token = heapq.heappop(self._expiry)
+            hold = self._holds.get(token)
+            if hold is not None:   # released holds leave a stale heap entry behind
+                self._remove(hold)
+                expired.append(hold)
+        return expired
+    
+    def _doctor_holds(self, doctor_id, now):
+        with self._lock:
+            expired = self._purge(now)
+            holds = list(self._by_doctor.get(doctor_id, {}).values())
+        publish_released_holds(expired)
+        return holds
+    
+    def place(self, doctor_id, slot_time, replace_token=None, now=None, session_id=None):
+        """
+        Hold a slot, first releasing the caller's previous hold `replace_token`
+        and any other hold of `session_id`. Returns (hold, None), or
+        (None, conflicting_hold) if another hold overlaps the slot.
+        """
+        doctor_id = int(doctor_id)
+        now = now or datetime.now()
+        released = []
+        with self._lock:
+            released.extend(self._purge(now))
+            conflicting = find_overlapping_hold(
+                self._by_doctor.get(doctor_id, {}).values(), slot_time, replace_token, now)
+            if conflicting:
+                hold = None
+            else:
+                for token in {replace_token, self._by_session.get(session_id)} - {None}:
+                    previous = self._holds.get(token)
+                    if previous is not None:
+                        self._remove(previous)
+                        released.append(previous)
+                hold = HeldSlot(secrets.token_urlsafe(16), doctor_id, slot_time,
+                                now + timedelta(seconds=SLOT_HOLD_TTL_SECONDS), session_id)
+                self._holds[hold.token] = hold
+                self._by_doctor.setdefault(doctor_id, {})[hold.token] = hold
+                if session_id is not None:
+                    self._by_session[session_id] = hold.token
+                heapq.heappush(self._expiry, (hold.expires_at, hold.token))
+        publish_released_holds(released)
+        if hold is None:
+            return None, conflicting
+        slot_events.publish('slot-held', doctor_id, slot_time)
+        return hold, None
+    
+    def release(self, token, notify=True):
+        """Drop a hold; returns it, or None if it does not exist or already expired."""
+        with self._lock:
+            hold = self._holds.get(token)
+            if hold is not None:
+                self._remove(hold)
+        if hold is None or hold.expires_at <= datetime.now():
+            return None
+        if notify:
+            publish_released_holds([hold])
+        return hold
+    
+    def find_conflict(self, doctor_id, slot_time, hold_token=None, now=None):
+        """Return a live hold of another patient overlapping the slot, or None."""
+        now = now or datetime.now()
+        return find_overlapping_hold(self._doctor_holds(int(doctor_id), now), slot_time, hold_token, now)
+    
+    def occupancy(self, doctor_id, day, hold_token=None, now=None):
+        now = now or datetime.now()
+        return held_minutes_mask(self._doctor_holds(int(doctor_id), now), day, hold_token, now)
+    
+    def clear(self):
+        with self._lock:
+            self._holds.clear()
+            self._by_doctor.clear()
+            self._by_session.clear()
+            self._expiry.clear()
+
+class DatabaseSlotHoldStore:
+    """
+    Holds kept in the slot_holds table and shared by every worker. Placing a
+    hold runs under the SQLite write lock, and reserve_slot re-reads holds
+    inside its own locked transaction, so the database decides every race.
+    Slot listings read a short-lived snapshot of all live holds instead of
+    querying per day; expired rows are swept when the next hold is placed.
+    Expiry is not announced, and hold events reach only the subscribers of the
+    worker that made the change.
+    """
+    
+    def __init__(self):
+        self._snapshot = SnapshotCache(SLOT_HOLD_SNAPSHOT_SECONDS, name='slot_hold_snapshot')
+    
+    @staticmethod
+    def _to_held_slot(row):
+        return HeldSlot(row.token, row.doctor_id, row.slot_time, row.expires_at, row.session_id)
+    
+    def _query_overlapping(self, doctor_id, slot_time, hold_token, now):
+        duration = timedelta(minutes=APPOINTMENT_DURATION_MINUTES)
+        query = SlotHold.query.filter(
+            SlotHold.doctor_id == doctor_id,
+            SlotHold.slot_time > slot_time - duration,
+            SlotHold.slot_time < slot_time + duration,
+            SlotHold.expires_at > now
+        )
+        if hold_token:
+            query = query.filter(SlotHold.token != hold_token)
+        return query.first()
+    
+    def _load_live_holds(self):
+        holds = {}
+        for row in SlotHold.query.filter(SlotHold.expires_at > datetime.now()):
+            holds.setdefault(row.doctor_id, []).append(self._to_held_slot(row))
+        return holds
+    
+    def place(self, doctor_id, slot_time, replace_token=None, now=None, session_id=None):
+        """
+        Hold a slot, first releasing the caller's previous hold `replace_token`
+        and any other hold of `session_id`. Returns (hold, None), or
+        (None, conflicting_hold) if another hold overlaps the slot.
+        """
+        doctor_id = int(doctor_id)
+        now = now or datetime.now()
+        begin_write_transaction()
+        try:
+            conflicting = self._query_overlapping(doctor_id, slot_time, replace_token, now)
+            if conflicting:
+                db.session.rollback()
+                return None, self._to_held_slot(conflicting)
+            
+            owned = []
+            if replace_token:
+                owned.append(SlotHold.token == replace_token)
+            if session_id is not None:
+                owned.append(SlotHold.session_id == session_id)
+            released = [self._to_held_slot(previous) for previous in SlotHold.query.filter(
+                db.or_(*owned), SlotHold.expires_at > now)] if owned else []
+            SlotHold.query.filter(db.or_(SlotHold.expires_at <= now, *owned)).delete()
+            # Other workers' slot event pollers watch these counters
+            bump_cache_versions(f'holds:{doctor_id}', *[f'holds:{hold.doctor_id}' for hold in released])
+            row = SlotHold(token=secrets.token_urlsafe(16), doctor_id=doctor_id, slot_time=slot_time,
+                           expires_at=now + timedelta(seconds=SLOT_HOLD_TTL_SECONDS), session_id=session_id)
+            db.session.add(row)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        self._snapshot.invalidate()
+        publish_released_holds(released)
+        slot_events.publish('slot-held', doctor_id, slot_time)
+        return self._to_held_slot(row), None
+    
+    def release(self, token, notify=True):
+        """Drop a hold; returns it, or None if it does not exist or already expired."""
+        row = SlotHold.query.filter_by(token=token).first()
+        if row is None:
+            return None
+        hold = self._to_held_slot(row)
+        db.session.delete(row)
+        bump_cache_versions(f'holds:{hold.doctor_id}')
+        db.session.commit()
+        self._snapshot.invalidate()
+        if hold.expires_at <= datetime.now():
+            return None
+        if notify:
+            publish_released_holds([hold])
+        return hold
+    
+    def find_conflict(self, doctor_id, slot_time, hold_token=None, now=None):
+        """Return a live hold of another patient overlapping the slot, or None."""
+        row = self._query_overlapping(int(doctor_id), slot_time, hold_token, now or datetime.now())
+        return self._to_held_slot(row) if row else None
+    
+    def occupancy(self, doctor_id, day, hold_token=None, now=None):
+        holds, _ = self._snapshot.get(self._load_live_holds)
+        return held_minutes_mask(holds.get(int(doctor_id), ()), day, hold_token, now)
+    
+    def clear(self):
+        SlotHold.query.delete()
+        db.session.commit()
+        self._snapshot.invalidate()
+
+def publish_released_holds(holds):
+    for hold in holds:
+        slot_events.publish('slot-released', hold.doctor_id, hold.slot_time)
+
+slot_holds = DatabaseSlotHoldStore() if SLOT_HOLD_BACKEND == 'DATABASE' else MemorySlotHoldStore()
+
+@app.route('/api/slot-holds', methods=['POST'])
+def create_slot_hold():
+    """
+    Hold a slot for SLOT_HOLD_TTL_SECONDS while the patient fills in the
+    booking form. `replaceToken` moves the caller's previous hold to the new
+    slot, and a new hold with the same `sessionId` replaces the session's
+    previous one. `appointmentId` (with the patient's `email`) lets a
+    reschedule hold a slot next to the appointment being moved.
+    """
+    retry_after = slot_hold_rate_limiter.hit(request.remote_addr or 'unknown')
+    if retry_after:
+        return jsonify({'error': 'Too many hold requests, please try again shortly'}), 429, {
+            'Retry-After': str(math.ceil(retry_after))}
+    
+    data = request.get_json(silent=True) or {}
+    if not data.get('doctorId') or not data.get('dateTime'):
+        return jsonify({'error': 'doctorId and dateTime are required'}), 400
+    
+    try:
+        doctor_id = int(data['doctorId'])
+        slot_time = datetime.fromisoformat(data['dateTime'])
+        exclude_appointment_id = int(data['appointmentId']) if data.get('appointmentId') else None
+    except (ValueError, TypeError):
+        return jsonify({'error': 'Invalid doctor ID, appointment ID or date format'}), 400
+    
+    if slot_time <= datetime.now():
+        return jsonify({'error': 'Cannot hold a slot in the past'}), 400
+    if db.session.get(Doctor, doctor_id) is None:
+        return jsonify({'error': 'Doctor not found'}), 404
+    if exclude_appointment_id:
+        appointment = db.session.get(Appointment, exclude_appointment_id)
+        if appointment is None:
+            return jsonify({'error': 'Appointment not found'}), 404
+        if not data.get('email') or appointment.patient.email != data['email']:
+            return jsonify({'error': 'The appointment belongs to another patient'}), 403
+    
+    session_id = data.get('sessionId')
+    if session_id is not None and (not isinstance(session_id, str) or not 0 < len(session_id) <= 64):
+        return jsonify({'error': 'sessionId must be a string of at most 64 characters'}), 400
+    
+    replace_token = data.get('replaceToken')
+    overlap_exists, conflicting = check_appointment_overlap(
+        doctor_id, slot_time, exclude_appointment_id=exclude_appointment_id, hold_token=replace_token)
+    if overlap_exists:
+        return conflict_response(doctor_id, slot_time, conflicting, exclude_appointment_id)
+    
+    try:
+        hold, conflicting = slot_holds.place(doctor_id, slot_time, replace_token=replace_token,
+                                             session_id=session_id)
+    except (db.exc.OperationalError, db.exc.TimeoutError):
+        return jsonify({'error': 'The booking service is busy, please try again'}), 503
+    if hold is None:
+        return conflict_response(doctor_id, slot_time, conflicting, exclude_appointment_id)
+    
+    return jsonify({**hold.to_dict(), 'ttl_seconds': SLOT_HOLD_TTL_SECONDS}), 201
+
+@app.route('/api/slot-holds/<token>', methods=['DELETE'])
+def release_slot_hold(token):
+    if slot_holds.release(token) is None:
+        return jsonify({'error': 'Hold not found or expired'}), 404
+    return jsonify({'message': 'Hold released'})
+
+# ============ REMINDERS ============
+# A background pass turns scheduled appointments that enter the reminder window
+# into outbox rows, then hands due rows to the registered delivery handlers.
+# Every server process starts a scheduler thread with its first request, and
+# the threads take turns through a lease row, so one process (under gunicorn,
+# one worker) runs the passes and another takes over if it dies. /metrics
+# reports the last finished pass and overdue reminders, so an outbox nobody
+# drains shows up there.
+
+REMINDERS_ENABLED = os.environ.get('REMINDERS_ENABLED', '1') not in ('0', 'false', 'no')
+REMINDER_LEAD_HOURS = int(os.environ.get('REMINDER_LEAD_HOURS', 24))
+REMINDER_SCAN_INTERVAL_SECONDS = int(os.environ.get('REMINDER_SCAN_INTERVAL_SECONDS', 60))
+REMINDER_BATCH_SIZE = 500
+REMINDER_MAX_ATTEMPTS = 5
+
+# Appointment statuses that still take place and so get reminders
+REMINDER_APPOINTMENT_STATUSES = ('scheduled', 'rescheduled')
+
+# A claimed reminder whose delivery did not finish is retried after this long
+REMINDER_CLAIM_TIMEOUT_SECONDS = 300
+
+# A scheduler that misses this many passes in a row loses its lease to another process
+REMINDER_LEASE_PASSES = 3
+
+_reminder_handlers = []
+
+def on_reminder_due(handler):
+    """Register a callable that delivers one reminder payload; raising marks the attempt failed."""
+    _reminder_handlers.append(handler)
+    return handler
+
+@on_reminder_due
+def log_reminder(payload):
+    # Stand-in for an email/SMS transport, like the booking email preview
+    app.logger.info('Reminder for %s: appointment with %s at %s',
+                    payload['patient_email'], payload['doctor_name'], payload['date'])
+
+def enqueue_due_reminders(now=None):
+    """
+    Add an outbox row for every active appointment starting within the
+    next REMINDER_LEAD_HOURS that has none for its current start time. The
+    scan walks ix_appointments_status_date in start order, one batch per
+    transaction. An appointment moved away and back again still has the row
+    skipped when it moved; that row is reset to pending instead. Returns the
+    number of reminders added or reissued.
+    """
+    now = now or datetime.now()
+    lead = timedelta(hours=REMINDER_LEAD_HOURS)
+    issued = db.exists().where(
+        Reminder.appointment_id == Appointment.id,
+        Reminder.appointment_date == Appointment.appointment_date
+    )
+    
+    begin_write_transaction()
+    added = Reminder.query.filter(
+        Reminder.status == 'skipped',
+        Reminder.due_at > now - lead,
+        Reminder.due_at <= now,
+        db.exists().where(
+            Appointment.id == Reminder.appointment_id,
+            Appointment.appointment_date == Reminder.appointment_date,
+            Appointment.status.in_(REMINDER_APPOINTMENT_STATUSES)
+        )
+    ).update({
+        Reminder.status: 'pending',
+        Reminder.attempts: 0,
+        Reminder.last_error: None,
+        Reminder.claimed_at: None
+    }, synchronize_session=False)
+    db.session.commit()
+    
+    while True:
+        rows = db.session.query(Appointment.id, Appointment.patient_id, Appointment.appointment_date).filter(
+            Appointment.status.in_(REMINDER_APPOINTMENT_STATUSES),
+            Appointment.appointment_date > now,
+            Appointment.appointment_date <= now + lead,
+            ~issued
+        ).order_by(Appointment.appointment_date).limit(REMINDER_BATCH_SIZE).all()
+        if not rows:
+            break
+        
+        try:
+            db.session.execute(db.insert(Reminder), [{
+                'appointment_id': row.id,
+                'patient_id': row.patient_id,
+                'appointment_date': row.appointment_date,
+                'due_at': row.appointment_date - lead,
+                'status': 'pending'
+            } for row in rows])
+            db.session.commit()
+            added += len(rows)
+        except db.exc.IntegrityError:
+            # Another process issued some of these first; the next scan skips them
+            db.session.rollback()
+            continue
+        
+        if len(rows) < REMINDER_BATCH_SIZE:
+            break
+    return added
+
+def build_reminder_payload(reminder, now):
+    appointment = reminder.appointment
+    return {
+        'reminder_id': reminder.id,
+        'appointment_id': appointment.id,
+        'patient_email': appointment.patient.email,
+        'patient_name': f"{appointment.patient.first_name} {appointment.patient.last_name}",
+        'doctor_id': appointment.doctor_id,
+        'doctor_name': appointment.doctor.full_name,
+        'date': appointment.appointment_date.isoformat(),
+        'hours_until': round((appointment.appointment_date - now).total_seconds() / 3600, 1)
+    }
+
+def dispatch_due_reminders(now=None):
+    """
+    Deliver pending reminders that are due, oldest first. Each batch is
+    claimed under the write lock before delivery, so concurrent passes never
+    send the same reminder; reminders whose appointment was cancelled or moved
+    are skipped. Returns the number delivered.
+    """
+    now = now or datetime.now()
+    claim_expiry = now - timedelta(seconds=REMINDER_CLAIM_TIMEOUT_SECONDS)
+    delivered = 0
+    
+    while True:
+        begin_write_transaction()
+        batch = Reminder.query.options(
+            db.joinedload(Reminder.appointment).joinedload(Appointment.doctor),
+            db.joinedload(Reminder.appointment).joinedload(Appointment.patient)
+        ).filter(
+            Reminder.status == 'pending',
+            Reminder.due_at <= now,
+            db.or_(Reminder.claimed_at.is_(None), Reminder.claimed_at < claim_expiry)
+        ).order_by(Reminder.due_at).limit(REMINDER_BATCH_SIZE).all()
+        if not batch:
+            db.session.rollback()
+            break
+        
+        jobs, skipped = [], []
+        for reminder in batch:
+            appointment = reminder.appointment
+            if (appointment is None or appointment.status not in REMINDER_APPOINTMENT_STATUSES
+                    or appointment.appointment_date != reminder.appointment_date):
+                skipped.append(reminder.id)
+            else:
+                jobs.append(build_reminder_payload(reminder, now))
+            reminder.claimed_at = now
+        db.session.commit()
+        
+        sent = []
+        for payload in jobs:
+            try:
+                for handler in _reminder_handlers:
+                    handler(payload)
+            except Exception as e:
+                app.logger.exception('Reminder %s could not be delivered', payload['reminder_id'])
+                # The claim stays, so the retry waits for it to expire
+                Reminder.query.filter_by(id=payload['reminder_id']).update({
+                    Reminder.attempts: Reminder.attempts + 1,
+                    Reminder.last_error: str(e),
+                    Reminder.status: db.case((Reminder.attempts + 1 >= REMINDER_MAX_ATTEMPTS, 'failed'),
+                                             else_='pending')
+                }, synchronize_session=False)
+            else:
+                sent.append(payload['reminder_id'])
+        
+        if sent:
+            Reminder.query.filter(Reminder.id.in_(sent)).update({
+                Reminder.status: 'delivered',
+                Reminder.delivered_at: datetime.now(),
+                Reminder.attempts: Reminder.attempts + 1
+            }, synchronize_session=False)
+        if skipped:
+            Reminder.query.filter(Reminder.id.in_(skipped)).update(
+                {Reminder.status: 'skipped'}, synchronize_session=False)
+        db.session.commit()
+        delivered += len(sent)
+        
+        if len(batch) < REMINDER_BATCH_SIZE:
+            break
+    return delivered
+
+def run_reminder_pass(now=None):
+    """Enqueue newly due reminders and deliver them, and record the pass. Returns (enqueued, delivered)."""
+    counts = enqueue_due_reminders(now), dispatch_due_reminders(now)
+    db.session.execute(sqlite_insert(SchedulerLease).values(
+        name='reminders', last_pass_at=datetime.now()
+    ).on_conflict_do_update(index_elements=[SchedulerLease.name], set_={'last_pass_at': datetime.now()}))
+    db.session.commit()
+    return counts
+
+def acquire_scheduler_lease(name, holder, seconds, now=None):
+    """
+    Take or renew the lease `name` for `holder` when it is free, expired or
+    already held by `holder`. Returns whether `holder` holds it now.
+    """
+    now = now or datetime.now()
+    expires_at = now + timedelta(seconds=seconds)
+    begin_write_transaction()
+    db.session.execute(sqlite_insert(SchedulerLease).values(
+        name=name, holder=holder, expires_at=expires_at
+    ).on_conflict_do_update(
+        index_elements=[SchedulerLease.name],
+        set_={'holder': holder, 'expires_at': expires_at},
+        where=db.or_(SchedulerLease.holder.is_(None), SchedulerLease.holder == holder,
+                     SchedulerLease.expires_at <= now)
+    ))
+    held = db.session.query(SchedulerLease.holder).filter_by(name=name).scalar() == holder
+    db.session.commit()
+    return held
+
+_reminder_scheduler_stop = threading.Event()
+_reminder_scheduler_lock = threading.Lock()
+_reminder_scheduler_thread = None
+
+def _reminder_scheduler_loop():
+    holder = f'{os.getpid()}-{secrets.token_hex(4)}'
+    lease_seconds = REMINDER_LEASE_PASSES * REMINDER_SCAN_INTERVAL_SECONDS
+    while not _reminder_scheduler_stop.is_set():
+        try:
+            with app.app_context():
+                if acquire_scheduler_lease('reminders', holder, lease_seconds):
+                    run_reminder_pass()
+        except Exception:
+            app.logger.exception('Reminder pass failed')
+        _reminder_scheduler_stop.wait(REMINDER_SCAN_INTERVAL_SECONDS)
+
+def start_reminder_scheduler():
+    """
+    Start this process's scheduler thread unless it is running; it runs a pass
+    every REMINDER_SCAN_INTERVAL_SECONDS while it holds the reminders lease.
+    """
+    global _reminder_scheduler_thread
+    with _reminder_scheduler_lock:
+        if _reminder_scheduler_thread is None or not _reminder_scheduler_thread.is_alive():
+            _reminder_scheduler_stop.clear()
+            _reminder_scheduler_thread = threading.Thread(
+                target=_reminder_scheduler_loop, name='reminder-scheduler', daemon=True)
+            _reminder_scheduler_thread.start()
+        return _reminder_scheduler_thread
+
+def _start_reminder_scheduler():
+    # Started per process on its first request, so forked workers each get a thread
+    if REMINDERS_ENABLED and _reminder_scheduler_thread is None:
+        start_reminder_scheduler()
+
+app.before_request(_start_reminder_scheduler)
+
+def reminder_outbox_metrics(now=None):
+    """Gauges showing whether the reminder outbox is drained, in the Prometheus text format."""
+    now = now or datetime.now()
+    last_pass_at = db.session.query(SchedulerLease.last_pass_at).filter_by(name='reminders').scalar()
+    overdue = Reminder.query.filter(
+        Reminder.status == 'pending',
+        Reminder.due_at <= now - timedelta(seconds=2 * REMINDER_SCAN_INTERVAL_SECONDS)
+    ).count()
+    return '\n'.join([
+        '# HELP medschedule_reminder_last_pass_timestamp_seconds Unix time any process last finished '
+        'a reminder pass (0 if none ever did).',
+        '# TYPE medschedule_reminder_last_pass_timestamp_seconds gauge',
+        f'medschedule_reminder_last_pass_timestamp_seconds {last_pass_at.timestamp() if last_pass_at else 0:.3f}',
+        '# HELP medschedule_reminders_overdue Pending reminders due for more than two scan intervals.',
+        '# TYPE medschedule_reminders_overdue gauge',
+        f'medschedule_reminders_overdue {overdue}',
+    ]) + '\n'
+
+@app.route('/api/reminders')
+def get_reminders():
+    """
+    Get the reminders issued for a patient's upcoming appointments. Reads the
+    outbox written by the scheduler instead of scanning appointments.
+    """
+    email = request.args.get('email')
+    if not email:
+        return jsonify({'error': 'Email required'}), 400
+    
+    now = datetime.now()
+    reminders = Reminder.query.options(
+        db.joinedload(Reminder.appointment).joinedload(Appointment.doctor)
+    ).join(Patient, Patient.id == Reminder.patient_id).filter(
+        Patient.email == email,
+        Reminder.appointment_date >= now,
+        Reminder.status.in_(('pending', 'delivered'))
+    ).order_by(Reminder.appointment_date).all()
+    
+    return jsonify([{
+        'id': r.appointment_id,
+        'reminder_id': r.id,
+        'doctor_name': r.appointment.doctor.full_name,
+        'date': r.appointment_date.isoformat(),
+        'hours_until': round((r.appointment_date - now).total_seconds() / 3600, 1),
+        'delivered': r.status == 'delivered'
+    } for r in reminders if r.appointment and r.appointment.status in REMINDER_APPOINTMENT_STATUSES
+        and r.appointment.appointment_date == r.appointment_date])
+
+# ============ BULK IMPORT ============
+
+# Rows written per transaction by the bulk importer
+IMPORT_BATCH_SIZE = int(os.environ.get('IMPORT_BATCH_SIZE', '5000'))
+IMPORT_MAX_BATCH_SIZE = 50000
+
+# Row errors listed in an import report; later ones are only counted
+IMPORT_MAX_REPORTED_ERRORS = 1000
+
+APPOINTMENT_STATUSES = ('scheduled', 'completed', 'cancelled', 'rescheduled')
+APPOINTMENT_TYPES = ('in-person', 'video', 'phone')
+
+class ImportRowError(ValueError):
+    """A single import row that cannot be loaded."""
+
+def iter_import_rows(stream, fmt):
+    """
+    Yield (line_number, row) pairs from a text stream of CSV or NDJSON records
+    without reading the whole input. A row that cannot be parsed is yielded as
+    an ImportRowError instead of a dict.
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            # Empty CSV cells mean "not given", like a missing JSON key
+            yield reader.line_num, {key: value for key, value in row.items()
+                                    if key and value not in (None, '')}
+        return
+    
+    for line_number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_number, ImportRowError(f'Invalid JSON: {e}')
+            continue
+        if not isinstance(row, dict):
+            yield line_number, ImportRowError('Each line must be a JSON object')
+            continue
+        yield line_number, row
+
+def _import_text(row, field, required=False, max_length=None):
+    value = row.get(field)
+    value = '' if value is None else str(value).strip()
+    if required and not value:
+        raise ImportRowError(f'{field} is required')
+    if max_length and len(value) > max_length:
+        raise ImportRowError(f'{field} is longer than {max_length} characters')
+    return value
+
+def _import_int(row, field, default=None):
+    value = row.get(field)
+    if value in (None, ''):
+        return default
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ImportRowError(f'{field} must be an integer')
+
+def insert_returning_ids(model, rows):
+    """
+    Insert `rows` with one executemany and return their new ids in row order.
+    Ordered RETURNING runs one statement per row on SQLite, so the ids are
+    read back instead: the caller holds the write lock, the batch is the only
+    writer, and its rows take ascending ids in insertion order.
+    """
+    last_id = db.session.query(db.func.max(model.id)).scalar() or 0
+    db.session.execute(db.insert(model), rows)
+    return db.session.execute(
+        db.select(model.id).where(model.id > last_id).order_by(model.id)
+    ).scalars().all()
+
+class BulkImporter:
+    """
+    Load doctors or appointments from a stream of rows. Doctors, patients and
+    specialties are resolved through maps loaded once up front, conflicts are
+    checked against a per-doctor sorted schedule kept in memory, and rows are
+    written with one executemany per batch. Every rejected row is reported with
+    its line number; the rest of the input is still loaded.
+    """
+    
+    def __init__(self, batch_size=IMPORT_BATCH_SIZE):
+        self.batch_size = max(1, min(batch_size, IMPORT_MAX_BATCH_SIZE))
+        self.processed = 0
+        self.imported = 0
+        self.failed = 0
+        self.errors = []
+        self._pending = []        # (line_number, values) waiting for the next batch
+    
+    def report(self, kind):
+        return {
+            'kind': kind,
+            'processed': self.processed,
+            'imported': self.imported,
+            'failed': self.failed,
+            'errors': self.errors,
+            'errors_truncated': self.failed > len(self.errors)
+        }
+    
+    def _reject(self, line_number, message):
+        self.failed += 1
+        if len(self.errors) < IMPORT_MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line_number, 'error': message})
+    
+    def _load_rows(self, rows, parse_row, write_batch, undo_batch):
+        for line_number, row in rows:
+            self.processed += 1
+            try:
+                if isinstance(row, ImportRowError):
+                    raise row
+                self._pending.append((line_number, parse_row(row)))
+            except ImportRowError as e:
+                self._reject(line_number, str(e))
+                continue
+            if len(self._pending) >= self.batch_size:
+                self._write_pending(write_batch, undo_batch)
+        self._write_pending(write_batch, undo_batch)
+    
+    def _write_pending(self, write_batch, undo_batch):
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        try:
+            begin_write_transaction()
+            write_batch([values for _, values in batch])
+            db.session.commit()
+            self.imported += len(batch)
+        except (db.exc.IntegrityError, db.exc.OperationalError) as e:
+            db.session.rollback()
+            undo_batch([values for _, values in batch])
+            reason = getattr(e, 'orig', e)
+            for line_number, _ in batch:
+                self._reject(line_number, f'Batch rolled back: {reason}')
+    
+    # ---- doctors ----
+    
+    def import_doctors(self, rows):
+        """Create doctors with the same default weekday availability as the admin form."""
+        self._doctor_emails = {email for (email,) in db.session.query(Doctor.email) if email}
+        self._specialty_ids = {}
+        for specialty_id, name in db.session.query(Specialty.id, Specialty.name):
+            self._specialty_ids[specialty_id] = specialty_id
+            self._specialty_ids[name.lower()] = specialty_id
+        
+        imported_ids = []
+        start_time = datetime.strptime('09:00', '%H:%M').time()
+        end_time = datetime.strptime('17:00', '%H:%M').time()
+        
+        def write_batch(values):
+            doctor_ids = insert_returning_ids(Doctor, values)
+            db.session.execute(db.insert(DoctorAvailability), [
+                {'doctor_id': doctor_id, 'day_of_week': day, 'start_time': start_time,
+                 'end_time': end_time, 'is_available': True}
+                for doctor_id in doctor_ids for day in range(5)
+            ])
+            bump_cache_versions('doctors', *(key for doctor_id in doctor_ids
+                                             for key in (f'doctor:{doctor_id}', f'availability:{doctor_id}')))
+            imported_ids.extend(doctor_ids)
+        
+        def undo_batch(values):
+            for doctor in values:
+                self._doctor_emails.discard(doctor['email'])
+        
+        self._load_rows(rows, self._parse_doctor, write_batch, undo_batch)
+        
+        if imported_ids:
+            rebuild_doctor_search_index()
+        return self.report('doctors')
+    
+    def _parse_doctor(self, row):
+        email = _import_text(row, 'email', required=True, max_length=100)
+        if email in self._doctor_emails:
+            raise ImportRowError('A doctor with this email already exists')
+        
+        if row.get('specialtyId') not in (None, ''):
+            specialty_id = self._specialty_ids.get(_import_int(row, 'specialtyId'))
+        else:
+            specialty_id = self._specialty_ids.get(_import_text(row, 'specialty').lower())
+        if specialty_id is None:
+            raise ImportRowError('Invalid specialty')
+        
+        values = {
+            'first_name': _import_text(row, 'firstName', required=True, max_length=50),
+            'last_name': _import_text(row, 'lastName', required=True, max_length=50),
+            'specialty_id': specialty_id,
+            'email': email,
+            'phone': _import_text(row, 'phone', max_length=20),
+            'bio': _import_text(row, 'bio'),
+            'image_url': _import_text(row, 'imageUrl', max_length=200),
+            'estimated_wait_time': _import_int(row, 'waitTime', 15),
+            'consultation_types': _import_text(row, 'consultationTypes', max_length=200) or 'in-person',
+            'years_experience': _import_int(row, 'yearsExperience', 5)
+        }
+        self._doctor_emails.add(email)
+        return values
+    
+    # ---- appointments ----
+    
+    def import_appointments(self, rows):
+        """
+        Create appointments, creating patients by email the way the booking
+        form does. Rows overlapping a booked appointment, in the database or
+        earlier in the same input, are rejected.
+        """
+        self._doctor_ids = {}
+        for doctor_id, email in db.session.query(Doctor.id, Doctor.email):
+            self._doctor_ids[doctor_id] = doctor_id
+            if email:
+                self._doctor_ids.setdefault(email.lower(), doctor_id)
+        # First patient per email wins, matching Patient.query.filter_by(email=...).first()
+        self._patient_ids = {}
+        for patient_id, email in db.session.query(Patient.id, Patient.email).order_by(Patient.id.desc()):
+            self._patient_ids[email] = patient_id
+        self._schedules = {}      # doctor_id -> sorted booked starts
+        self._new_patients = {}   # email -> values of patients the pending batch creates
+        self._touched_doctors = set()
+        
+        self._load_rows(rows, self._parse_appointment, self._write_appointments,
+                        self._undo_appointments)
+        
+        for doctor_id in self._touched_doctors:
+            appointment_index.drop_doctor(doctor_id)
+        return self.report('appointments')
+    
+    def _schedule(self, doctor_id):
+        starts = self._schedules.get(doctor_id)
+        if starts is None:
+            starts = [row[0] for row in db.session.query(Appointment.appointment_date).filter(
+                Appointment.doctor_id == doctor_id,
+                Appointment.status != 'cancelled'
+            ).order_by(Appointment.appointment_date)]
+            self._schedules[doctor_id] = starts
+        return starts
+    
+    def _parse_appointment(self, row):
+        if row.get('doctorId') not in (None, ''):
+            doctor_id = self._doctor_ids.get(_import_int(row, 'doctorId'))
+        else:
+            doctor_id = self._doctor_ids.get(_import_text(row, 'doctorEmail', required=True).lower())
+        if doctor_id is None:
+            raise ImportRowError('Doctor not found')
+        
+        date_text = _import_text(row, 'dateTime', required=True)
+        try:
+            appointment_date = datetime.fromisoformat(date_text)
+        except ValueError:
+            raise ImportRowError('Invalid date format')
+        if appointment_date.tzinfo is not None:
+            raise ImportRowError('dateTime must not carry a timezone offset')
+        
+        status = _import_text(row, 'status') or 'scheduled'
+        if status not in APPOINTMENT_STATUSES:
+            raise ImportRowError(f'status must be one of {", ".join(APPOINTMENT_STATUSES)}')
+        appointment_type = _import_text(row, 'appointmentType') or 'in-person'
+        if appointment_type not in APPOINTMENT_TYPES:
+            raise ImportRowError(f'appointmentType must be one of {", ".join(APPOINTMENT_TYPES)}')
+        
+        email = _import_text(row, 'email', required=True, max_length=100)
+        new_patient = None
+        if email not in self._patient_ids and email not in self._new_patients:
+            new_patient = {
+                'first_name': _import_text(row, 'firstName', required=True, max_length=50),
+                'last_name': _import_text(row, 'lastName', required=True, max_length=50),
+                'email': email,
+                'phone': _import_text(row, 'phone', max_length=20)
+            }
+        values = {
+            'doctor_id': doctor_id,
+            'patient_email': email,
+            'appointment_date': appointment_date,
+            'status': status,
+            'reason': _import_text(row, 'reason'),
+            'notes': _import_text(row, 'notes'),
+            'appointment_type': appointment_type
+        }
+        
+        # Cancelled appointments do not hold their slot
+        if status != 'cancelled':
+            starts = self._schedule(doctor_id)
+            if not is_slot_free(appointment_date, starts):
+                raise ImportRowError(f'Overlaps an existing appointment for doctor {doctor_id} '
+                                     f'at {appointment_date.isoformat()}')
+            bisect.insort(starts, appointment_date)
+        if new_patient:
+            self._new_patients[email] = new_patient
+        return values
+    
+    def _write_appointments(self, values):
+        if self._new_patients:
+            new_patients = list(self._new_patients.values())
+            patient_ids = insert_returning_ids(Patient, new_patients)
+            for patient, patient_id in zip(new_patients, patient_ids):
+                self._patient_ids[patient['email']] = patient_id
+        
+        rows = []
+        for value in values:
+            row = dict(value)
+            row['patient_id'] = self._patient_ids[row.pop('patient_email')]
+            rows.append(row)
+            self._touched_doctors.add(row['doctor_id'])
+        db.session.execute(db.insert(Appointment), rows)
+        refresh_patient_visit_stats(row['patient_id'] for row in rows)
+        bump_cache_versions(*(f"appointments:{row['doctor_id']}" for row in rows))
+        self._new_patients = {}
+    
+    def _undo_appointments(self, values):
+        # Patients created by the rolled-back batch are gone, and its rows
+        # must leave the in-memory schedules; those reload from the database
+        for email in self._new_patients:
+            self._patient_ids.pop(email, None)
+        self._new_patients = {}
+        for value in values:
+            self._schedules.pop(value['doctor_id'], None)
+
+IMPORT_KINDS = {
+    'doctors': BulkImporter.import_doctors,
+    'appointments': BulkImporter.import_appointments
+}
+
+def run_bulk_import(kind, stream, fmt, batch_size=IMPORT_BATCH_SIZE):
+    """Import a text stream of `kind` rows and return the report."""
+    importer = BulkImporter(batch_size)
+    return IMPORT_KINDS[kind](importer, iter_import_rows(stream, fmt))
+
+@app.route('/api/admin/import/<kind>', methods=['POST'])
+def admin_bulk_import(kind):
+    """
+    Bulk-load doctors or appointments from a CSV or NDJSON request body.
+    The body is read as a stream; `format` defaults from the Content-Type.
+    """
+    if not check_admin_auth():
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    if kind not in IMPORT_KINDS:
+        return jsonify({'error': f'Unknown import kind: {kind}'}), 404
+    
+    fmt = request.args.get('format')
+    if not fmt:
+        fmt = 'ndjson' if 'json' in (request.mimetype or '') else 'csv'
+    if fmt not in ('csv', 'ndjson'):
+        return jsonify({'error': 'format must be csv or ndjson'}), 400
+    
+    batch_size = request.args.get('batch_size', IMPORT_BATCH_SIZE, type=int)
+    stream = io.TextIOWrapper(request.stream, encoding='utf-8-sig', newline='')
+    try:
+        report = run_bulk_import(kind, stream, fmt, batch_size)
+    except (UnicodeDecodeError, csv.Error) as e:
+        db.session.rollback()
+        return jsonify({'error': f'Could not read import data: {e}'}), 400
+    return jsonify(report)
+
+# ============ SYNTHETIC DATA ============
+# Production-sized datasets for capacity testing. Every value is drawn from one
+# seeded random generator, so the same options always produce the same rows,
+# and rows are written with one executemany per batch like the bulk importer.
+# Generated appointments, reviews and favorites only reference the doctors and
+# patients generated in the same run, so existing rows are untouched; the run
+# ends by bumping the version counters, so running servers drop cached responses.
+
+SYNTHETIC_BATCH_SIZE = 20000
+SYNTHETIC_PAST_DAYS = 180
+SYNTHETIC_FUTURE_DAYS = 60
+SYNTHETIC_EMAIL_DOMAIN = 'synthetic.medschedule.test'
+
+SYNTHETIC_FIRST_NAMES = [
+    'Sarah', 'Michael', 'Emily', 'David', 'Lisa', 'James', 'Maria', 'Robert', 'Anna', 'John',
+    'Laura', 'Daniel', 'Sofia', 'Mark', 'Elena', 'Paul', 'Ioana', 'Andrei', 'Grace', 'Omar',
+    'Chloe', 'Lucas', 'Mia', 'Noah', 'Hannah', 'Ethan', 'Aisha', 'Mateo', 'Yuki', 'Priya'
+]
+SYNTHETIC_LAST_NAMES = [
+    'Johnson', 'Chen', 'Williams', 'Brown', 'Anderson', 'Wilson', 'Garcia', 'Taylor', 'Popescu',
+    'Martin', 'Lee', 'Novak', 'Silva', 'Ionescu', 'Walker', 'King', 'Nguyen', 'Patel', 'Kim',
+    'Muller', 'Rossi', 'Dubois', 'Kowalski', 'Haddad', 'Okafor', 'Sato', 'Lopez', 'Evans'
+]
+SYNTHETIC_REASONS = [
+    'Annual checkup', 'Follow-up visit', 'Persistent headache', 'Back pain', 'Skin rash',
+    'Prescription renewal', 'Test results review', 'Chest discomfort', 'Vision check', 'Vaccination'
+]
+SYNTHETIC_REVIEW_COMMENTS = {
+    1: ['Very long wait and the visit felt rushed.'],
+    2: ['The doctor was fine but scheduling was difficult.'],
+    3: ['Average experience, nothing special.'],
+    4: ['Helpful and attentive, would come back.', 'Good visit, clear explanations.'],
+    5: ['Excellent doctor, highly recommended!', 'Took the time to answer every question.']
+}
+SYNTHETIC_RATING_WEIGHTS = [3, 5, 12, 35, 45]   # share of 1..5 star reviews
+SYNTHETIC_CONSULTATION_TYPES = ['in-person', 'in-person,video', 'in-person,video,phone']
+
+# Weekly availability patterns: (weekdays, [(start, end)], relative weight)
+SYNTHETIC_SCHEDULES = [
+    ((0, 1, 2, 3, 4), [('09:00', '17:00')], 60),
+    ((0, 1, 2, 3, 4), [('08:00', '12:00'), ('13:00', '17:00')], 20),
+    ((0, 1, 2, 3, 4, 5), [('09:00', '13:00')], 10),
+    ((0, 2, 4), [('10:00', '18:00')], 10),
+]
+
+class SyntheticDataGenerator:
+    """
+    Generate doctors with varied weekly schedules, patients, appointments with a
+    realistic status mix (including reschedules), reviews of completed visits
+    and favorite doctors. Busy doctors and frequent patients are drawn from
+    skewed distributions rather than uniformly.
+    """
+    
+    def __init__(self, seed=42, batch_size=SYNTHETIC_BATCH_SIZE,
+                 past_days=SYNTHETIC_PAST_DAYS, future_days=SYNTHETIC_FUTURE_DAYS):
+        self.rng = random.Random(seed)
+        self.batch_size = max(1, batch_size)
+        self.past_days = past_days
+        self.future_days = future_days
+        self.counts = {}
+    
+    def _insert(self, model, rows, returning=False):
+        """
+        Write rows in batches, one transaction each; returns the new ids when
+        asked. The inserts go through the ORM, so each commit reports its
+        tables to the change tracking listeners like any other write.
+        """
+        ids = []
+        for start in range(0, len(rows), self.batch_size):
+            batch = rows[start:start + self.batch_size]
+            begin_write_transaction()
+            if returning:
+                ids.extend(insert_returning_ids(model, batch))
+            else:
+                db.session.execute(db.insert(model), batch)
+            db.session.commit()
+        self.counts[model.__tablename__] = self.counts.get(model.__tablename__, 0) + len(rows)
+        return ids
+    
+    def _name(self):
+        return self.rng.choice(SYNTHETIC_FIRST_NAMES), self.rng.choice(SYNTHETIC_LAST_NAMES)
+    
+    def _specialty_ids(self):
+        if not Specialty.query.first():
+            self._insert(Specialty, [{'name': name, 'description': description}
+                                     for name, description in SAMPLE_SPECIALTIES])
+            bump_cache_versions('specialties')
+        return [specialty_id for (specialty_id,) in db.session.query(Specialty.id).order_by(Specialty.id)]
+    
+    def _doctors(self, count, specialty_ids):
+        """Returns {doctor_id: consultation types} for the new doctors."""
+        rng = self.rng
+        first_number = (db.session.query(db.func.max(Doctor.id)).scalar() or 0) + 1
+        rows = []
+        for number in range(first_number, first_number + count):
+            first_name, last_name = self._name()
+            years = rng.randint(2, 35)
+            rows.append({
+                'first_name': first_name,
+                'last_name': last_name,
+                'specialty_id': rng.choice(specialty_ids),
+                'email': f'{first_name}.{last_name}.{number}@{SYNTHETIC_EMAIL_DOMAIN}'.lower(),
+                'phone': f'555-{rng.randint(1000000, 9999999)}',
+                'bio': f'Dr. {first_name} {last_name} has {years} years of clinical experience.',
+                'estimated_wait_time': rng.choice([5, 10, 15, 20, 30]),
+                'consultation_types': rng.choice(SYNTHETIC_CONSULTATION_TYPES),
+                'years_experience': years,
+                'rating': 0.0,
+                'review_count': 0
+            })
+        doctor_ids = self._insert(Doctor, rows, returning=True)
+        return {doctor_id: row['consultation_types'].split(',') for doctor_id, row in zip(doctor_ids, rows)}
+    
+    def _availability(self, doctor_ids):
+        """Give each doctor a weekly pattern; returns {doctor_id: index into SYNTHETIC_SCHEDULES}."""
+        weights = [weight for _, _, weight in SYNTHETIC_SCHEDULES]
+        schedules = {doctor_id: self.rng.choices(range(len(SYNTHETIC_SCHEDULES)), weights)[0]
+                     for doctor_id in doctor_ids}
+        rows = []
+        for doctor_id, schedule in schedules.items():
+            days, windows, _ = SYNTHETIC_SCHEDULES[schedule]
+            for day in days:
+                for start, end in windows:
+                    rows.append({
+                        'doctor_id': doctor_id, 'day_of_week': day, 'is_available': True,
+                        'start_time': datetime.strptime(start, '%H:%M').time(),
+                        'end_time': datetime.strptime(end, '%H:%M').time()
+                    })
+        self._insert(DoctorAvailability, rows)
+        return schedules
+    
+    def _patients(self, count):
+        rng = self.rng
+        first_number = (db.session.query(db.func.max(Patient.id)).scalar() or 0) + 1
+        rows = []
+        for number in range(first_number, first_number + count):
+            first_name, last_name = self._name()
+            rows.append({
+                'first_name': first_name,
+                'last_name': last_name,
+                'email': f'patient.{number}@{SYNTHETIC_EMAIL_DOMAIN}',
+                'phone': f'555-{rng.randint(1000000, 9999999)}'
+            })
+        return self._insert(Patient, rows, returning=True)
+    
+    def _slot_grids(self, first_day):
+        """Every bookable slot of each schedule pattern between the past and future horizon."""
+        grids = []
+        for days, windows, _ in SYNTHETIC_SCHEDULES:
+            offsets = window_slot_offsets({day: [
+                (datetime.strptime(start, '%H:%M').time(), datetime.strptime(end, '%H:%M').time())
+                for start, end in windows
+            ] for day in days})
+            grid = []
+            for offset in range(self.past_days + self.future_days):
+                day = first_day + timedelta(days=offset)
+                day_start = datetime.combine(day, datetime.min.time())
+                grid.extend(day_start + timedelta(minutes=minute) for minute in offsets.get(day.weekday(), ()))
+            grids.append(grid)
+        return grids
+    
+    def _appointment_row(self, doctor_id, types, patient_ids, start, now):
+        rng = self.rng
+        roll = rng.random()
+        if start < now:
+            status = 'completed' if roll < 0.85 else 'cancelled' if roll < 0.95 else 'scheduled'
+        else:
+            status = 'scheduled' if roll < 0.88 else 'cancelled'
+        reschedule_count = 0
+        if status != 'cancelled' and rng.random() < 0.08:
+            reschedule_count = 1 if rng.random() < 0.85 else 2
+            if status == 'scheduled':
+                status = 'rescheduled'
+        return {
+            'doctor_id': doctor_id,
+            # Squaring the draw makes low-numbered patients the frequent visitors
+            'patient_id': patient_ids[int(len(patient_ids) * rng.random() ** 2)],
+            'appointment_date': start,
+            'status': status,
+            'reason': rng.choice(SYNTHETIC_REASONS),
+            'appointment_type': rng.choice(types),
+            'reschedule_count': reschedule_count,
+            'created_at': start - timedelta(days=rng.randint(1, 45), minutes=rng.randint(0, 1439))
+        }
+    
+    def _review_row(self, appointment, appointment_id):
+        rating = self.rng.choices(range(1, 6), SYNTHETIC_RATING_WEIGHTS)[0]
+        return {
+            'appointment_id': appointment_id,
+            'doctor_id': appointment['doctor_id'],
+            'patient_id': appointment['patient_id'],
+            'rating': rating,
+            'comment': self.rng.choice(SYNTHETIC_REVIEW_COMMENTS[rating]),
+            'created_at': appointment['appointment_date'] + timedelta(days=self.rng.randint(1, 7))
+        }
+    
+    def _appointments(self, count, doctor_types, schedules, patient_ids, review_rate):
+        """
+        Spread `count` appointments over the doctors with log-normal weights,
+        each doctor on distinct slots of its own schedule, and review a share
+        of the completed ones. Rows are generated and written batch by batch.
+        """
+        rng = self.rng
+        now = datetime.now()
+        grids = self._slot_grids(now.date() - timedelta(days=self.past_days))
+        
+        weights = {doctor_id: rng.lognormvariate(0, 0.6) for doctor_id in doctor_types}
+        total_weight = sum(weights.values())
+        
+        pending, reviews = [], []
+        
+        def flush():
+            appointment_ids = self._insert(Appointment, pending, returning=True)
+            for row, appointment_id in zip(pending, appointment_ids):
+                if row['status'] == 'completed' and rng.random() < review_rate:
+                    reviews.append(self._review_row(row, appointment_id))
+            pending.clear()
+            if len(reviews) >= self.batch_size:
+                self._insert(Review, reviews)
+                reviews.clear()
+        
+        for doctor_id, types in doctor_types.items():
+            grid = grids[schedules[doctor_id]]
+            quota = min(round(count * weights[doctor_id] / total_weight), len(grid))
+            for start in sorted(rng.sample(grid, quota)):
+                pending.append(self._appointment_row(doctor_id, types, patient_ids, start, now))
+            if len(pending) >= self.batch_size:
+                flush()
+        flush()
+        self._insert(Review, reviews)
+    
+    def _favorites(self, doctor_ids, patient_ids, favorite_rate):
+        rng = self.rng
+        rows = []
+        for patient_id in patient_ids:
+            if rng.random() < favorite_rate:
+                for doctor_id in rng.sample(doctor_ids, min(rng.randint(1, 3), len(doctor_ids))):
+                    rows.append({'patient_id': patient_id, 'doctor_id': doctor_id})
+        self._insert(FavoriteDoctor, rows)
+    
+    def generate(self, doctors, patients, appointments, review_rate=0.3, favorite_rate=0.2):
+        """Generate the dataset and return the number of rows written per table."""
+        specialty_ids = self._specialty_ids()
+        doctor_types = self._doctors(doctors, specialty_ids)
+        schedules = self._availability(doctor_types)
+        patient_ids = self._patients(patients)
+        if doctor_types and patient_ids:
+            self._appointments(appointments, doctor_types, schedules, patient_ids, review_rate)
+            self._favorites(list(doctor_types), patient_ids, favorite_rate)
+        
+        # Ratings, visit statistics and the search index are derived data; rebuild them in bulk once
+        refresh_patient_visit_stats()
+        recompute_doctor_ratings()
+        rebuild_doctor_search_index()
+        bump_cache_versions('doctors', 'favorites', *(
+            key for doctor_id in doctor_types
+            for key in (f'doctor:{doctor_id}', f'availability:{doctor_id}', f'appointments:{doctor_id}')))
+        db.session.commit()
+        return self.counts
+
+# ============ MAINTENANCE COMMANDS ============
+
+@app.cli.command('recompute-ratings')
+def recompute_ratings_command():
+    """Rebuild doctor rating totals and histograms from the reviews table."""
+    changed = recompute_doctor_ratings()
+    click.echo(f'Recomputed ratings; {changed} doctor(s) had drifted.')
+
+@app.cli.command('db-settings')
+def db_settings_command():
+    """Print the effective database URI, pool and SQLite pragma settings."""
+    for name, value in describe_database_settings().items():
+        click.echo(f'{name}: {value}')
+
+@app.cli.command('send-reminders')
+@click.option('--watch', is_flag=True, help='Keep running a pass every REMINDER_SCAN_INTERVAL_SECONDS.')
+def send_reminders_command(watch):
+    """Issue and deliver due appointment reminders (for cron or a worker process)."""
+    holder = f'cli-{os.getpid()}-{secrets.token_hex(4)}'
+    lease_seconds = REMINDER_LEASE_PASSES * REMINDER_SCAN_INTERVAL_SECONDS
+    while True:
+        # A watching worker takes turns with the server processes' scheduler threads
+        if not watch or acquire_scheduler_lease('reminders', holder, lease_seconds):
+            enqueued, delivered = run_reminder_pass()
+            click.echo(f'Enqueued {enqueued} reminder(s); delivered {delivered}.')
+        if not watch:
+            break
+        time.sleep(REMINDER_SCAN_INTERVAL_SECONDS)
+
+@app.cli.command('seed-data')
+@click.option('--doctors', default=100, show_default=True, help='Doctors to generate.')
+@click.option('--patients', default=5000, show_default=True, help='Patients to generate.')
+@click.option('--appointments', default=50000, show_default=True, help='Appointments to generate.')
+@click.option('--reviews', 'review_rate', default=0.3, show_default=True,
+              help='Share of completed appointments that get a review.')
+@click.option('--favorites', 'favorite_rate', default=0.2, show_default=True,
+              help='Share of patients with favorite doctors.')
+@click.option('--seed', default=42, show_default=True, help='Random seed; the same seed gives the same data.')
+@click.option('--batch-size', default=SYNTHETIC_BATCH_SIZE, show_default=True,
+              help='Rows written per transaction.')
+def seed_data_command(doctors, patients, appointments, review_rate, favorite_rate, seed, batch_size):
+    """Generate synthetic doctors, patients, appointments, reviews and favorites."""
+    bootstrap_schema()
+    started = time.monotonic()
+    counts = SyntheticDataGenerator(seed, batch_size).generate(
+        doctors, patients, appointments, review_rate, favorite_rate)
+    click.echo(f'Generated in {time.monotonic() - started:.1f}s:')
+    for table, count in counts.items():
+        click.echo(f'  {table}: {count}')
+
+@app.cli.command('import-data')
+@click.argument('kind', type=click.Choice(sorted(IMPORT_KINDS)))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'ndjson']),
+              help='Input format; defaults from the file extension.')
+@click.option('--batch-size', default=IMPORT_BATCH_SIZE, show_default=True,
+              help='Rows written per transaction.')
+def import_data_command(kind, path, fmt, batch_size):
+    """Bulk-load doctors or appointments from a CSV or NDJSON file."""
+    bootstrap_schema()
+    if not fmt:
+        fmt = 'ndjson' if path.lower().endswith(('.ndjson', '.jsonl')) else 'csv'
+    with open(path, encoding='utf-8-sig', newline='') as stream:
+        report = run_bulk_import(kind, stream, fmt, batch_size)
+    click.echo(f"Imported {report['imported']} of {report['processed']} {kind} row(s); "
+               f"{report['failed']} failed.")
+    for error in report['errors']:
+        click.echo(f"  line {error['line']}: {error['error']}")
+    if report['errors_truncated']:
+        click.echo(f"  ... {report['failed'] - len(report['errors'])} more error(s) not shown")
 
 # Error handlers
 @app.errorhandler(404)
@@ -0,0 +1,490 @@
+"""
+MedSchedule API benchmarks
+Fills a throwaway SQLite database with the `flask seed-data` generator at one
+or more dataset scales, calls every route in app.py through the Flask test
+client and records latency percentiles and SQL statement counts per route. Results are written as JSON
+so runs from different commits can be compared.
+
+Usage:
+    python benchmarks/bench_api.py
+    python benchmarks/bench_api.py --scale small --scale medium --requests 100
+    python benchmarks/bench_api.py --compare benchmarks/results/<earlier run>.json
+
+Each scale runs in a fresh interpreter, so caches and the interval index
+start cold. The first call of every route is reported separately as
+`cold_ms`; the percentiles cover the remaining (warm) calls. Read routes run
+before write routes, and every write targets rows no other call touches.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+import argparse
+import io
+import json
+import math
+import multiprocessing
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+
+SCALES = {
+    'small': {'doctors': 100, 'patients': 2_000, 'appointments': 10_000},
+    'medium': {'doctors': 1_000, 'patients': 50_000, 'appointments': 500_000},
+    'large': {'doctors': 10_000, 'patients': 500_000, 'appointments': 5_000_000},
+}
+
+PERCENTILES = (50, 90, 95, 99)
+
+# Write routes book far beyond the generated range so they never collide with it
+BOOKING_OFFSET_DAYS = 400
+RESCHEDULE_OFFSET_DAYS = 600
+HOLD_OFFSET_DAYS = 800
+IMPORT_OFFSET_DAYS = 1000
+IMPORT_ROWS_PER_REQUEST = 20
+
+# Exporting the full table at large scales takes minutes; the benchmark exports one week
+EXPORT_WINDOW_DAYS = 7
+
+# ============ FIXTURES ============
+
+def weekday_slots(first_day, day_count):
+    """Every 30-minute slot between 09:00 and 17:00 on the weekdays of a date range."""
+    slots = []
+    for offset in range(day_count):
+        day = first_day + timedelta(days=offset)
+        if day.weekday() < 5:
+            day_start = datetime.combine(day, datetime.min.time())
+            slots.extend(day_start + timedelta(minutes=minute) for minute in range(9 * 60, 17 * 60, 30))
+    return slots
+
+def far_future_slots(doctor_ids, offset_days):
+    """Endless supply of distinct (doctor_id, slot) pairs starting `offset_days` from today."""
+    first_day = date.today() + timedelta(days=offset_days)
+    week = 0
+    while True:
+        for slot in weekday_slots(first_day + timedelta(weeks=week), 7):
+            for doctor_id in doctor_ids:
+                yield doctor_id, slot
+        week += 1
+
+def load_fixtures(m, seed, requests):
+    """Pick the ids and pools of rows the route cases work on."""
+    rng = random.Random(seed + 1)
+    db, Appointment = m.db, m.Appointment
+    now = datetime.now()
+
+    doctor_ids = [row[0] for row in db.session.query(m.Doctor.id).order_by(m.Doctor.id)]
+    upcoming = [row[0] for row in db.session.query(Appointment.id).filter(
+        Appointment.status == 'scheduled', Appointment.appointment_date > now + timedelta(days=2)
+    ).order_by(Appointment.id).limit(requests * 5)]
+    rng.shuffle(upcoming)
+    reviewable = db.session.query(Appointment.id, Appointment.doctor_id, Appointment.patient_id).filter(
+        Appointment.status == 'completed', ~Appointment.review.has()
+    ).order_by(Appointment.id).limit(requests).all()
+    busy_patient = db.session.query(Appointment.patient_id).group_by(Appointment.patient_id).order_by(
+        db.func.count().desc()).first()[0]
+
+    next_weekday = date.today() + timedelta(days=1)
+    while next_weekday.weekday() > 4:
+        next_weekday += timedelta(days=1)
+
+    # One stored profile for the profile detail and download routes
+    profiled = m.app.test_client().get('/api/admin/profiles', headers={
+        'X-Admin-Password': m.ADMIN_PASSWORD, 'X-Profile': '1'})
+
+    return {
+        'doctor_ids': doctor_ids,
+        'sample_doctors': rng.sample(doctor_ids, min(50, len(doctor_ids))),
+        'specialty_ids': [row[0] for row in db.session.query(m.Specialty.id)],
+        'appointment_ids': [row[0] for row in db.session.query(Appointment.id).limit(1000)],
+        'patient_ids': [row[0] for row in db.session.query(m.Patient.id).limit(1000)],
+        'patient_email': db.session.get(m.Patient, busy_patient).email,
+        'busy_patient_id': busy_patient,
+        'profile_id': int(profiled.headers['X-Profile-Id']),
+        # Disjoint pools so one write route never sees another's changes
+        'reschedule_pool': upcoming[0::4],
+        'cancel_pool': upcoming[1::4],
+        'complete_pool': upcoming[2::4],
+        'delete_pool': upcoming[3::4],
+        'review_pool': reviewable,
+        'slot_date': next_weekday.isoformat(),
+        'today': date.today(),
+        'bookings': far_future_slots(doctor_ids, BOOKING_OFFSET_DAYS),
+        'reschedules': far_future_slots([None], RESCHEDULE_OFFSET_DAYS),
+        'holds': far_future_slots(doctor_ids, HOLD_OFFSET_DAYS),
+        'imports': far_future_slots(doctor_ids, IMPORT_OFFSET_DAYS),
+        'hold_tokens': [],
+        'created_doctors': [],
+    }
+
+# ============ ROUTE CASES ============
+
+class RouteCase:
+    """
+    One benchmarked route. `build(i)` returns (method, path, request kwargs)
+    for the i-th call, or None once the case has run out of targets;
+    `after(response)` sees each response, e.g. to collect created ids.
+    """
+
+    def __init__(self, method, rule, build, after=None, stream=False, limit=None):
+        self.method = method
+        self.rule = rule
+        self.build = build
+        self.after = after
+        self.stream = stream
+        self.limit = limit
+
+    @property
+    def name(self):
+        return f'{self.method} {self.rule}'
+
+def pick(items, i):
+    return items[i % len(items)]
+
+def take(items, i):
+    return items[i] if i < len(items) else None
+
+def build_cases(m, fx):
+    admin = {'headers': {'X-Admin-Password': m.ADMIN_PASSWORD}}
+    doctors, slot_date = fx['sample_doctors'], fx['slot_date']
+    week_from = fx['today'] - timedelta(days=EXPORT_WINDOW_DAYS)
+
+    def get(rule, path, **kwargs):
+        return RouteCase('GET', rule, lambda i: ('GET', path(i), {}), **kwargs)
+
+    def get_admin(rule, path, **kwargs):
+        return RouteCase('GET', rule, lambda i: ('GET', path(i), admin), **kwargs)
+
+    def booking(i):
+        doctor_id, slot = next(fx['bookings'])
+        return 'POST', '/api/appointments', {'json': {
+            'doctorId': doctor_id, 'firstName': 'Bench', 'lastName': 'Patient',
+            'email': f'booking{i}@bench.example', 'dateTime': slot.isoformat(), 'reason': 'Benchmark'
+        }}
+
+    def reschedule(i):
+        appointment_id = take(fx['reschedule_pool'], i)
+        if appointment_id is None:
+            return None
+        _, slot = next(fx['reschedules'])
+        return 'POST', f'/api/appointments/{appointment_id}/reschedule', {'json': {'newDateTime': slot.isoformat()}}
+
+    def pooled_post(pool, path):
+        def build(i):
+            appointment_id = take(fx[pool], i)
+            return None if appointment_id is None else ('POST', path.format(appointment_id), {})
+        return build
+
+    def review(i):
+        row = take(fx['review_pool'], i)
+        if row is None:
+            return None
+        return 'POST', '/api/reviews', {'json': {
+            'appointmentId': row[0], 'doctorId': row[1], 'patientId': row[2], 'rating': 1 + i % 5,
+            'comment': 'Benchmark review'
+        }}
+
+    def hold(i):
+        doctor_id, slot = next(fx['holds'])
+        return 'POST', '/api/slot-holds', {'json': {'doctorId': doctor_id, 'dateTime': slot.isoformat()}}
+
+    def release(i):
+        token = take(fx['hold_tokens'], i)
+        return None if token is None else ('DELETE', f'/api/slot-holds/{token}', {})
+
+    def add_doctor(i):
+        return 'POST', '/api/admin/doctors', {**admin, 'json': {
+            'firstName': 'Bench', 'lastName': f'Doctor{i}', 'specialtyId': pick(fx['specialty_ids'], i),
+            'email': f'new-doctor{i}@bench.example'
+        }}
+
+    def update_doctor(i):
+        return 'PUT', f'/api/admin/doctors/{pick(doctors, i)}', {**admin, 'json': {'bio': f'Updated bio {i}'}}
+
+    def delete_doctor(i):
+        doctor_id = take(fx['created_doctors'], i)
+        return None if doctor_id is None else ('DELETE', f'/api/admin/doctors/{doctor_id}', admin)
+
+    def delete_appointment(i):
+        appointment_id = take(fx['delete_pool'], i)
+        return None if appointment_id is None else ('DELETE', f'/api/admin/appointments/{appointment_id}', admin)
+
+    def import_appointments(i):
+        buffer = io.StringIO()
+        buffer.write('doctorId,email,firstName,lastName,dateTime\n')
+        for row in range(IMPORT_ROWS_PER_REQUEST):
+            doctor_id, slot = next(fx['imports'])
+            buffer.write(f'{doctor_id},import{i}-{row}@bench.example,Bench,Import,{slot.isoformat()}\n')
+        return 'POST', '/api/admin/import/appointments?format=csv', {
+            **admin, 'data': buffer.getvalue(), 'content_type': 'text/csv'}
+
+    def collect(key, field):
+        def after(response):
+            if response.status_code == 201:
+                fx[key].append(response.get_json()[field])
+        return after
+
+    reads = [
+        get('/', lambda i: '/'),
+        get('/favicon.ico', lambda i: '/favicon.ico'),
+        get('/api/specialties', lambda i: '/api/specialties'),
+        get('/api/doctors', lambda i: f'/api/doctors?specialty_id={pick(fx["specialty_ids"], i)}'),
+        get('/api/doctors/<int:doctor_id>', lambda i: f'/api/doctors/{pick(doctors, i)}'),
+        get('/api/doctors/search', lambda i: f'/api/doctors/search?q={pick(m.SYNTHETIC_LAST_NAMES, i)}'),
+        get('/api/doctors/<int:doctor_id>/availability', lambda i: f'/api/doctors/{pick(doctors, i)}/availability'),
+        get('/api/doctors/<int:doctor_id>/reviews', lambda i: f'/api/doctors/{pick(doctors, i)}/reviews'),
+        get('/api/favorites', lambda i: f'/api/favorites?email={fx["patient_email"]}'),
+        get('/api/appointments', lambda i: f'/api/appointments?email={fx["patient_email"]}'),
+        get('/api/appointments/<int:appointment_id>',
+            lambda i: f'/api/appointments/{pick(fx["appointment_ids"], i)}'),
+        get('/api/appointments/upcoming', lambda i: f'/api/appointments/upcoming?email={fx["patient_email"]}'),
+        get('/api/available-slots',
+            lambda i: f'/api/available-slots?doctor_id={pick(doctors, i)}&date={slot_date}'),
+        get('/api/available-slots/range',
+            lambda i: f'/api/available-slots/range?doctor_id={pick(doctors, i)}&from={fx["today"]}'
+                      f'&to={fx["today"] + timedelta(days=30)}'),
+        get('/api/available-slots/first',
+            lambda i: f'/api/available-slots/first?specialty_id={pick(fx["specialty_ids"], i)}'),
+        get('/api/doctors/<int:doctor_id>/slot-events',
+            lambda i: f'/api/doctors/{pick(doctors, i)}/slot-events?date={slot_date}', stream=True),
+        get('/api/reminders', lambda i: f'/api/reminders?email={fx["patient_email"]}'),
+        get('/admin', lambda i: '/admin'),
+        get_admin('/api/admin/doctors', lambda i: '/api/admin/doctors'),
+        get_admin('/api/admin/stats', lambda i: '/api/admin/stats'),
+        get_admin('/api/admin/appointments', lambda i: f'/api/admin/appointments?page={1 + i % 10}'),
+        get_admin('/api/admin/appointments/export',
+                  lambda i: f'/api/admin/appointments/export?format=ndjson&date_from={week_from}'
+                            f'&date_to={fx["today"]}', limit=20),
+        get_admin('/api/admin/patients', lambda i: f'/api/admin/patients?page={1 + i % 10}&sort=appointment_count'),
+        get_admin('/api/admin/patients/<int:patient_id>/appointments',
+                  lambda i: f'/api/admin/patients/{fx["busy_patient_id"]}/appointments'),
+        get('/metrics', lambda i: '/metrics'),
+        get_admin('/api/admin/slow-queries', lambda i: '/api/admin/slow-queries'),
+        get_admin('/api/admin/profiles', lambda i: '/api/admin/profiles'),
+        get_admin('/api/admin/profiles/<int:profile_id>', lambda i: f'/api/admin/profiles/{fx["profile_id"]}'),
+        get_admin('/api/admin/profiles/<int:profile_id>/download',
+                  lambda i: f'/api/admin/profiles/{fx["profile_id"]}/download'),
+    ]
+    writes = [
+        RouteCase('POST', '/api/email-preview', lambda i: ('POST', '/api/email-preview', {'json': {
+            'doctor_name': 'Dr. Bench', 'patient_name': 'Bench Patient', 'date': 'Monday', 'time': '10:00 AM'}})),
+        RouteCase('POST', '/api/favorites', lambda i: ('POST', '/api/favorites', {'json': {
+            'email': fx['patient_email'], 'doctor_id': pick(doctors, i)}})),
+        RouteCase('POST', '/api/slot-holds', hold, after=collect('hold_tokens', 'token')),
+        RouteCase('DELETE', '/api/slot-holds/<token>', release),
+        RouteCase('POST', '/api/appointments', booking),
+        RouteCase('POST', '/api/appointments/<int:appointment_id>/reschedule', reschedule),
+        RouteCase('POST', '/api/appointments/<int:appointment_id>/cancel',
+                  pooled_post('cancel_pool', '/api/appointments/{}/cancel')),
+        RouteCase('POST', '/api/appointments/<int:appointment_id>/complete',
+                  pooled_post('complete_pool', '/api/appointments/{}/complete')),
+        RouteCase('POST', '/api/reviews', review),
+        RouteCase('POST', '/api/admin/doctors', add_doctor, after=collect('created_doctors', 'id')),
+        RouteCase('PUT', '/api/admin/doctors/<int:doctor_id>', update_doctor),
+        RouteCase('DELETE', '/api/admin/doctors/<int:doctor_id>', delete_doctor),
+        RouteCase('DELETE', '/api/admin/appointments/<int:appointment_id>', delete_appointment),
+        RouteCase('DELETE', '/api/admin/slow-queries', lambda i: ('DELETE', '/api/admin/slow-queries', admin)),
+        RouteCase('POST', '/api/admin/import/<kind>', import_appointments, limit=20),
+    ]
+    return reads + writes
+
+def uncovered_routes(m, cases):
+    """(method, rule) pairs registered on the app that no case exercises."""
+    covered = {(case.method, case.rule) for case in cases}
+    registered = {
+        (method, rule.rule) for rule in m.app.url_map.iter_rules() if rule.endpoint != 'static'
+        for method in rule.methods - {'HEAD', 'OPTIONS'}
+    }
+    return sorted(registered - covered)
+
+# ============ MEASUREMENT ============
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list."""
+    return sorted_values[max(0, math.ceil(p / 100 * len(sorted_values)) - 1)]
+
+def summarize(latencies, statements, statuses):
+    summary = {
+        'iterations': len(latencies),
+        'status': {str(code): statuses.count(code) for code in sorted(set(statuses))},
+        'cold_ms': round(latencies[0], 3),
+        'sql_cold': statements[0],
+    }
+    warm, warm_sql = sorted(latencies[1:] or latencies), statements[1:] or statements
+    summary.update({f'p{p}_ms': round(percentile(warm, p), 3) for p in PERCENTILES})
+    summary.update({
+        'max_ms': round(warm[-1], 3),
+        'mean_ms': round(sum(warm) / len(warm), 3),
+        'sql_mean': round(sum(warm_sql) / len(warm_sql), 2),
+        'sql_max': max(warm_sql),
+    })
+    return summary
+
+def run_case(client, case, requests, counter):
+    latencies, statements, statuses = [], [], []
+    for i in range(min(requests, case.limit or requests)):
+        built = case.build(i)
+        if built is None:
+            break
+        method, path, kwargs = built
+        counter['statements'] = 0
+        started = time.perf_counter()
+        if case.stream:
+            # Time to the first event; closing the stream unsubscribes it
+            response = client.open(path, method=method, buffered=False, **kwargs)
+            next(iter(response.response))
+            response.close()
+        else:
+            response = client.open(path, method=method, **kwargs)
+            response.get_data()
+        latencies.append((time.perf_counter() - started) * 1000)
+        statements.append(counter['statements'])
+        statuses.append(response.status_code)
+        if case.after:
+            case.after(response)
+    return summarize(latencies, statements, statuses) if latencies else None
+
+def run_scale(scale, dataset, requests, seed, workdir):
+    """Seed one scale into a fresh database and benchmark every route against it."""
+    db_path = os.path.join(workdir, f'bench-{scale}.db')
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+    os.environ['REMINDERS_ENABLED'] = '0'
+    os.environ['SLOT_HOLD_RATE_LIMIT'] = '0'
+    sys.path.insert(0, ROOT)
+    import app as m
+    from sqlalchemy import event
+
+    started = time.perf_counter()
+    with m.app.app_context():
+        m.db.create_all()
+        m.ensure_doctor_search_index()
+        counts = m.SyntheticDataGenerator(seed).generate(**dataset)
+    # Creates the remaining indexes and fills the search index; the sample data is skipped
+    m.init_db()
+    seed_seconds = time.perf_counter() - started
+
+    counter = {'statements': 0}
+    with m.app.app_context():
+        @event.listens_for(m.db.engine, 'before_cursor_execute')
+        def count_statement(conn, cursor, statement, parameters, context, executemany):
+            counter['statements'] += 1
+
+        fixtures = load_fixtures(m, seed, requests)
+        cases = build_cases(m, fixtures)
+        m.db.session.remove()
+
+    client = m.app.test_client()
+    routes = {}
+    for case in cases:
+        print(f'  [{scale}] {case.name}', file=sys.stderr)
+        result = run_case(client, case, requests, counter)
+        if result:
+            routes[case.name] = result
+
+    return {
+        'dataset': counts,
+        'seed_seconds': round(seed_seconds, 2),
+        'uncovered_routes': [f'{method} {rule}' for method, rule in uncovered_routes(m, cases)],
+        'routes': routes,
+    }
+
+# ============ REPORTING ============
+
+def git_revision():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT,
+                                    capture_output=True, text=True, check=True).stdout.strip())
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+def print_table(scale, result):
+    print(f"\n{scale}: {result['dataset']} (seeded in {result['seed_seconds']}s)")
+    print(f"{'route':<62} {'n':>4} {'cold':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'sql':>6}")
+    for name, stats in result['routes'].items():
+        print(f"{name:<62} {stats['iterations']:>4} {stats['cold_ms']:>8.2f} {stats['p50_ms']:>8.2f} "
+              f"{stats['p95_ms']:>8.2f} {stats['p99_ms']:>8.2f} {stats['sql_mean']:>6.1f}")
+    for name, stats in result['routes'].items():
+        failed = {code: count for code, count in stats['status'].items() if not code.startswith('2')}
+        if failed:
+            print(f'  non-2xx responses from {name}: {failed}')
+    for route in result['uncovered_routes']:
+        print(f'  not benchmarked: {route}')
+
+def print_comparison(baseline, current):
+    print(f"\nCompared with {baseline['meta'].get('commit') or 'unknown commit'}:")
+    for scale, result in current['scales'].items():
+        old_routes = baseline['scales'].get(scale, {}).get('routes', {})
+        print(f"\n{scale}:")
+        print(f"{'route':<62} {'p50 old':>8} {'p50 new':>8} {'ratio':>6} {'sql old':>8} {'sql new':>8}")
+        for name, stats in result['routes'].items():
+            old = old_routes.get(name)
+            if not old:
+                continue
+            ratio = stats['p50_ms'] / old['p50_ms'] if old['p50_ms'] else float('inf')
+            print(f"{name:<62} {old['p50_ms']:>8.2f} {stats['p50_ms']:>8.2f} {ratio:>6.2f} "
+                  f"{old['sql_mean']:>8.1f} {stats['sql_mean']:>8.1f}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--scale', action='append', choices=sorted(SCALES),
+                        help='Dataset scale to benchmark; repeat for several (default: small).')
+    parser.add_argument('--requests', type=int, default=50, help='Calls per route (default: 50).')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed for the dataset (default: 42).')
+    parser.add_argument('--output', help='Results file (default: benchmarks/results/<time>-<commit>.json).')
+    parser.add_argument('--workdir', help='Directory for the benchmark databases (default: a temporary one).')
+    parser.add_argument('--compare', metavar='RESULTS', help='Earlier results file to compare against.')
+    args = parser.parse_args(argv)
+
+    scales = args.scale or ['small']
+    commit, dirty = git_revision()
+    results = {
+        'meta': {
+            'commit': commit,
+            'dirty': dirty,
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'requests': args.requests,
+            'seed': args.seed,
+        },
+        'scales': {},
+    }
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        workdir = args.workdir or tmpdir
+        os.makedirs(workdir, exist_ok=True)
+        for scale in scales:
+            # A fresh interpreter per scale, so no cache or index survives from the previous one
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+                result = executor.submit(run_scale, scale, SCALES[scale], args.requests, args.seed,
+                                         workdir).result()
+            results['scales'][scale] = result
+            print_table(scale, result)
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{datetime.now():%Y%m%d-%H%M%S}-{(commit or 'nogit')[:10]}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f'\nResults written to {output}')
+
+    if args.compare:
+        with open(args.compare) as f:
+            print_comparison(json.load(f), results)
+
+if __name__ == '__main__':
+    main()
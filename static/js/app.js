@@ -34,8 +34,11 @@ const AppState = {
   selectedTime: null,
   selectedAppointmentType: 'in-person',
   rescheduleCalendarDate: new Date(),
+  rescheduleAvailability: {},
   selectedRescheduleDate: null,
-  selectedRescheduleTime: null
+  selectedRescheduleTime: null,
+  slotEventSource: null,
+  slotHold: null
 };
 
 // Make AppState accessible globally for debugging
@@ -1023,13 +1026,13 @@ function logoutPatient() {
 }
 
 /**
- * Check for upcoming appointments and show notification
+ * Show a notification for the reminders the server issued for upcoming appointments
  */
 async function checkUpcomingAppointments() {
   if (!AppState.currentPatientEmail) return;
 
   try {
-    const upcoming = await fetchAPI(`appointments/upcoming?email=${encodeURIComponent(AppState.currentPatientEmail)}`);
+    const upcoming = await fetchAPI(`reminders?email=${encodeURIComponent(AppState.currentPatientEmail)}`);
 
     if (upcoming.length > 0) {
       const apt = upcoming[0];
@@ -1141,6 +1144,7 @@ async function openRescheduleModal(appointmentId) {
   AppState.selectedRescheduleDate = null;
   AppState.selectedRescheduleTime = null;
   AppState.rescheduleCalendarDate = new Date(); // Start with current month
+  AppState.rescheduleAvailability = {};
 
   try {
     const appointment = await fetchAPI(`appointments/${appointmentId}`);
@@ -1156,6 +1160,7 @@ async function openRescheduleModal(appointmentId) {
     renderRescheduleCalendar();
 
     openModal('reschedule-modal');
+    loadRescheduleMonthAvailability();
   } catch (error) {
     console.error('Failed to load appointment for rescheduling:', error);
   }
@@ -1205,13 +1210,15 @@ function renderRescheduleCalendar() {
     const currentDayDate = new Date(year, month, i);
     const dateStr = `${year}-${String(month + 1).padStart(2, '0')}-${String(i).padStart(2, '0')}`;
     const isPast = currentDayDate < today;
+    const dayAvailability = AppState.rescheduleAvailability[dateStr];
+    const isDisabled = isPast || (dayAvailability && !dayAvailability.has_availability);
     const isSelected = AppState.selectedRescheduleDate === dateStr;
     const isToday = currentDayDate.getTime() === today.getTime();
 
     html += `
-      <div class="calendar-day ${isPast ? 'other-month' : ''} ${isSelected ? 'selected' : ''} ${isToday ? 'today' : ''}" 
-           onclick="${isPast ? '' : `selectRescheduleDate('${dateStr}')`}"
-           style="${isPast ? 'cursor: not-allowed; opacity: 0.5;' : ''}">
+      <div class="calendar-day ${isDisabled ? 'other-month' : ''} ${isSelected ? 'selected' : ''} ${isToday ? 'today' : ''}" 
+           onclick="${isDisabled ? '' : `selectRescheduleDate('${dateStr}')`}"
+           style="${isDisabled ? 'cursor: not-allowed; opacity: 0.5;' : ''}">
         ${i}
       </div>
     `;
@@ -1240,6 +1247,43 @@ function changeRescheduleMonth(delta) {
   const date = AppState.rescheduleCalendarDate;
   date.setMonth(date.getMonth() + delta);
   renderRescheduleCalendar();
+  loadRescheduleMonthAvailability();
+}
+
+/**
+ * Load free slots for the rest of the visible reschedule month in a single request
+ */
+async function loadRescheduleMonthAvailability() {
+  const date = AppState.rescheduleCalendarDate;
+  const year = date.getFullYear();
+  const month = date.getMonth();
+  const monthKey = `${year}-${month}`;
+
+  const today = new Date();
+  today.setHours(0, 0, 0, 0);
+  const lastDay = new Date(year, month + 1, 0);
+  if (lastDay < today) return;
+
+  const firstDay = new Date(year, month, 1);
+  const fromDay = firstDay < today ? today : firstDay;
+  const toDateStr = (d) => `${d.getFullYear()}-${String(d.getMonth() + 1).padStart(2, '0')}-${String(d.getDate()).padStart(2, '0')}`;
+
+  try {
+    const result = await fetchAPI(
+      `available-slots/range?doctor_id=${AppState.currentDoctorId}&from=${toDateStr(fromDay)}&to=${toDateStr(lastDay)}`
+    );
+
+    // Ignore the response if the user already moved to another month
+    const current = AppState.rescheduleCalendarDate;
+    if (`${current.getFullYear()}-${current.getMonth()}` !== monthKey) return;
+
+    result.days.forEach(day => {
+      AppState.rescheduleAvailability[day.date] = day;
+    });
+    renderRescheduleCalendar();
+  } catch (error) {
+    console.error('Failed to load month availability:', error);
+  }
 }
 
 /**
@@ -1249,6 +1293,7 @@ function changeRescheduleMonth(delta) {
 async function selectRescheduleDate(dateStr) {
   AppState.selectedRescheduleDate = dateStr;
   AppState.selectedRescheduleTime = null;
+  releaseSlotHold();
 
   // Re-render calendar to show selection
   renderRescheduleCalendar();
@@ -1259,14 +1304,43 @@ async function selectRescheduleDate(dateStr) {
   timeSlotsGrid.innerHTML = '<div class="spinner-container"><div class="spinner"></div></div>';
 
   try {
-    const slots = await fetchAPI(`available-slots?doctor_id=${AppState.currentDoctorId}&date=${dateStr}`);
+    const cached = AppState.rescheduleAvailability[dateStr];
+    const slots = cached
+      ? cached.slots
+      : await fetchAPI(`available-slots?doctor_id=${AppState.currentDoctorId}&date=${dateStr}${slotHoldQuery()}`);
     renderRescheduleTimeSlots(slots);
+    watchSlotEvents(AppState.currentDoctorId, dateStr, refreshRescheduleSlots);
   } catch (error) {
     console.error('Failed to load slots:', error);
     timeSlotsGrid.innerHTML = '<p style="color: var(--error); text-align: center; padding: 1rem;">Failed to load time slots</p>';
   }
 }
 
+/**
+ * Re-fetch the selected reschedule date after a live slot change
+ * @param {string} type - Event type ('slot-taken', 'slot-freed' or 'resync')
+ * @param {Object} slot - Event payload
+ */
+async function refreshRescheduleSlots(type, slot) {
+  const dateStr = AppState.selectedRescheduleDate;
+  if (!dateStr) return;
+
+  try {
+    const slots = await fetchAPI(`available-slots?doctor_id=${AppState.currentDoctorId}&date=${dateStr}${slotHoldQuery()}`);
+    if (AppState.selectedRescheduleDate !== dateStr) return;
+
+    AppState.rescheduleAvailability[dateStr] = { date: dateStr, has_availability: slots.length > 0, slots };
+    if (AppState.selectedRescheduleTime && !slots.some(s => s.datetime === AppState.selectedRescheduleTime)) {
+      AppState.selectedRescheduleTime = null;
+      showToast('The time you selected was just booked. Please choose another.', 'info');
+    }
+    renderRescheduleCalendar();
+    renderRescheduleTimeSlots(slots);
+  } catch (error) {
+    console.error('Failed to refresh slots:', error);
+  }
+}
+
 /**
  * Render time slots in the reschedule modal
  * @param {Array} slots - Array of slot objects
@@ -1306,6 +1380,12 @@ function selectRescheduleTime(dateTime) {
   if (selectedBtn) {
     selectedBtn.classList.add('selected');
   }
+
+  holdSlot(AppState.currentDoctorId, dateTime, AppState.currentAppointmentId).then(held => {
+    if (held) return;
+    if (AppState.selectedRescheduleTime === dateTime) AppState.selectedRescheduleTime = null;
+    refreshRescheduleSlots();
+  });
 }
 
 /**
@@ -1317,11 +1397,14 @@ async function submitReschedule() {
     return;
   }
 
+  stopSlotEvents();
+
   try {
     await fetchAPI(`appointments/${AppState.currentAppointmentId}/reschedule`, {
       method: 'POST',
-      body: JSON.stringify({ newDateTime: AppState.selectedRescheduleTime })
+      body: JSON.stringify({ newDateTime: AppState.selectedRescheduleTime, holdToken: AppState.slotHold?.token })
     });
+    AppState.slotHold = null;
 
     closeModal('reschedule-modal');
     closeModal('reschedule-modal');
@@ -1372,7 +1455,8 @@ async function handleBookingSubmit(e) {
     phone: document.getElementById('patient-phone').value.trim(),
     dateTime: selectedTime,
     reason: document.getElementById('appointment-reason').value.trim(),
-    appointmentType: AppState.selectedAppointmentType
+    appointmentType: AppState.selectedAppointmentType,
+    holdToken: AppState.slotHold?.token
   };
 
   // Validation
@@ -1398,11 +1482,14 @@ async function handleBookingSubmit(e) {
     return;
   }
 
+  stopSlotEvents();
+
   try {
     const result = await fetchAPI('appointments', {
       method: 'POST',
       body: JSON.stringify(formData)
     });
+    AppState.slotHold = null;
 
     closeModal('booking-modal');
     closeModal('booking-modal');
@@ -1513,6 +1600,11 @@ function closeModal(modalId) {
 
   modal.classList.remove('active');
   document.body.style.overflow = '';
+
+  if (modalId === 'booking-modal' || modalId === 'reschedule-modal') {
+    stopSlotEvents();
+    releaseSlotHold();
+  }
 }
 
 /**
@@ -1524,9 +1616,106 @@ document.addEventListener('keydown', (e) => {
       modal.classList.remove('active');
     });
     document.body.style.overflow = '';
+    stopSlotEvents();
+    releaseSlotHold();
   }
 });
 
+// ============================================================================
+// LIVE SLOT UPDATES
+// ============================================================================
+
+/**
+ * Subscribe to live slot changes for one doctor and date. Only one stream is
+ * kept open at a time; opening a new one closes the previous stream.
+ * @param {number} doctorId - Doctor ID
+ * @param {string} date - Date string (YYYY-MM-DD)
+ * @param {Function} onChange - Called with (type, slot) on every change
+ */
+function watchSlotEvents(doctorId, date, onChange) {
+  stopSlotEvents();
+  if (typeof EventSource === 'undefined') return;
+
+  const source = new EventSource(`/api/doctors/${doctorId}/slot-events?date=${date}`);
+  const handler = (e) => onChange(e.type, e.data ? JSON.parse(e.data) : {});
+  ['slot-taken', 'slot-freed', 'slot-held', 'slot-released', 'resync'].forEach(type => source.addEventListener(type, handler));
+
+  AppState.slotEventSource = source;
+}
+
+/**
+ * Close the live slot stream, if one is open
+ */
+function stopSlotEvents() {
+  if (AppState.slotEventSource) {
+    AppState.slotEventSource.close();
+    AppState.slotEventSource = null;
+  }
+}
+
+// ============================================================================
+// SLOT HOLDS
+// ============================================================================
+
+/**
+ * Random id of this browser tab, so a new slot hold replaces the tab's previous one
+ */
+function slotHoldSessionId() {
+  let sessionId = sessionStorage.getItem('slotHoldSession');
+  if (!sessionId) {
+    sessionId = crypto.randomUUID();
+    sessionStorage.setItem('slotHoldSession', sessionId);
+  }
+  return sessionId;
+}
+
+/**
+ * Hold a slot while the booking or reschedule form is filled in. An existing
+ * hold of this patient is moved to the new slot.
+ * @param {number} doctorId - Doctor ID
+ * @param {string} dateTime - ISO date time string
+ * @param {number|null} appointmentId - Appointment being rescheduled, if any
+ * @returns {Promise<boolean>} - Whether the slot is now held
+ */
+async function holdSlot(doctorId, dateTime, appointmentId = null) {
+  try {
+    AppState.slotHold = await fetchAPI('slot-holds', {
+      method: 'POST',
+      body: JSON.stringify({
+        doctorId,
+        dateTime,
+        appointmentId,
+        email: appointmentId ? AppState.currentPatientEmail : undefined,
+        replaceToken: AppState.slotHold?.token,
+        sessionId: slotHoldSessionId()
+      })
+    });
+    return true;
+  } catch (error) {
+    releaseSlotHold();
+    return false;
+  }
+}
+
+/**
+ * Give up the current slot hold, if any
+ */
+function releaseSlotHold() {
+  const hold = AppState.slotHold;
+  if (!hold) return;
+
+  AppState.slotHold = null;
+  fetch(`/api/slot-holds/${encodeURIComponent(hold.token)}`, { method: 'DELETE' }).catch(() => {});
+}
+
+/**
+ * Query string that keeps the patient's own held slot in slot listings
+ * @returns {string}
+ */
+function slotHoldQuery() {
+  return AppState.slotHold ? `&hold_token=${encodeURIComponent(AppState.slotHold.token)}` : '';
+}
+
 // ============================================================================
 // DATE PICKER & TIME SLOTS
 // ============================================================================
@@ -1653,6 +1842,15 @@ function selectTimeSlot(datetime, timeText, element) {
   const options = document.querySelectorAll('.custom-time-option');
   options.forEach(opt => opt.classList.remove('selected'));
   if (element) element.classList.add('selected');
+
+  holdSlot(AppState.currentDoctorId, datetime).then(held => {
+    if (held) return;
+    if (hiddenInput && hiddenInput.value === datetime) {
+      hiddenInput.value = '';
+      if (displayText) displayText.textContent = 'Select time';
+    }
+    refreshAvailableSlots(AppState.currentDoctorId, datetime.slice(0, 10));
+  });
 }
 
 async function loadAvailableSlots(doctorId, date, elementId = 'appointment-time') {
@@ -1662,34 +1860,76 @@ async function loadAvailableSlots(doctorId, date, elementId = 'appointment-time'
   
   if (!hiddenInput || !optionsContainer) return;
   
-  // Reset to loading state
+  // Reset to loading state; a hold on the previous selection is given up
   optionsContainer.innerHTML = '<div class="custom-time-option disabled">Loading...</div>';
   hiddenInput.value = '';
+  releaseSlotHold();
   if (displayText) displayText.textContent = 'Select time';
   
   try {
     const slots = await fetchAPI(`available-slots?doctor_id=${doctorId}&date=${date}`);
-    
-    optionsContainer.innerHTML = '';
-    
-    if (slots.length === 0) {
-      optionsContainer.innerHTML = '<div class="custom-time-option disabled">No available slots</div>';
-      return;
-    }
-    
-    slots.forEach(slot => {
-      const option = document.createElement('div');
-      option.className = 'custom-time-option';
-      option.textContent = slot.time;
-      option.onclick = function() { selectTimeSlot(slot.datetime, slot.time, this); };
-      optionsContainer.appendChild(option);
-    });
+    renderTimeSlotOptions(slots, optionsContainer);
+    watchSlotEvents(doctorId, date, () => refreshAvailableSlots(doctorId, date, elementId));
   } catch (error) {
     console.error('Failed to load available slots:', error);
     optionsContainer.innerHTML = '<div class="custom-time-option disabled">Error loading slots</div>';
   }
 }
 
+/**
+ * Render time slot options into the custom time dropdown
+ * @param {Array} slots - Array of slot objects
+ * @param {HTMLElement} optionsContainer - Dropdown options container
+ * @param {string} selected - Currently selected slot datetime, if any
+ */
+function renderTimeSlotOptions(slots, optionsContainer, selected = '') {
+  optionsContainer.innerHTML = '';
+
+  if (slots.length === 0) {
+    optionsContainer.innerHTML = '<div class="custom-time-option disabled">No available slots</div>';
+    return;
+  }
+
+  slots.forEach(slot => {
+    const option = document.createElement('div');
+    option.className = 'custom-time-option';
+    if (slot.datetime === selected) option.classList.add('selected');
+    option.textContent = slot.time;
+    option.onclick = function() { selectTimeSlot(slot.datetime, slot.time, this); };
+    optionsContainer.appendChild(option);
+  });
+}
+
+/**
+ * Re-fetch slots after a live slot change, keeping the current selection when
+ * it is still free
+ * @param {number} doctorId - Doctor ID
+ * @param {string} date - Date string (YYYY-MM-DD)
+ * @param {string} elementId - Hidden input holding the selected slot
+ */
+async function refreshAvailableSlots(doctorId, date, elementId = 'appointment-time') {
+  const hiddenInput = document.getElementById(elementId);
+  const optionsContainer = document.getElementById('time-select-options');
+  const displayText = document.getElementById('time-select-text');
+
+  if (!hiddenInput || !optionsContainer) return;
+
+  try {
+    const slots = await fetchAPI(`available-slots?doctor_id=${doctorId}&date=${date}${slotHoldQuery()}`);
+    const selected = hiddenInput.value;
+
+    if (selected && !slots.some(slot => slot.datetime === selected)) {
+      hiddenInput.value = '';
+      AppState.selectedTime = null;
+      if (displayText) displayText.textContent = 'Select time';
+      showToast('The time you selected was just booked. Please choose another.', 'info');
+    }
+    renderTimeSlotOptions(slots, optionsContainer, hiddenInput.value);
+  } catch (error) {
+    console.error('Failed to refresh available slots:', error);
+  }
+}
+
 /**
  * Initialize appointment type selector
  */
@@ -0,0 +1,69 @@
+"""
+Shared test fixtures. app.py reads its settings from the environment at
+import time, so the environment is set up here before the first import and
+every test runs against a throwaway file-backed SQLite database.
+"""
+
+from contextlib import contextmanager
+import os
+import sys
+import tempfile
+
+import pytest
+
+DB_DIR = tempfile.mkdtemp(prefix='medschedule-tests-')
+os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(DB_DIR, "test.db")}'
+os.environ['REMINDERS_ENABLED'] = '0'
+os.environ.setdefault('ADMIN_PASSWORD', 'test-admin')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as medschedule  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+def clear_process_caches():
+    """Forget everything the app keeps in per-process memory."""
+    medschedule.catalog_response_cache.clear()
+    medschedule.availability_cache.clear()
+    medschedule.appointment_index.clear()
+    medschedule.slot_holds.clear()
+    medschedule.slot_hold_rate_limiter.clear()
+    medschedule.slot_change_poller.clear()
+    medschedule.admin_stats_snapshot.invalidate()
+    with medschedule._admin_appointment_totals_lock:
+        medschedule._admin_appointment_totals.clear()
+
+@pytest.fixture
+def m():
+    """The app module on an empty database with the sample data of init_db."""
+    with medschedule.app.app_context():
+        medschedule.db.session.remove()
+        medschedule.db.drop_all()
+        medschedule.db.session.execute(medschedule.db.text('DROP TABLE IF EXISTS doctor_search'))
+        medschedule.db.session.commit()
+    clear_process_caches()
+    medschedule.init_db()
+    yield medschedule
+    with medschedule.app.app_context():
+        medschedule.db.session.remove()
+
+@pytest.fixture
+def client(m):
+    return m.app.test_client()
+
+@pytest.fixture
+def admin_headers(m):
+    return {'X-Admin-Password': m.ADMIN_PASSWORD}
+
+@contextmanager
+def count_statements(engine):
+    """Count the SQL statements sent to `engine` inside the block."""
+    counter = {'statements': 0}
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        counter['statements'] += 1
+
+    event.listen(engine, 'before_cursor_execute', count)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, 'before_cursor_execute', count)
@@ -0,0 +1,76 @@
+"""
+/api/admin/appointments: cursor pages walk the (date, id) ordering forwards
+and backwards without gaps or repeats, even where several doctors share a
+start time, and agree with the numbered pages.
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+APPOINTMENTS = 47
+
+@pytest.fixture
+def appointment_ids(m):
+    """Appointments newest first; doctors share start times, so dates tie."""
+    with m.app.app_context():
+        doctor_ids = [doctor.id for doctor in m.Doctor.query.order_by(m.Doctor.id)]
+        patient = m.Patient(first_name='Page', last_name='Walker', email='pages@example.test')
+        m.db.session.add(patient)
+        m.db.session.flush()
+        start = datetime.combine(datetime.now().date() + timedelta(days=2), datetime.min.time()).replace(hour=8)
+        appointments = [m.Appointment(
+            doctor_id=doctor_ids[n % len(doctor_ids)],
+            patient_id=patient.id,
+            appointment_date=start + timedelta(minutes=30 * (n // len(doctor_ids))),
+            status='cancelled' if n % 5 == 0 else 'scheduled'
+        ) for n in range(APPOINTMENTS)]
+        m.db.session.add_all(appointments)
+        m.db.session.commit()
+        return [a.id for a in sorted(appointments, key=lambda a: (a.appointment_date, a.id), reverse=True)]
+
+def get_page(client, admin_headers, **params):
+    response = client.get('/api/admin/appointments', query_string=params, headers=admin_headers)
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+def ids(page):
+    return [appointment['id'] for appointment in page['appointments']]
+
+def test_cursor_pages_cover_every_row_once(client, admin_headers, appointment_ids):
+    pages = [get_page(client, admin_headers, per_page=10, cursor='')]
+    while pages[-1]['has_next']:
+        pages.append(get_page(client, admin_headers, per_page=10, cursor=pages[-1]['next_cursor']))
+
+    assert [id_ for page in pages for id_ in ids(page)] == appointment_ids
+    assert [len(ids(page)) for page in pages] == [10, 10, 10, 10, 7]
+    assert not pages[0]['has_prev'] and pages[-1]['next_cursor'] is None
+    numbered = [ids(get_page(client, admin_headers, per_page=10, page=n)) for n in range(1, 6)]
+    assert numbered == [ids(page) for page in pages]
+
+def test_prev_cursor_returns_the_previous_page(client, admin_headers, appointment_ids):
+    first = get_page(client, admin_headers, per_page=10, cursor='')
+    second = get_page(client, admin_headers, per_page=10, cursor=first['next_cursor'])
+    third = get_page(client, admin_headers, per_page=10, cursor=second['next_cursor'])
+
+    back = get_page(client, admin_headers, per_page=10, cursor=third['prev_cursor'])
+    assert ids(back) == ids(second)
+    assert back['has_prev'] and back['has_next']
+    assert ids(get_page(client, admin_headers, per_page=10, cursor=back['prev_cursor'])) == ids(first)
+
+def test_cursor_pages_apply_the_filters(m, client, admin_headers, appointment_ids):
+    with m.app.app_context():
+        scheduled = {a.id for a in m.Appointment.query.filter_by(status='scheduled')}
+    pages = [get_page(client, admin_headers, per_page=7, cursor='', status='scheduled', total='exact')]
+    while pages[-1]['has_next']:
+        pages.append(get_page(client, admin_headers, per_page=7, cursor=pages[-1]['next_cursor'],
+                              status='scheduled'))
+
+    assert [id_ for page in pages for id_ in ids(page)] == [id_ for id_ in appointment_ids if id_ in scheduled]
+    assert pages[0]['total'] == len(scheduled) and not pages[0]['total_is_estimate']
+
+def test_bad_cursors_and_total_modes_are_rejected(client, admin_headers, appointment_ids):
+    for params in ({'cursor': 'not-a-cursor'}, {'cursor': 'WyJ4IiwgMSwgIm5leHQiXQ'}, {'total': 'roughly'}):
+        response = client.get('/api/admin/appointments', query_string=params, headers=admin_headers)
+        assert response.status_code == 400, params
+    assert client.get('/api/admin/appointments').status_code == 401
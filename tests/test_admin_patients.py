@@ -0,0 +1,80 @@
+"""
+/api/admin/patients: prefix search by email, first or last name and by full
+name, paging, and sorting by the visit statistics stored on each patient,
+which booking, cancelling and deleting appointments keep up to date.
+"""
+
+import pytest
+
+from test_booking_concurrency import next_weekday_at
+
+@pytest.fixture
+def patients(m):
+    with m.app.app_context():
+        m.db.session.add_all([
+            m.Patient(first_name='Sarah', last_name='Johnson', email='sarah.j@example.test'),
+            m.Patient(first_name='Sarah', last_name='Miller', email='smiller@example.test'),
+            m.Patient(first_name='Johnson', last_name='Sarah', email='odd.name@example.test'),
+            m.Patient(first_name='Mary Ann', last_name='Lee', email='mal@example.test'),
+        ])
+        m.db.session.commit()
+
+def search(client, admin_headers, query, **params):
+    response = client.get('/api/admin/patients', query_string={'q': query, 'per_page': 100, **params},
+                          headers=admin_headers)
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+def emails(page):
+    return sorted(patient['email'] for patient in page['patients'])
+
+def test_single_term_matches_a_prefix_of_any_field(client, admin_headers, patients):
+    assert emails(search(client, admin_headers, 'sar')) == [
+        'odd.name@example.test', 'sarah.j@example.test', 'smiller@example.test']
+    assert emails(search(client, admin_headers, 'SMILL')) == ['smiller@example.test']
+    assert emails(search(client, admin_headers, 'arah')) == []
+
+def test_full_name_matches_in_either_order(client, admin_headers, patients):
+    assert emails(search(client, admin_headers, 'Sarah Johnson')) == ['odd.name@example.test', 'sarah.j@example.test']
+    assert emails(search(client, admin_headers, 'sarah  mil')) == ['smiller@example.test']
+    assert emails(search(client, admin_headers, 'Miller Sarah')) == ['smiller@example.test']
+    assert emails(search(client, admin_headers, 'Mary Ann Lee')) == ['mal@example.test']
+    assert emails(search(client, admin_headers, 'Sarah Lee')) == []
+
+def test_search_is_served_by_indexes(m, patients):
+    with m.app.app_context():
+        for query in ('sar', 'Sarah Johnson'):
+            statement = m.Patient.query.filter(m.patient_search_filter(query)).statement.compile(
+                m.db.engine, compile_kwargs={'literal_binds': True})
+            plan = [row[3] for row in m.db.session.execute(m.db.text(f'EXPLAIN QUERY PLAN {statement}'))]
+            assert not [step for step in plan if step.startswith('SCAN')], plan
+
+def test_pages_and_visit_statistics(m, client, admin_headers, patients):
+    with m.app.app_context():
+        doctor_id = m.Doctor.query.first().id
+    for hour, email in ((9, 'smiller@example.test'), (10, 'smiller@example.test'), (11, 'sarah.j@example.test')):
+        response = client.post('/api/appointments', json={
+            'doctorId': doctor_id, 'firstName': 'x', 'lastName': 'y', 'email': email,
+            'dateTime': next_weekday_at(hour).isoformat()})
+        assert response.status_code == 201
+
+    page = search(client, admin_headers, 's', sort='appointment_count', order='desc', per_page=1)
+    assert (page['total'], page['pages'], page['has_next']) == (3, 3, True)
+    assert page['patients'][0]['email'] == 'smiller@example.test'
+    assert page['patients'][0]['appointment_count'] == 2
+    assert page['patients'][0]['last_visit'] == next_weekday_at(10).strftime('%Y-%m-%d')
+
+    with m.app.app_context():
+        patient = m.Patient.query.filter_by(email='smiller@example.test').one()
+        appointment_ids = [appointment.id for appointment in patient.appointments]
+    for appointment_id in appointment_ids:
+        assert client.delete(f'/api/admin/appointments/{appointment_id}', headers=admin_headers).status_code == 200
+
+    row = search(client, admin_headers, 'smiller')['patients'][0]
+    assert (row['appointment_count'], row['last_visit']) == (0, 'Never')
+    page = search(client, admin_headers, 's', sort='last_visit', order='desc')
+    assert page['patients'][0]['email'] == 'sarah.j@example.test'
+
+def test_rejects_unknown_sort(client, admin_headers):
+    response = client.get('/api/admin/patients?sort=phone', headers=admin_headers)
+    assert response.status_code == 400
@@ -0,0 +1,76 @@
+"""
+Admin dashboard statistics: one snapshot serves repeated requests, is built
+with a fixed number of queries, and is dropped as soon as a booking, status
+change or deletion commits.
+"""
+
+from datetime import datetime, timedelta
+
+from conftest import count_statements
+from test_booking_concurrency import next_weekday_at
+
+def stats(client, admin_headers):
+    response = client.get('/api/admin/stats', headers=admin_headers)
+    assert response.status_code == 200
+    return response.get_json()
+
+def book(m, client, hour):
+    with m.app.app_context():
+        doctor_id = m.Doctor.query.first().id
+    return client.post('/api/appointments', json={
+        'doctorId': doctor_id, 'firstName': 'Stat', 'lastName': 'Patient', 'email': 'stats@example.test',
+        'dateTime': next_weekday_at(hour).isoformat()}).get_json()['id']
+
+def test_repeated_requests_share_one_snapshot(m, client, admin_headers):
+    first = stats(client, admin_headers)
+    with m.app.app_context():
+        engine = m.db.engine
+    with count_statements(engine) as counter:
+        second = stats(client, admin_headers)
+
+    assert second['generated_at'] == first['generated_at']
+    assert second['stats'] == first['stats']
+    # Only the admin check and request bookkeeping, no statistics queries
+    assert counter['statements'] <= 2, counter['statements']
+
+def test_bookings_and_status_changes_refresh_the_snapshot(m, client, admin_headers):
+    before = stats(client, admin_headers)['stats']
+    appointment_id = book(m, client, 10)
+    booked = stats(client, admin_headers)
+    assert booked['stats']['total_appointments'] == before['total_appointments'] + 1
+    assert booked['stats']['scheduled_appointments'] == before['scheduled_appointments'] + 1
+    assert booked['stats']['total_patients'] == before['total_patients'] + 1
+    assert booked['recent_appointments'][0]['id'] == appointment_id
+
+    client.post(f'/api/appointments/{appointment_id}/cancel')
+    cancelled = stats(client, admin_headers)['stats']
+    assert cancelled['cancelled_appointments'] == before['cancelled_appointments'] + 1
+    assert cancelled['scheduled_appointments'] == before['scheduled_appointments']
+
+    client.delete(f'/api/admin/appointments/{appointment_id}', headers=admin_headers)
+    assert stats(client, admin_headers)['stats']['total_appointments'] == before['total_appointments']
+
+def test_snapshot_queries_do_not_grow_with_the_data(m, client, admin_headers):
+    def measure():
+        m.admin_stats_snapshot.invalidate()
+        with count_statements(engine) as counter:
+            stats(client, admin_headers)
+        return counter['statements']
+
+    with m.app.app_context():
+        engine = m.db.engine
+    small = measure()
+    with m.app.app_context():
+        doctor_ids = [doctor.id for doctor in m.Doctor.query]
+        patient = m.Patient(first_name='Many', last_name='Visits', email='many@example.test')
+        m.db.session.add(patient)
+        m.db.session.flush()
+        start = datetime.combine(datetime.now().date() - timedelta(days=60), datetime.min.time())
+        m.db.session.execute(m.db.insert(m.Appointment), [{
+            'doctor_id': doctor_ids[n % len(doctor_ids)], 'patient_id': patient.id,
+            'appointment_date': start + timedelta(minutes=30 * n), 'status': ('completed', 'cancelled')[n % 2]
+        } for n in range(300)])
+        m.db.session.commit()
+
+    assert measure() == small
+    assert stats(client, admin_headers)['stats']['completed_appointments'] == 150
@@ -0,0 +1,65 @@
+"""
+Free slot listings: a day's slots follow the doctor's weekly schedule, leave
+out booked slots as soon as the booking commits, and an unknown doctor is a
+404 rather than an empty day.
+"""
+
+from datetime import timedelta
+
+import pytest
+
+from test_booking_concurrency import next_weekday_at
+
+@pytest.fixture
+def doctor_id(m):
+    with m.app.app_context():
+        return m.Doctor.query.first().id
+
+def slot_times(response):
+    return [slot['datetime'] for slot in response.get_json()]
+
+def test_day_slots_leave_out_booked_and_cancelled_slots(client, doctor_id):
+    day = next_weekday_at(10).date()
+    before = slot_times(client.get(f'/api/available-slots?doctor_id={doctor_id}&date={day}'))
+    assert next_weekday_at(10).isoformat() in before
+    assert before == sorted(before)
+
+    created = client.post('/api/appointments', json={
+        'doctorId': doctor_id, 'firstName': 'Slot', 'lastName': 'Taker', 'email': 'slot@example.test',
+        'dateTime': next_weekday_at(10).isoformat()}).get_json()
+    booked = slot_times(client.get(f'/api/available-slots?doctor_id={doctor_id}&date={day}'))
+    assert booked == [slot for slot in before if slot != next_weekday_at(10).isoformat()]
+
+    client.post(f'/api/appointments/{created["id"]}/cancel')
+    assert slot_times(client.get(f'/api/available-slots?doctor_id={doctor_id}&date={day}')) == before
+
+def test_day_slots_reject_unknown_doctors_and_bad_input(client, doctor_id):
+    day = next_weekday_at(10).date()
+    missing = client.get(f'/api/available-slots?doctor_id=999999&date={day}')
+    assert missing.status_code == 404
+    assert missing.get_json() == {'error': 'Doctor not found'}
+    assert client.get(f'/api/available-slots?doctor_id={doctor_id}&date=tomorrow').status_code == 400
+    assert client.get(f'/api/available-slots?date={day}').status_code == 400
+
+def test_range_lists_every_day_like_the_day_endpoint(client, doctor_id):
+    start = next_weekday_at(10).date()
+    end = start + timedelta(days=6)
+    response = client.get(f'/api/available-slots/range?doctor_id={doctor_id}&from={start}&to={end}')
+    assert response.status_code == 200
+    body = response.get_json()
+    assert [day['date'] for day in body['days']] == [
+        (start + timedelta(days=n)).isoformat() for n in range(7)]
+    for day in body['days']:
+        single = slot_times(client.get(f'/api/available-slots?doctor_id={doctor_id}&date={day["date"]}'))
+        assert [slot['datetime'] for slot in day['slots']] == single
+        assert day['has_availability'] == bool(single)
+
+def test_range_rejects_unknown_doctors_and_bad_ranges(m, client, doctor_id):
+    start = next_weekday_at(10).date()
+    missing = client.get(f'/api/available-slots/range?doctor_id=999999&from={start}&to={start}')
+    assert missing.status_code == 404
+    assert missing.get_json() == {'error': 'Doctor not found'}
+    too_long = start + timedelta(days=m.MAX_SLOT_RANGE_DAYS)
+    assert client.get(f'/api/available-slots/range?doctor_id={doctor_id}&from={start}&to={too_long}').status_code == 400
+    backwards = start - timedelta(days=1)
+    assert client.get(f'/api/available-slots/range?doctor_id={doctor_id}&from={start}&to={backwards}').status_code == 400
@@ -0,0 +1,75 @@
+"""
+Many clients racing for one slot: exactly one booking or reschedule wins and
+every other request is refused with 409, never a 500 or a double booking.
+Requests run on a thread pool against the file-backed test database, so they
+contend for SQLite's write lock the way gunicorn threads do.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+RACERS = 200
+THREADS = 32
+
+def next_weekday_at(hour):
+    day = datetime.now().date() + timedelta(days=7)
+    while day.weekday() >= 5:
+        day += timedelta(days=1)
+    return datetime.combine(day, datetime.min.time()).replace(hour=hour)
+
+def race(m, requests):
+    """Send every (method, path, json) request from the thread pool; returns the status codes."""
+    def send(call):
+        method, path, payload = call
+        return m.app.test_client().open(path, method=method, json=payload).status_code
+    with ThreadPoolExecutor(THREADS) as pool:
+        return list(pool.map(send, requests))
+
+def active_appointments_at(m, doctor_id, slot):
+    with m.app.app_context():
+        return m.Appointment.query.filter(
+            m.Appointment.doctor_id == doctor_id,
+            m.Appointment.appointment_date == slot,
+            m.Appointment.status != 'cancelled'
+        ).count()
+
+def test_parallel_bookings_of_one_slot_admit_exactly_one(m):
+    with m.app.app_context():
+        doctor_id = m.Doctor.query.first().id
+    slot = next_weekday_at(10)
+    statuses = race(m, [('POST', '/api/appointments', {
+        'doctorId': doctor_id,
+        'firstName': 'Racer',
+        'lastName': str(n),
+        'email': f'racer.{n}@example.test',
+        'dateTime': slot.isoformat()
+    }) for n in range(RACERS)])
+
+    assert statuses.count(201) == 1, sorted(set(statuses))
+    assert statuses.count(409) == RACERS - 1, sorted(set(statuses))
+    assert active_appointments_at(m, doctor_id, slot) == 1
+
+def test_parallel_reschedules_into_one_slot_admit_exactly_one(m):
+    first_slot = next_weekday_at(9)
+    with m.app.app_context():
+        doctor_id = m.Doctor.query.first().id
+        appointments = []
+        for n in range(RACERS):
+            patient = m.Patient(first_name='Racer', last_name=str(n), email=f'racer.{n}@example.test')
+            m.db.session.add(patient)
+            m.db.session.flush()
+            # Spread the existing bookings over later days, clear of the contested slot
+            appointment = m.Appointment(doctor_id=doctor_id, patient_id=patient.id, status='scheduled',
+                                        appointment_date=first_slot + timedelta(days=1 + n // 16, minutes=30 * (n % 16)))
+            m.db.session.add(appointment)
+            appointments.append(appointment)
+        m.db.session.commit()
+        appointment_ids = [appointment.id for appointment in appointments]
+    slot = first_slot
+    statuses = race(m, [('POST', f'/api/appointments/{appointment_id}/reschedule', {
+        'newDateTime': slot.isoformat()
+    }) for appointment_id in appointment_ids])
+
+    assert statuses.count(200) == 1, sorted(set(statuses))
+    assert statuses.count(409) == RACERS - 1, sorted(set(statuses))
+    assert active_appointments_at(m, doctor_id, slot) == 1
@@ -0,0 +1,72 @@
+"""
+Bulk import: multi-thousand-row CSV and NDJSON files load in a handful of
+statements per batch, every row lands with the right foreign keys, and bad
+or overlapping rows are reported by line number without stopping the load.
+"""
+
+from datetime import datetime, timedelta
+import io
+import json
+
+from conftest import count_statements
+
+DOCTORS = 2500
+APPOINTMENTS = 4000
+BATCH_SIZE = 1000
+
+def import_data(m, kind, text, fmt):
+    with m.app.app_context():
+        return m.run_bulk_import(kind, io.StringIO(text), fmt, batch_size=BATCH_SIZE)
+
+def test_doctors_import_in_batches(m):
+    with m.app.app_context():
+        doctors_before = m.Doctor.query.count()
+        engine = m.db.engine
+    lines = ['firstName,lastName,email,specialty,yearsExperience']
+    lines += [f'First{n},Last{n},doctor{n}@import.test,Cardiology,{n % 40}' for n in range(DOCTORS)]
+
+    with count_statements(engine) as counter:
+        report = import_data(m, 'doctors', '\n'.join(lines), 'csv')
+
+    assert (report['imported'], report['failed']) == (DOCTORS, 0)
+    # A fixed number of statements per batch, not one per row
+    assert counter['statements'] < 20 * (DOCTORS // BATCH_SIZE + 1), counter['statements']
+    with m.app.app_context():
+        assert m.Doctor.query.count() == doctors_before + DOCTORS
+        doctors = {doctor.email: doctor for doctor in m.Doctor.query.filter(m.Doctor.email.like('%@import.test'))}
+        assert doctors['doctor7@import.test'].first_name == 'First7'
+        assert doctors['doctor2499@import.test'].years_experience == 2499 % 40
+        availability = dict(m.db.session.query(m.DoctorAvailability.doctor_id, m.db.func.count()).group_by(
+            m.DoctorAvailability.doctor_id))
+        assert all(availability[doctor.id] == 5 for doctor in doctors.values())
+
+def test_appointments_import_creates_patients_and_links_rows(m):
+    with m.app.app_context():
+        doctor_ids = [doctor.id for doctor in m.Doctor.query.order_by(m.Doctor.id)]
+        engine = m.db.engine
+    start = datetime.combine(datetime.now().date() + timedelta(days=3), datetime.min.time()).replace(hour=8)
+    rows = [{
+        'doctorId': doctor_ids[n % len(doctor_ids)],
+        'firstName': f'Patient{n % 1500}',
+        'lastName': 'Imported',
+        'email': f'patient{n % 1500}@import.test',
+        'dateTime': (start + timedelta(minutes=30 * (n // len(doctor_ids)))).isoformat()
+    } for n in range(APPOINTMENTS)]
+    rows.insert(10, {**rows[0], 'email': 'clash@import.test'})   # same doctor and slot as row 0
+    rows.insert(20, {'doctorId': 999999, 'email': 'x@import.test', 'dateTime': start.isoformat()})
+
+    with count_statements(engine) as counter:
+        report = import_data(m, 'appointments', '\n'.join(json.dumps(row) for row in rows), 'ndjson')
+
+    assert (report['imported'], report['failed']) == (APPOINTMENTS, 2)
+    assert [error['line'] for error in report['errors']] == [11, 21]
+    assert counter['statements'] < 20 * (APPOINTMENTS // BATCH_SIZE + 1) + len(doctor_ids), counter['statements']
+    with m.app.app_context():
+        linked = m.db.session.query(m.Appointment.appointment_date, m.Appointment.doctor_id, m.Patient.email).join(
+            m.Patient, m.Patient.id == m.Appointment.patient_id).filter(m.Patient.email.like('%@import.test')).all()
+        assert sorted(linked) == sorted(
+            (datetime.fromisoformat(row['dateTime']), row['doctorId'], row['email'])
+            for row in rows if row['email'].startswith('patient'))
+        assert m.Patient.query.filter(m.Patient.email.like('patient%@import.test')).count() == 1500
+        patient = m.Patient.query.filter_by(email='patient0@import.test').one()
+        assert patient.appointment_count == len([row for row in rows if row['email'] == 'patient0@import.test'])
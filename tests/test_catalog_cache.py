@@ -0,0 +1,73 @@
+"""
+Catalog caching: ETags answer repeat requests with 304, and a write moves
+only the version counters it touches, whether it happens in this process
+or in another worker sharing the database.
+"""
+
+import pytest
+
+@pytest.fixture
+def doctor_ids(m):
+    with m.app.app_context():
+        return [doctor.id for doctor in m.Doctor.query.order_by(m.Doctor.id).limit(2)]
+
+@pytest.fixture
+def patient_email(m):
+    with m.app.app_context():
+        m.db.session.add(m.Patient(first_name='Cache', last_name='Fan', email='fan@example.test'))
+        m.db.session.commit()
+    return 'fan@example.test'
+
+def revalidate(client, path, response):
+    return client.get(path, headers={'If-None-Match': response.headers['ETag']}).status_code
+
+def test_unchanged_responses_are_not_modified(client, doctor_ids):
+    paths = ['/api/specialties', '/api/doctors', f'/api/doctors/{doctor_ids[0]}',
+             f'/api/doctors/{doctor_ids[0]}/availability']
+    for path in paths:
+        first = client.get(path)
+        assert first.status_code == 200 and first.headers['ETag']
+        assert first.headers['Cache-Control'].startswith('public, ')
+        assert revalidate(client, path, first) == 304, path
+        assert client.get(path).get_data() == first.get_data()
+
+def test_a_doctor_update_invalidates_only_that_doctor(client, admin_headers, doctor_ids):
+    changed, unchanged = doctor_ids
+    listing = client.get('/api/doctors')
+    changed_detail = client.get(f'/api/doctors/{changed}')
+    unchanged_detail = client.get(f'/api/doctors/{unchanged}')
+    specialties = client.get('/api/specialties')
+
+    client.put(f'/api/admin/doctors/{changed}', json={'bio': 'Updated bio'}, headers=admin_headers)
+
+    assert revalidate(client, '/api/doctors', listing) == 200
+    assert revalidate(client, f'/api/doctors/{changed}', changed_detail) == 200
+    assert client.get(f'/api/doctors/{changed}').get_json()['bio'] == 'Updated bio'
+    assert revalidate(client, f'/api/doctors/{unchanged}', unchanged_detail) == 304
+    assert revalidate(client, '/api/specialties', specialties) == 304
+
+def test_favorites_are_private_and_invalidated_by_a_toggle(client, doctor_ids, patient_email):
+    path = f'/api/doctors?patient_email={patient_email}'
+    favorites = client.get(path)
+    listing = client.get('/api/doctors')
+    assert favorites.headers['Cache-Control'].startswith('private, ')
+
+    client.post('/api/favorites', json={'email': patient_email, 'doctor_id': doctor_ids[0]})
+
+    refreshed = client.get(path, headers={'If-None-Match': favorites.headers['ETag']})
+    assert refreshed.status_code == 200
+    assert [d['id'] for d in refreshed.get_json() if d['is_favorite']] == [doctor_ids[0]]
+    assert revalidate(client, '/api/doctors', listing) == 304
+
+def test_writes_by_another_worker_are_not_served_stale(m, client, doctor_ids):
+    detail = client.get(f'/api/doctors/{doctor_ids[0]}')
+
+    # Another process: the row changes and the shared counter moves, this process's cache does not
+    with m.app.app_context():
+        m.db.session.execute(m.db.update(m.Doctor).where(m.Doctor.id == doctor_ids[0]).values(bio='Elsewhere'))
+        m.bump_cache_versions('doctors', f'doctor:{doctor_ids[0]}')
+        m.db.session.commit()
+
+    refreshed = client.get(f'/api/doctors/{doctor_ids[0]}', headers={'If-None-Match': detail.headers['ETag']})
+    assert refreshed.status_code == 200
+    assert refreshed.get_json()['bio'] == 'Elsewhere'
@@ -0,0 +1,58 @@
+"""
+Doctor search: the FTS5 index ranks name matches above bio matches, breaks
+ties by rating, matches word prefixes without accents, and follows admin
+edits and deletes.
+"""
+
+import pytest
+
+@pytest.fixture
+def add_doctor(m, client, admin_headers):
+    with m.app.app_context():
+        specialty_id = m.Specialty.query.first().id
+
+    def add(first_name, last_name, bio='', rating=None):
+        response = client.post('/api/admin/doctors', headers=admin_headers, json={
+            'firstName': first_name, 'lastName': last_name, 'specialtyId': specialty_id, 'bio': bio,
+            'email': f'{first_name}.{last_name}@search.test'.lower()})
+        doctor_id = response.get_json()['id']
+        if rating is not None:
+            with m.app.app_context():
+                m.db.session.get(m.Doctor, doctor_id).rating = rating
+                m.db.session.commit()
+        return doctor_id
+    return add
+
+def search(client, query, **params):
+    response = client.get('/api/doctors/search', query_string={'q': query, **params})
+    assert response.status_code == 200
+    return [doctor['id'] for doctor in response.get_json()]
+
+def test_name_matches_rank_above_bio_matches(m, client, add_doctor):
+    assert m.doctor_search_available()
+    in_bio = add_doctor('Ada', 'Quill', bio='Trained under Dr. Zephyrine for ten years.', rating=5.0)
+    in_name = add_doctor('Marta', 'Zéphyrine', rating=3.0)
+
+    assert search(client, 'zephyrine') == [in_name, in_bio]
+    assert search(client, 'zeph') == [in_name, in_bio]
+    assert search(client, 'marta zeph') == [in_name]
+
+def test_equal_matches_are_ordered_by_rating(client, add_doctor):
+    low = add_doctor('Lena', 'Orbison', bio='Sleep medicine.', rating=3.0)
+    high = add_doctor('Owen', 'Orbison', bio='Sleep medicine.', rating=4.8)
+
+    assert search(client, 'orbison') == [high, low]
+    assert search(client, 'orbison', per_page=1, page=2) == [low]
+
+def test_admin_edits_and_deletes_update_the_index(client, admin_headers, add_doctor):
+    doctor_id = add_doctor('Ivo', 'Kestrel')
+    client.put(f'/api/admin/doctors/{doctor_id}', json={'lastName': 'Brambleton'}, headers=admin_headers)
+    assert search(client, 'kestrel') == []
+    assert search(client, 'brambleton') == [doctor_id]
+
+    client.delete(f'/api/admin/doctors/{doctor_id}', headers=admin_headers)
+    assert search(client, 'brambleton') == []
+
+def test_short_or_symbol_only_queries_return_nothing(client):
+    assert search(client, 'a') == []
+    assert search(client, '"*()') == []
@@ -0,0 +1,69 @@
+"""
+Appointment export: CSV and NDJSON stream every matching appointment newest
+first in batch-sized chunks, with the same filters as the admin list.
+"""
+
+from datetime import datetime, timedelta
+import csv
+import io
+import json
+
+import pytest
+
+APPOINTMENTS = 2300
+
+@pytest.fixture
+def appointments(m):
+    with m.app.app_context():
+        doctor_ids = [doctor.id for doctor in m.Doctor.query.order_by(m.Doctor.id)]
+        patient = m.Patient(first_name='Export', last_name='Me', email='export@example.test', phone='555-0100')
+        m.db.session.add(patient)
+        m.db.session.flush()
+        start = datetime.combine(datetime.now().date() - timedelta(days=30), datetime.min.time()).replace(hour=8)
+        m.db.session.execute(m.db.insert(m.Appointment), [{
+            'doctor_id': doctor_ids[n % len(doctor_ids)],
+            'patient_id': patient.id,
+            'appointment_date': start + timedelta(minutes=30 * (n // len(doctor_ids))),
+            'status': 'completed' if n % 3 else 'cancelled',
+            'reason': f'Visit {n}'
+        } for n in range(APPOINTMENTS)])
+        m.db.session.commit()
+        return m.db.session.query(m.Appointment.id, m.Appointment.status).order_by(
+            m.Appointment.appointment_date.desc(), m.Appointment.id.desc()).all()
+
+def export(client, admin_headers, **params):
+    response = client.get('/api/admin/appointments/export', query_string=params, headers=admin_headers,
+                          buffered=False)
+    assert response.status_code == 200
+    chunks = [chunk.decode() for chunk in response.response]
+    response.close()
+    return response, chunks
+
+def test_csv_export_streams_every_appointment_newest_first(m, client, admin_headers, appointments):
+    response, chunks = export(client, admin_headers)
+    assert response.mimetype == 'text/csv'
+    assert 'attachment; filename="appointments-' in response.headers['Content-Disposition']
+    assert len(chunks) == APPOINTMENTS // m.EXPORT_BATCH_SIZE + 1
+
+    rows = list(csv.DictReader(io.StringIO(''.join(chunks))))
+    assert list(rows[0]) == m.EXPORT_COLUMNS
+    assert [int(row['id']) for row in rows] == [id_ for id_, _ in appointments]
+    assert rows[0]['patient_name'] == 'Export Me' and rows[0]['patient_phone'] == '555-0100'
+    assert rows[0]['doctor_name'].startswith('Dr. ')
+
+def test_ndjson_export_applies_the_list_filters(m, client, admin_headers, appointments):
+    with m.app.app_context():
+        doctor_id = m.Doctor.query.first().id
+    response, chunks = export(client, admin_headers, format='ndjson', status='cancelled', doctor_id=doctor_id)
+    assert response.mimetype == 'application/x-ndjson'
+
+    records = [json.loads(line) for line in ''.join(chunks).splitlines()]
+    assert records and all(r['status'] == 'cancelled' and r['doctor_id'] == doctor_id for r in records)
+    with m.app.app_context():
+        assert len(records) == m.Appointment.query.filter_by(status='cancelled', doctor_id=doctor_id).count()
+    assert [r['date'] for r in records] == sorted((r['date'] for r in records), reverse=True)
+
+def test_export_rejects_bad_requests(client, admin_headers):
+    assert client.get('/api/admin/appointments/export').status_code == 401
+    assert client.get('/api/admin/appointments/export?format=xml', headers=admin_headers).status_code == 400
+    assert client.get('/api/admin/appointments/export?date_from=yesterday', headers=admin_headers).status_code == 400
@@ -0,0 +1,58 @@
+"""
+First available slots: the earliest free slots across every doctor of a
+specialty, merged in time order with better-rated doctors first on ties,
+optionally limited to a consultation type.
+"""
+
+import pytest
+
+from test_booking_concurrency import next_weekday_at
+
+@pytest.fixture
+def specialty(m):
+    """A specialty with three doctors of different ratings; one only sees patients by video."""
+    with m.app.app_context():
+        specialty = m.Specialty(name='Allergology', description='Allergies')
+        m.db.session.add(specialty)
+        m.db.session.flush()
+        for n, (rating, types) in enumerate([(4.1, 'in-person'), (4.9, 'in-person,video'), (3.0, 'video')]):
+            doctor = m.Doctor(first_name=f'Al{n}', last_name='Lergy', email=f'al{n}@first.test',
+                              specialty_id=specialty.id, rating=rating, consultation_types=types)
+            m.db.session.add(doctor)
+            m.db.session.flush()
+            m.db.session.add_all([m.DoctorAvailability(
+                doctor_id=doctor.id, day_of_week=day, start_time=next_weekday_at(9).time(),
+                end_time=next_weekday_at(11).time(), is_available=True) for day in range(5)])
+        m.db.session.commit()
+        doctor_ids = {d.first_name: d.id for d in m.Doctor.query.filter_by(specialty_id=specialty.id)}
+        return specialty.id, doctor_ids
+
+def first_slots(client, specialty_id, **params):
+    response = client.get('/api/available-slots/first', query_string={
+        'specialty_id': specialty_id, 'from': next_weekday_at(9).date().isoformat(), **params})
+    assert response.status_code == 200, response.get_json()
+    return [(slot['datetime'], slot['doctor_id']) for slot in response.get_json()['slots']]
+
+def test_slots_are_merged_by_time_then_rating(client, specialty):
+    specialty_id, doctors = specialty
+    nine, half_past = next_weekday_at(9).isoformat(), next_weekday_at(9).replace(minute=30).isoformat()
+
+    assert first_slots(client, specialty_id, limit=4) == [
+        (nine, doctors['Al1']), (nine, doctors['Al0']), (nine, doctors['Al2']), (half_past, doctors['Al1'])]
+
+def test_booked_slots_and_consultation_types_are_respected(client, specialty):
+    specialty_id, doctors = specialty
+    client.post('/api/appointments', json={
+        'doctorId': doctors['Al1'], 'firstName': 'First', 'lastName': 'Slot', 'email': 'first@example.test',
+        'dateTime': next_weekday_at(9).isoformat()})
+
+    nine, half_past = next_weekday_at(9).isoformat(), next_weekday_at(9).replace(minute=30).isoformat()
+    assert first_slots(client, specialty_id, limit=2, appointment_type='video') == [
+        (nine, doctors['Al2']), (half_past, doctors['Al1'])]
+
+def test_unknown_specialties_and_bad_dates_are_rejected(client, specialty):
+    assert client.get('/api/available-slots/first').status_code == 400
+    missing = client.get('/api/available-slots/first?specialty_id=999999')
+    assert missing.status_code == 404
+    assert missing.get_json() == {'error': 'Specialty not found'}
+    assert client.get(f'/api/available-slots/first?specialty_id={specialty[0]}&from=soon').status_code == 400
@@ -0,0 +1,70 @@
+"""
+Doctor ratings: each review is folded into the doctor's stored totals and
+star histogram in the same transaction, deleting a reviewed appointment takes
+the review back out, and recompute-ratings repairs totals that drifted.
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+@pytest.fixture
+def visits(m):
+    """A doctor without reviews and three completed appointments with them."""
+    with m.app.app_context():
+        doctor = m.Doctor(first_name='Rae', last_name='Tings', email='rae@ratings.test',
+                          specialty_id=m.Specialty.query.first().id)
+        patient = m.Patient(first_name='Review', last_name='Writer', email='writer@ratings.test')
+        m.db.session.add_all([doctor, patient])
+        m.db.session.flush()
+        start = datetime.combine(datetime.now().date() - timedelta(days=10), datetime.min.time()).replace(hour=9)
+        appointments = [m.Appointment(doctor_id=doctor.id, patient_id=patient.id, status='completed',
+                                      appointment_date=start + timedelta(days=n)) for n in range(3)]
+        m.db.session.add_all(appointments)
+        m.db.session.commit()
+        return doctor.id, patient.id, [a.id for a in appointments]
+
+def review(client, visits, index, rating):
+    doctor_id, patient_id, appointment_ids = visits
+    return client.post('/api/reviews', json={
+        'appointmentId': appointment_ids[index], 'doctorId': doctor_id, 'patientId': patient_id,
+        'rating': rating, 'comment': 'Fine'})
+
+def doctor(client, visits):
+    return client.get(f'/api/doctors/{visits[0]}').get_json()
+
+def test_reviews_update_the_rating_and_histogram(client, visits):
+    for index, rating in enumerate([5, 4, 4]):
+        assert review(client, visits, index, rating).status_code == 201
+
+    body = doctor(client, visits)
+    assert (body['rating'], body['review_count']) == (4.3, 3)
+    assert body['rating_histogram'] == {'1': 0, '2': 0, '3': 0, '4': 2, '5': 1}
+
+def test_invalid_ratings_are_rejected(client, visits):
+    for rating in (0, 6, 4.5, '5', True):
+        assert review(client, visits, 0, rating).status_code == 400, rating
+    assert doctor(client, visits)['review_count'] == 0
+
+def test_deleting_a_reviewed_appointment_removes_its_review(client, admin_headers, visits):
+    review(client, visits, 0, 5)
+    review(client, visits, 1, 2)
+
+    client.delete(f'/api/admin/appointments/{visits[2][1]}', headers=admin_headers)
+
+    body = doctor(client, visits)
+    assert (body['rating'], body['review_count']) == (5.0, 1)
+    assert body['rating_histogram']['2'] == 0
+
+def test_recompute_repairs_drifted_totals(m, client, visits):
+    review(client, visits, 0, 3)
+    with m.app.app_context():
+        m.db.session.get(m.Doctor, visits[0]).rating_sum = 40
+        m.db.session.commit()
+
+    result = m.app.test_cli_runner().invoke(args=['recompute-ratings'])
+    assert result.exit_code == 0, result.output
+    with m.app.app_context():
+        repaired = m.db.session.get(m.Doctor, visits[0])
+        assert (repaired.rating_sum, repaired.rating, repaired.rating_count_3) == (3, 3.0, 1)
+        assert m.recompute_doctor_ratings() == 0
@@ -0,0 +1,94 @@
+"""
+Appointment reminders: due appointments get one outbox row per start time,
+cancelled or moved appointments are skipped, one process at a time holds the
+scheduler lease, and /metrics shows whether the outbox is being drained.
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from test_booking_concurrency import next_weekday_at
+
+@pytest.fixture
+def delivered(m, monkeypatch):
+    payloads = []
+    monkeypatch.setattr(m, '_reminder_handlers', [payloads.append])
+    return payloads
+
+def book(m, client, slot):
+    with m.app.app_context():
+        doctor_id = m.Doctor.query.first().id
+    return client.post('/api/appointments', json={
+        'doctorId': doctor_id, 'firstName': 'Remind', 'lastName': 'Me', 'email': 'remind@example.test',
+        'dateTime': slot.isoformat()}).get_json()['id']
+
+def run_pass(m, now):
+    with m.app.app_context():
+        return m.run_reminder_pass(now)
+
+def test_due_appointments_are_reminded_once(m, client, delivered):
+    slot = next_weekday_at(10)
+    appointment_id = book(m, client, slot)
+
+    assert run_pass(m, slot - timedelta(hours=m.REMINDER_LEAD_HOURS + 1)) == (0, 0)
+    assert run_pass(m, slot - timedelta(hours=2)) == (1, 1)
+    assert run_pass(m, slot - timedelta(hours=1)) == (0, 0)
+    assert [(p['appointment_id'], p['patient_email']) for p in delivered] == [(appointment_id, 'remind@example.test')]
+
+def test_cancelled_appointments_are_skipped(m, client, delivered):
+    slot = next_weekday_at(11)
+    appointment_id = book(m, client, slot)
+    now = slot - timedelta(hours=2)
+    with m.app.app_context():
+        m.enqueue_due_reminders(now)
+    client.post(f'/api/appointments/{appointment_id}/cancel')
+
+    with m.app.app_context():
+        assert m.dispatch_due_reminders(now) == 0
+        assert m.Reminder.query.one().status == 'skipped'
+    assert delivered == []
+
+def test_moving_an_appointment_back_reissues_its_reminder(m, client, delivered):
+    slot = next_weekday_at(12)
+    appointment_id = book(m, client, slot)
+    now = slot - timedelta(hours=3)
+    with m.app.app_context():
+        m.enqueue_due_reminders(now)
+    client.post(f'/api/appointments/{appointment_id}/reschedule', json={'newDateTime': (slot + timedelta(hours=1)).isoformat()})
+    run_pass(m, now)   # skips the first row, reminds of the new time
+    client.post(f'/api/appointments/{appointment_id}/reschedule', json={'newDateTime': slot.isoformat()})
+
+    assert run_pass(m, now) == (1, 1)
+    assert [p['date'] for p in delivered] == [(slot + timedelta(hours=1)).isoformat(), slot.isoformat()]
+    with m.app.app_context():
+        assert m.Reminder.query.count() == 2
+
+def test_one_holder_at_a_time_runs_the_scheduler(m):
+    now = datetime.now()
+    with m.app.app_context():
+        assert m.acquire_scheduler_lease('reminders', 'worker-a', 180, now)
+        assert not m.acquire_scheduler_lease('reminders', 'worker-b', 180, now + timedelta(seconds=60))
+        assert m.acquire_scheduler_lease('reminders', 'worker-a', 180, now + timedelta(seconds=60))
+        # worker-a stopped renewing: its lease runs out and worker-b takes over
+        assert m.acquire_scheduler_lease('reminders', 'worker-b', 180, now + timedelta(seconds=241))
+        assert not m.acquire_scheduler_lease('reminders', 'worker-a', 180, now + timedelta(seconds=242))
+
+def test_metrics_show_an_undrained_outbox(m, client, delivered):
+    slot = next_weekday_at(13)
+    book(m, client, slot)
+    with m.app.app_context():
+        m.enqueue_due_reminders(slot - timedelta(hours=2))
+        # Issued an hour ago, and no scheduler has delivered it since
+        m.Reminder.query.update({m.Reminder.due_at: datetime.now() - timedelta(hours=1)})
+        m.db.session.commit()
+
+    body = client.get('/metrics').get_data(as_text=True)
+    assert 'medschedule_reminders_overdue 1\n' in body
+    assert 'medschedule_reminder_last_pass_timestamp_seconds 0.000\n' in body
+
+    assert run_pass(m, datetime.now()) == (0, 1)
+    body = client.get('/metrics').get_data(as_text=True)
+    assert 'medschedule_reminders_overdue 0\n' in body
+    last_pass = float(body.split('\nmedschedule_reminder_last_pass_timestamp_seconds ')[1].split()[0])
+    assert abs(last_pass - datetime.now().timestamp()) < 60
@@ -0,0 +1,49 @@
+"""
+The seed-data command: it brings a database from before the visit statistics
+and search indexes up to the current schema before generating, and bumps
+the version counters so cached catalog responses are not served stale.
+"""
+
+LEGACY_INDEXES = ('ix_patients_appointment_count', 'ix_patients_last_visit', 'ix_patients_email_nocase',
+                  'ix_patients_first_name_nocase', 'ix_patients_last_name_nocase', 'uq_appointments_active_slot')
+
+def make_legacy_schema(m):
+    with m.app.app_context():
+        with m.db.engine.begin() as connection:
+            for index in LEGACY_INDEXES:
+                connection.exec_driver_sql(f'DROP INDEX {index}')
+            connection.exec_driver_sql('ALTER TABLE patients DROP COLUMN appointment_count')
+            connection.exec_driver_sql('ALTER TABLE patients DROP COLUMN last_visit')
+        # Pooled connections cache the schema they last saw; start over as a new process would
+        m.db.engine.dispose()
+
+def test_seed_data_upgrades_an_old_database(m):
+    make_legacy_schema(m)
+    result = m.app.test_cli_runner().invoke(
+        args=['seed-data', '--doctors', '5', '--patients', '60', '--appointments', '400', '--seed', '3'])
+    assert result.exit_code == 0, result.output
+
+    with m.app.app_context():
+        inspector = m.db.inspect(m.db.engine)
+        assert {'appointment_count', 'last_visit'} <= {column['name'] for column in inspector.get_columns('patients')}
+        indexes = {index['name'] for table in ('patients', 'appointments') for index in inspector.get_indexes(table)}
+        assert set(LEGACY_INDEXES) <= indexes
+        assert m.Patient.query.count() == 60
+        assert m.Appointment.query.count() == 400
+        counted = m.db.session.query(m.db.func.sum(m.Patient.appointment_count)).scalar()
+        assert counted == 400
+
+def test_seed_data_invalidates_cached_catalog_responses(m, client):
+    first = client.get('/api/doctors')
+    favorites = client.get('/api/doctors?patient_email=nobody@example.test')
+    assert client.get('/api/doctors', headers={'If-None-Match': first.headers['ETag']}).status_code == 304
+
+    result = m.app.test_cli_runner().invoke(
+        args=['seed-data', '--doctors', '3', '--patients', '20', '--appointments', '50'])
+    assert result.exit_code == 0, result.output
+
+    refreshed = client.get('/api/doctors', headers={'If-None-Match': first.headers['ETag']})
+    assert refreshed.status_code == 200
+    assert len(refreshed.get_json()) == len(first.get_json()) + 3
+    assert client.get('/api/doctors?patient_email=nobody@example.test',
+                      headers={'If-None-Match': favorites.headers['ETag']}).status_code == 200
@@ -0,0 +1,114 @@
+"""
+Live slot events: bookings in this process reach subscribers when they
+commit, bookings by other worker processes are found by the version poller,
+and each process serves a bounded number of streams.
+"""
+
+import json
+
+import pytest
+
+from test_booking_concurrency import next_weekday_at
+
+@pytest.fixture
+def doctor_id(m):
+    with m.app.app_context():
+        return m.Doctor.query.first().id
+
+@pytest.fixture
+def subscription(m, doctor_id):
+    subscription = m.slot_events.subscribe(doctor_id)
+    yield subscription
+    m.slot_events.unsubscribe(subscription)
+
+def drain(subscription):
+    events = []
+    while not subscription.queue.empty():
+        event_type, payload = subscription.queue.get_nowait()
+        events.append((event_type, payload['datetime']))
+    return events
+
+def insert_from_another_worker(m, doctor_id, slot):
+    """Book a slot the way another process would: the row and the version bump, no events here."""
+    with m.app.app_context():
+        patient_id = m.db.session.execute(m.db.insert(m.Patient).values(
+            first_name='Other', last_name='Worker', email='other.worker@example.test')).inserted_primary_key[0]
+        m.db.session.execute(m.db.insert(m.Appointment).values(
+            doctor_id=doctor_id, patient_id=patient_id, appointment_date=slot, status='scheduled'))
+        m.bump_appointments_version(doctor_id)
+        m.db.session.commit()
+
+def test_bookings_in_this_process_are_published_on_commit(client, doctor_id, subscription):
+    slot = next_weekday_at(10)
+    created = client.post('/api/appointments', json={
+        'doctorId': doctor_id, 'firstName': 'Live', 'lastName': 'Event', 'email': 'live@example.test',
+        'dateTime': slot.isoformat()}).get_json()
+    client.post(f'/api/appointments/{created["id"]}/cancel')
+
+    assert drain(subscription) == [('slot-taken', slot.isoformat()), ('slot-freed', slot.isoformat())]
+
+def test_poller_publishes_changes_made_by_other_workers(m, client, doctor_id, subscription):
+    with m.app.app_context():
+        m.slot_change_poller.poll()   # first look: remembers the booked slots
+    slot = next_weekday_at(11)
+    insert_from_another_worker(m, doctor_id, slot)
+
+    with m.app.app_context():
+        m.slot_change_poller.poll()
+        m.slot_change_poller.poll()
+    assert drain(subscription) == [('slot-taken', slot.isoformat())]
+
+def test_poller_does_not_repeat_local_events(m, client, doctor_id, subscription):
+    with m.app.app_context():
+        m.slot_change_poller.poll()
+    slot = next_weekday_at(12)
+    client.post('/api/appointments', json={
+        'doctorId': doctor_id, 'firstName': 'Live', 'lastName': 'Event', 'email': 'live@example.test',
+        'dateTime': slot.isoformat()})
+
+    with m.app.app_context():
+        m.slot_change_poller.poll()
+    assert drain(subscription) == [('slot-taken', slot.isoformat())]
+
+def test_stream_sends_events_and_unsubscribes_on_close(m, client, doctor_id):
+    slot = next_weekday_at(10)
+    response = client.get(f'/api/doctors/{doctor_id}/slot-events?date={slot.date()}', buffered=False)
+    assert response.mimetype == 'text/event-stream'
+    chunks = (chunk.decode() for chunk in response.response)
+    assert 'event: ready' in next(chunks)
+
+    m.slot_events.publish('slot-taken', doctor_id, slot)
+    event = next(chunks)
+    assert event.startswith('event: slot-taken\n')
+    assert json.loads(event.split('data: ', 1)[1])['datetime'] == slot.isoformat()
+
+    response.close()
+    assert doctor_id not in m.slot_events.doctor_ids()
+
+def test_streams_per_process_are_capped(m, client, doctor_id, monkeypatch):
+    monkeypatch.setattr(m.slot_events, 'max_subscriptions', 1)
+    first = client.get(f'/api/doctors/{doctor_id}/slot-events', buffered=False)
+    next(iter(first.response))
+
+    refused = client.get(f'/api/doctors/{doctor_id}/slot-events')
+    assert refused.status_code == 503
+    assert refused.headers['Retry-After']
+    first.close()
+    assert client.get(f'/api/doctors/{doctor_id}/slot-events?date=bad').status_code == 400
+
+def test_poller_publishes_database_holds_of_other_workers(m, client, doctor_id, subscription, monkeypatch):
+    monkeypatch.setattr(m, 'SLOT_HOLD_BACKEND', 'DATABASE')
+    monkeypatch.setattr(m, 'slot_holds', m.DatabaseSlotHoldStore())
+    with m.app.app_context():
+        m.slot_change_poller.poll()
+    slot = next_weekday_at(14)
+    token = client.post('/api/slot-holds', json={'doctorId': doctor_id, 'dateTime': slot.isoformat()}).get_json()['token']
+    drain(subscription)
+
+    # Another worker releases the hold: only the row and the counter change
+    with m.app.app_context():
+        m.SlotHold.query.filter_by(token=token).delete()
+        m.bump_cache_versions(f'holds:{doctor_id}')
+        m.db.session.commit()
+        m.slot_change_poller.poll()
+    assert drain(subscription) == [('slot-released', slot.isoformat())]
@@ -0,0 +1,88 @@
+"""
+Slot holds: a held slot is refused to everyone who does not present its
+token, even callers on the same address, a browser session keeps one hold,
+and hold requests are rate limited per client address. Every behaviour is
+checked against both hold stores.
+"""
+
+import pytest
+
+from test_booking_concurrency import next_weekday_at
+
+@pytest.fixture(params=['memory', 'database'])
+def holds(request, m, monkeypatch):
+    store = m.MemorySlotHoldStore() if request.param == 'memory' else m.DatabaseSlotHoldStore()
+    monkeypatch.setattr(m, 'slot_holds', store)
+    return store
+
+@pytest.fixture
+def doctor_id(m):
+    with m.app.app_context():
+        return m.Doctor.query.first().id
+
+def hold(client, doctor_id, slot, **extra):
+    return client.post('/api/slot-holds', json={'doctorId': doctor_id, 'dateTime': slot.isoformat(), **extra})
+
+def book(client, doctor_id, slot, email, **extra):
+    return client.post('/api/appointments', json={
+        'doctorId': doctor_id, 'firstName': 'Held', 'lastName': 'Patient', 'email': email,
+        'dateTime': slot.isoformat(), **extra})
+
+def test_a_held_slot_is_refused_to_another_patient_on_the_same_address(client, holds, doctor_id):
+    slot = next_weekday_at(10)
+    first = hold(client, doctor_id, slot, sessionId='patient-a')
+    assert first.status_code == 201
+
+    assert hold(client, doctor_id, slot, sessionId='patient-b').status_code == 409
+    assert hold(client, doctor_id, slot).status_code == 409
+    assert book(client, doctor_id, slot, 'b@example.test').status_code == 409
+    assert book(client, doctor_id, slot, 'a@example.test', holdToken=first.get_json()['token']).status_code == 201
+
+def test_a_session_keeps_one_hold(client, holds, doctor_id):
+    first = hold(client, doctor_id, next_weekday_at(10), sessionId='tab')
+    second = hold(client, doctor_id, next_weekday_at(11), sessionId='tab')
+    assert second.status_code == 201
+
+    assert client.delete(f'/api/slot-holds/{first.get_json()["token"]}').status_code == 404
+    assert client.delete(f'/api/slot-holds/{second.get_json()["token"]}').status_code == 200
+
+def test_replace_token_moves_a_hold_to_an_overlapping_slot(client, holds, doctor_id):
+    first = hold(client, doctor_id, next_weekday_at(10)).get_json()
+    assert hold(client, doctor_id, next_weekday_at(10).replace(minute=15)).status_code == 409
+
+    moved = hold(client, doctor_id, next_weekday_at(10).replace(minute=15), replaceToken=first['token'])
+    assert moved.status_code == 201
+    assert hold(client, doctor_id, next_weekday_at(10)).status_code == 409
+
+def test_held_slots_leave_the_listing_except_for_their_holder(client, holds, doctor_id):
+    slot = next_weekday_at(10)
+    token = hold(client, doctor_id, slot).get_json()['token']
+
+    def listed(query=''):
+        response = client.get(f'/api/available-slots?doctor_id={doctor_id}&date={slot.date()}{query}')
+        return {entry['datetime'] for entry in response.get_json()}
+
+    assert slot.isoformat() not in listed()
+    assert slot.isoformat() in listed(f'&hold_token={token}')
+
+def test_hold_requests_are_rate_limited_per_address(m, client, holds, doctor_id, monkeypatch):
+    monkeypatch.setattr(m, 'slot_hold_rate_limiter', m.RateLimiter(2, 60))
+    slots = [next_weekday_at(9 + n) for n in range(4)]
+
+    assert hold(client, doctor_id, slots[0]).status_code == 201
+    assert hold(client, doctor_id, slots[1]).status_code == 201
+    limited = hold(client, doctor_id, slots[2])
+    assert limited.status_code == 429
+    assert int(limited.headers['Retry-After']) > 0
+
+    other_address = client.post('/api/slot-holds', json={'doctorId': doctor_id, 'dateTime': slots[3].isoformat()},
+                                environ_base={'REMOTE_ADDR': '192.0.2.7'})
+    assert other_address.status_code == 201
+
+def test_a_reschedule_hold_needs_the_patients_email(m, client, holds, doctor_id):
+    created = book(client, doctor_id, next_weekday_at(10), 'owner@example.test').get_json()
+    slot = next_weekday_at(10).replace(minute=30)
+
+    assert hold(client, doctor_id, slot, appointmentId=created['id']).status_code == 403
+    assert hold(client, doctor_id, slot, appointmentId=created['id'], email='other@example.test').status_code == 403
+    assert hold(client, doctor_id, slot, appointmentId=created['id'], email='owner@example.test').status_code == 201
@@ -0,0 +1,85 @@
+"""
+Every JSON list endpoint must issue the same number of SQL statements no
+matter how many rows it returns (no per-row lazy loads). Each endpoint is
+measured with cold caches on a small dataset, the dataset is grown, and the
+measurement is repeated.
+"""
+
+import pytest
+
+from conftest import clear_process_caches, count_statements
+
+SMALL = {'doctors': 4, 'patients': 15, 'appointments': 120}
+GROWTH = {'doctors': 16, 'patients': 60, 'appointments': 1200}
+
+LIST_ENDPOINTS = {
+    'get_doctors': lambda fx: '/api/doctors',
+    'get_doctors_with_favorites': lambda fx: f'/api/doctors?patient_email={fx["favorite_email"]}',
+    'get_doctor_reviews': lambda fx: f'/api/doctors/{fx["reviewed_doctor_id"]}/reviews',
+    'get_favorites': lambda fx: f'/api/favorites?email={fx["favorite_email"]}',
+    'get_appointments': lambda fx: f'/api/appointments?email={fx["busy_email"]}',
+    'admin_get_doctors': lambda fx: '/api/admin/doctors',
+    'admin_get_appointments': lambda fx: '/api/admin/appointments?per_page=100',
+    'admin_get_stats': lambda fx: '/api/admin/stats',
+    'admin_get_patients': lambda fx: '/api/admin/patients?per_page=100',
+    'admin_get_patient_appointments': lambda fx: f'/api/admin/patients/{fx["busy_patient_id"]}/appointments',
+}
+
+def pick_fixtures(m):
+    """The busiest patient, doctor and favoriter, so each list grows with the dataset."""
+    db = m.db
+    busy_patient_id = db.session.query(m.Appointment.patient_id).group_by(m.Appointment.patient_id).order_by(
+        db.func.count().desc(), m.Appointment.patient_id).first()[0]
+    favorite_patient_id = db.session.query(m.FavoriteDoctor.patient_id).group_by(
+        m.FavoriteDoctor.patient_id).order_by(db.func.count().desc(), m.FavoriteDoctor.patient_id).first()[0]
+    reviewed_doctor_id = db.session.query(m.Review.doctor_id).group_by(m.Review.doctor_id).order_by(
+        db.func.count().desc(), m.Review.doctor_id).first()[0]
+    return {
+        'busy_patient_id': busy_patient_id,
+        'busy_email': db.session.get(m.Patient, busy_patient_id).email,
+        'favorite_email': db.session.get(m.Patient, favorite_patient_id).email,
+        'reviewed_doctor_id': reviewed_doctor_id,
+    }
+
+def measure(m, client, headers, fx):
+    """Statements and response size per endpoint, each measured with cold caches."""
+    with m.app.app_context():
+        engine = m.db.engine
+    # Once-per-process setup (database settings log, search index check) runs outside the counts
+    client.get('/api/specialties')
+    results = {}
+    for name, path in LIST_ENDPOINTS.items():
+        clear_process_caches()
+        with count_statements(engine) as counter:
+            response = client.get(path(fx), headers=headers)
+        assert response.status_code == 200, (name, response.get_json())
+        results[name] = (counter['statements'], len(response.get_data()))
+    return results
+
+@pytest.fixture
+def measurements(m, client, admin_headers):
+    with m.app.app_context():
+        m.SyntheticDataGenerator(seed=5).generate(**SMALL, review_rate=0.6, favorite_rate=0.6)
+        small_fx = pick_fixtures(m)
+    small = measure(m, client, admin_headers, small_fx)
+
+    with m.app.app_context():
+        m.SyntheticDataGenerator(seed=6).generate(**GROWTH, review_rate=0.6, favorite_rate=0.6)
+        # Generated patients keep at most three favorites; give the same patient every other doctor
+        patient = m.Patient.query.filter_by(email=small_fx['favorite_email']).one()
+        favorited = {row.doctor_id for row in m.FavoriteDoctor.query.filter_by(patient_id=patient.id)}
+        m.db.session.add_all(m.FavoriteDoctor(patient_id=patient.id, doctor_id=doctor_id)
+                             for (doctor_id,) in m.db.session.query(m.Doctor.id) if doctor_id not in favorited)
+        m.db.session.commit()
+        large_fx = {**pick_fixtures(m), 'favorite_email': small_fx['favorite_email']}
+    large = measure(m, client, admin_headers, large_fx)
+    return small, large
+
+def test_list_endpoints_issue_a_constant_number_of_statements(measurements):
+    small, large = measurements
+    for name in LIST_ENDPOINTS:
+        small_statements, small_size = small[name]
+        large_statements, large_size = large[name]
+        assert large_size > small_size, f'{name} did not return more data on the larger dataset'
+        assert large_statements == small_statements, (
+            f'{name}: {small_statements} statements on the small dataset, {large_statements} on the large one')